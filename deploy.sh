@@ -41,18 +41,30 @@ rm -rf build lambda.zip
 # Create build directory
 mkdir -p build
 
-# Copy source files
-cp -r src/api build/
-cp src/cli.py build/
+# Copy only what the handler imports (the CLI, bench tools and Selenium code stay out)
+mkdir -p build/api
+cp src/api/*.py build/api/
 cp src/lambda_handler.py build/
 
-# Install dependencies
+# Install dependencies. boto3 is provided by the Lambda runtime, so only requests is bundled.
 source "$(dirname "$0")/venv/bin/activate"
-pip install requests -t build/ --quiet
+pip install requests -t build/ --quiet --no-compile --no-cache-dir
+rm -rf build/bin
+
+# Byte-compile ahead of time so cold starts don't compile on import. The .pyc
+# files are only used if they match the runtime's Python version.
+if python -c 'import sys; sys.exit(sys.version_info[:2] != (3, 12))'; then
+    python -m compileall -q --invalidation-mode unchecked-hash build
+else
+    echo "  Warning: local Python is not 3.12; shipping sources without bytecode"
+fi
+
+# Cold-start import budget, measured against the packaged artifact
+(cd src && PYTHONDONTWRITEBYTECODE=1 python -m bench.import_budget --path ../build)
 
 # Create zip
 cd build
-zip -r ../lambda.zip . -x "*.pyc" -x "__pycache__/*" > /dev/null
+zip -r -q ../lambda.zip .
 cd ..
 
 echo "  Created lambda.zip ($(du -h lambda.zip | cut -f1))"
@@ -1,4 +1,11 @@
 from .base import BookingClient, Slot, BookingConfirmation, BookingClientError
 from .client_factory import create_client, load_client_from_config
 from .slot_selection import select_best_slot
-from .resy_client import ResyClient
+
+
+def __getattr__(name):
+    # The platform clients pull in requests; import them only when asked for
+    if name == "ResyClient":
+        from .resy_client import ResyClient
+        return ResyClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,450 @@
+"""
+Append-only archive of availability snapshots.
+
+Every find_slots result from watching or monitoring used to be thrown away.
+AvailabilityArchive keeps them, compactly: each (platform, venue) gets one
+binary file, and each observation of a (date, party size) series is stored
+as a delta against that series' previous snapshot, i.e. only the slots that
+appeared and the slots that went away. Unchanged polls cost nothing, and a
+full snapshot (keyframe) is written every KEYFRAME_INTERVAL records so a
+damaged file only loses the series state up to the next keyframe.
+
+File layout (little-endian):
+
+    header   b"ODJA" + version byte
+    record   kind (B), observed_at (d, epoch seconds), gap (f, seconds since
+             the series' previous observation, -1 for the first), day (H,
+             days since 1970-01-01), party_size (B), n_added (H),
+             n_removed (H), then n_added + n_removed slot codes (H each)
+
+A slot code packs the minute of the day into the low 11 bits and a table
+type index into the high 5. Table type names are interned per file by
+TYPES records, whose payload is the UTF-8 name (n_added bytes); types past
+the 31st share the last index. Deltas record the gap to the previous
+observation, so an opening is known to have happened within
+(observed_at - gap, observed_at] even though unchanged polls aren't stored.
+
+Reads memory-map the file and skip records of other series without decoding
+them, so questions like "when did 19:00 open at this venue" scan months of
+polls in milliseconds:
+
+    archive = AvailabilityArchive()
+    for window in archive.openings("resy", "25973", time="19:00"):
+        print(window.date, window.opened_at, window.closed_at)
+"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date as date_cls, timedelta
+from pathlib import Path
+from typing import Iterator, Optional
+
+from .base import BookingClient, BookingConfirmation, Slot
+from .instrumentation import Instrumentation
+
+
+# Archive files live next to config.json unless ODDJOB_ARCHIVE_DIR says otherwise
+DEFAULT_ARCHIVE_DIR = Path(__file__).resolve().parent.parent.parent / "archive"
+
+MAGIC = b"ODJA\x01"
+RECORD = struct.Struct("<BdfHBHH")
+
+KEYFRAME = 0
+DELTA = 1
+TYPES = 2
+
+KEYFRAME_INTERVAL = 64
+MAX_TABLE_TYPES = 32
+_MINUTE_BITS = 11
+_MINUTE_MASK = (1 << _MINUTE_BITS) - 1
+_EPOCH = date_cls(1970, 1, 1)
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """The full slot set of one series as of one stored observation."""
+    observed_at: float
+    date: str
+    party_size: int
+    slots: frozenset  # of (time "HH:MM:SS", table_type)
+
+
+@dataclass
+class SlotWindow:
+    """
+    One stretch during which a slot was listed.
+
+    The slot appeared within (opened_after, opened_at] and went away within
+    (closed_after, closed_at]. opened_after is None when the slot was
+    already listed at the series' first observation; closed_at and
+    closed_after are None if it was still listed at the last one.
+    """
+    date: str
+    party_size: int
+    time: str
+    table_type: str
+    opened_at: float
+    opened_after: Optional[float]
+    closed_at: Optional[float] = None
+    closed_after: Optional[float] = None
+
+    @property
+    def lifetime(self) -> Optional[float]:
+        return self.closed_at - self.opened_at if self.closed_at is not None else None
+
+
+def _day(date: str) -> int:
+    return (date_cls.fromisoformat(date) - _EPOCH).days
+
+
+def _date(day: int) -> str:
+    return (_EPOCH + timedelta(days=day)).isoformat()
+
+
+def _minute(slot_time: str) -> int:
+    hours, minutes = slot_time.split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def _time(minute: int) -> str:
+    return f"{minute // 60:02d}:{minute % 60:02d}:00"
+
+
+class _Series:
+    """Writer-side state of one (date, party size) series."""
+
+    __slots__ = ("codes", "last_observed", "since_keyframe")
+
+    def __init__(self):
+        self.codes: frozenset = frozenset()
+        self.last_observed: Optional[float] = None
+        self.since_keyframe = 0
+
+
+def _scan(buf, size: int) -> Iterator[tuple[int, int, float, float, int, int, tuple, tuple]]:
+    """
+    Decode every complete record in buf[:size].
+
+    Yields (offset after the record, kind, observed_at, gap, day, party_size,
+    added, removed); for TYPES records, added holds the name bytes.
+    """
+    offset = len(MAGIC)
+    while offset + RECORD.size <= size:
+        kind, observed_at, gap, day, party_size, n_added, n_removed = RECORD.unpack_from(buf, offset)
+        start = offset + RECORD.size
+        if kind == TYPES:
+            end = start + n_added
+            if end > size:
+                return
+            yield end, kind, observed_at, gap, day, party_size, bytes(buf[start:end]), ()
+        else:
+            end = start + 2 * (n_added + n_removed)
+            if end > size:
+                return
+            codes = struct.unpack_from(f"<{n_added + n_removed}H", buf, start)
+            yield end, kind, observed_at, gap, day, party_size, codes[:n_added], codes[n_added:]
+        offset = end
+
+
+class _ArchiveFile:
+    """One venue's archive file, open for appending."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.series: dict[tuple[int, int], _Series] = {}
+        self.types: list[str] = []
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        end = len(MAGIC)
+        if path.exists() and path.stat().st_size >= len(MAGIC):
+            with open(path, "rb") as f:
+                data = f.read()
+            if data[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not an availability archive")
+            for end, kind, observed_at, _, day, party_size, added, removed in _scan(data, len(data)):
+                self._replay(kind, observed_at, day, party_size, added, removed)
+            self.file = open(path, "r+b")
+            # Drop a record left half-written by a crash
+            self.file.truncate(end)
+            self.file.seek(end)
+        else:
+            self.file = open(path, "wb")
+            self.file.write(MAGIC)
+            self.file.flush()
+
+    def _replay(self, kind, observed_at, day, party_size, added, removed) -> None:
+        if kind == TYPES:
+            self.types.append(added.decode())
+            return
+        state = self.series.setdefault((day, party_size), _Series())
+        if kind == KEYFRAME:
+            state.codes = frozenset(added)
+            state.since_keyframe = 0
+        else:
+            state.codes = (state.codes - set(removed)) | set(added)
+            state.since_keyframe += 1
+        state.last_observed = observed_at
+
+    def _type_index(self, table_type: str, observed_at: float) -> int:
+        try:
+            return self.types.index(table_type)
+        except ValueError:
+            pass
+        if len(self.types) >= MAX_TABLE_TYPES:
+            return MAX_TABLE_TYPES - 1
+        name = table_type.encode()
+        self.file.write(RECORD.pack(TYPES, observed_at, 0.0, 0, 0, len(name), 0) + name)
+        self.types.append(table_type)
+        return len(self.types) - 1
+
+    def append(self, date: str, party_size: int, slots: list[Slot], observed_at: float) -> bool:
+        day = _day(date)
+        codes = frozenset(
+            (self._type_index(s.table_type or "", observed_at) << _MINUTE_BITS) | _minute(s.time)
+            for s in slots
+        )
+        state = self.series.setdefault((day, party_size), _Series())
+        gap = observed_at - state.last_observed if state.last_observed is not None else -1.0
+
+        if state.last_observed is None or state.since_keyframe + 1 >= KEYFRAME_INTERVAL:
+            kind, added, removed = KEYFRAME, sorted(codes), []
+            if codes == state.codes and state.last_observed is not None:
+                # Nothing changed; the next change will be written as a keyframe
+                state.last_observed = observed_at
+                return False
+            state.since_keyframe = 0
+        else:
+            added, removed = sorted(codes - state.codes), sorted(state.codes - codes)
+            if not added and not removed:
+                state.last_observed = observed_at
+                return False
+            kind = DELTA
+            state.since_keyframe += 1
+
+        items = added + removed
+        self.file.write(
+            RECORD.pack(kind, observed_at, gap, day, party_size, len(added), len(removed))
+            + struct.pack(f"<{len(items)}H", *items)
+        )
+        self.file.flush()
+        state.codes = codes
+        state.last_observed = observed_at
+        return True
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class AvailabilityArchive:
+    """
+    Reads and appends availability snapshots, one file per platform and venue.
+
+    Safe to share between threads. Readers see everything written so far,
+    including by other processes, since each record is flushed as it's
+    written.
+
+    Args:
+        directory: Archive directory; ODDJOB_ARCHIVE_DIR or the repo's
+            archive/ directory by default
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory or os.environ.get("ODDJOB_ARCHIVE_DIR") or DEFAULT_ARCHIVE_DIR)
+        self._files: dict[Path, _ArchiveFile] = {}
+        self._lock = threading.Lock()
+
+    def path(self, platform: str, venue_id: str) -> Path:
+        return self.directory / f"{platform}-{venue_id}.odja"
+
+    def record(
+        self,
+        platform: str,
+        venue_id: str,
+        date: str,
+        party_size: int,
+        slots: list[Slot],
+        observed_at: Optional[float] = None,
+    ) -> bool:
+        """
+        Store one find_slots result.
+
+        Returns:
+            True if it changed the series and a record was written
+        """
+        path = self.path(platform, str(venue_id))
+        observed_at = time.time() if observed_at is None else observed_at
+        with self._lock:
+            archive_file = self._files.get(path)
+            if archive_file is None:
+                archive_file = self._files[path] = _ArchiveFile(path)
+            return archive_file.append(date, party_size, slots, observed_at)
+
+    def close(self) -> None:
+        with self._lock:
+            for archive_file in self._files.values():
+                archive_file.close()
+            self._files.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _records(self, platform: str, venue_id: str):
+        """Decoded records of a venue's file, read through a memory map."""
+        path = self.path(platform, str(venue_id))
+        if not path.exists() or path.stat().st_size <= len(MAGIC):
+            return
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if buf[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not an availability archive")
+            yield from _scan(buf, len(buf))
+
+    def snapshots(
+        self,
+        platform: str,
+        venue_id: str,
+        date: Optional[str] = None,
+        party_size: Optional[int] = None,
+    ) -> Iterator[Snapshot]:
+        """Every stored state of the venue's series, oldest first, optionally for one date and party size."""
+        want_day = _day(date) if date else None
+        types: list[str] = []
+        states: dict[tuple[int, int], frozenset] = {}
+        for _, kind, observed_at, _, day, size, added, removed in self._records(platform, venue_id):
+            if kind == TYPES:
+                types.append(added.decode())
+                continue
+            if (want_day is not None and day != want_day) or (party_size is not None and size != party_size):
+                continue
+            if kind == KEYFRAME:
+                codes = frozenset(added)
+            else:
+                codes = (states.get((day, size), frozenset()) - set(removed)) | set(added)
+            states[(day, size)] = codes
+            yield Snapshot(
+                observed_at, _date(day), size,
+                frozenset((_time(c & _MINUTE_MASK), types[c >> _MINUTE_BITS]) for c in codes),
+            )
+
+    def openings(
+        self,
+        platform: str,
+        venue_id: str,
+        time: Optional[str] = None,
+        date: Optional[str] = None,
+        party_size: Optional[int] = None,
+        table_type: Optional[str] = None,
+    ) -> list[SlotWindow]:
+        """
+        Every stretch a slot was listed, oldest first.
+
+        Args:
+            platform, venue_id: The venue
+            time: Only this slot time ("19:00" or "19:00:00")
+            date, party_size, table_type: Only this reservation date, party size or table type
+
+        Returns:
+            SlotWindows ordered by opened_at
+        """
+        want_day = _day(date) if date else None
+        want_minute = _minute(time) if time else None
+        types: list[str] = []
+        states: dict[tuple[int, int], set] = {}
+        open_windows: dict[tuple[int, int, int], SlotWindow] = {}
+        windows: list[SlotWindow] = []
+
+        def matches(code: int) -> bool:
+            if want_minute is not None and code & _MINUTE_MASK != want_minute:
+                return False
+            return table_type is None or types[code >> _MINUTE_BITS] == table_type
+
+        for _, kind, observed_at, gap, day, size, added, removed in self._records(platform, venue_id):
+            if kind == TYPES:
+                types.append(added.decode())
+                continue
+            if (want_day is not None and day != want_day) or (party_size is not None and size != party_size):
+                continue
+            state = states.setdefault((day, size), set())
+            previous = observed_at - gap if gap >= 0 else None
+            if kind == KEYFRAME:
+                added, removed = set(added) - state, state - set(added)
+            for code in removed:
+                state.discard(code)
+                window = open_windows.pop((day, size, code), None)
+                if window:
+                    window.closed_at, window.closed_after = observed_at, previous
+            for code in added:
+                state.add(code)
+                if matches(code):
+                    window = SlotWindow(
+                        _date(day), size, _time(code & _MINUTE_MASK), types[code >> _MINUTE_BITS],
+                        opened_at=observed_at, opened_after=previous,
+                    )
+                    open_windows[(day, size, code)] = window
+                    windows.append(window)
+        return windows
+
+    def series(self, platform: str, venue_id: str) -> list[tuple[str, int]]:
+        """The (date, party size) series stored for a venue."""
+        seen = {(day, size) for _, kind, _, _, day, size, _, _ in self._records(platform, venue_id) if kind != TYPES}
+        return [(_date(day), size) for day, size in sorted(seen)]
+
+
+class ArchivingClient(BookingClient):
+    """
+    BookingClient wrapper that stores every find_slots result in an archive.
+
+    Everything else goes straight to the wrapped client. Archive failures
+    (disk full, bad file) never fail the find; they're counted in
+    archive_errors.
+
+    Args:
+        client: The client to wrap
+        archive: Where to store results
+    """
+
+    def __init__(self, client: BookingClient, archive: AvailabilityArchive):
+        self.client = client
+        self.archive = archive
+        self.archive_errors = 0
+
+    @property
+    def platform_name(self) -> str:
+        return self.client.platform_name
+
+    def find_slots(self, venue_id: str, date: str, party_size: int) -> list[Slot]:
+        slots = self.client.find_slots(venue_id, date, party_size)
+        try:
+            self.archive.record(self.client.platform_name, venue_id, date, party_size, slots)
+        except (OSError, ValueError):
+            self.archive_errors += 1
+        return slots
+
+    def book_slot(self, slot: Slot, date: str, party_size: int) -> BookingConfirmation:
+        return self.client.book_slot(slot, date, party_size)
+
+    def cancel_booking(self, confirmation: BookingConfirmation) -> None:
+        self.client.cancel_booking(confirmation)
+
+    def validate_credentials(self) -> bool:
+        return self.client.validate_credentials()
+
+    def update_credentials(self, credentials: dict) -> None:
+        self.client.update_credentials(credentials)
+
+    def instrument(self, instrumentation: Optional[Instrumentation]) -> None:
+        self.client.instrument(instrumentation)
+
+    @property
+    def instrumentation(self) -> Optional[Instrumentation]:
+        return self.client.instrumentation
+
+    def __getattr__(self, name: str):
+        # Platform-specific extras (session, login, ...) of the wrapped client
+        return getattr(self.client, name)
@@ -6,10 +6,17 @@ BookingClient ABC so the CLI, Lambda handler, and scheduler can work
 with any platform through a single interface.
 """
 
+import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from typing import Optional
 
+from .instrumentation import Instrumentation
+
+
+# Shortest timeout given to a request, however close the deadline
+MIN_REQUEST_TIMEOUT = 0.1
+
 
 @dataclass
 class Slot:
@@ -33,14 +40,52 @@ class BookingConfirmation:
 class BookingClientError(Exception):
     """Base exception for booking client errors."""
 
-    def __init__(self, message: str, platform: str = "unknown"):
+    def __init__(
+        self,
+        message: str,
+        platform: str = "unknown",
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+        transient: bool = False,
+        outcome_unknown: bool = False,
+    ):
         self.platform = platform
+        self.status_code = status_code
+        # Seconds from the response's Retry-After header, if it sent one
+        self.retry_after = retry_after
+        # The request never completed (connection error, timeout), so trying
+        # again may work; a response that didn't say what was expected won't
+        self.transient = transient
+        # A booking request that may have reached the server before it failed
+        # (read timeout, dropped response): it may have gone through, so it
+        # must not be retried
+        self.outcome_unknown = outcome_unknown
         super().__init__(f"[{platform}] {message}")
 
 
 class BookingClient(ABC):
     """Abstract base class for platform booking clients."""
 
+    # Per-phase timing recorder; None disables recording
+    instrumentation: Optional[Instrumentation] = None
+
+    # time.monotonic() by which requests must have finished; None for no limit
+    deadline: Optional[float] = None
+
+    def instrument(self, instrumentation: Optional[Instrumentation]) -> None:
+        """Record per-phase timings of this client's requests into instrumentation."""
+        self.instrumentation = instrumentation
+
+    def set_deadline(self, deadline: Optional[float]) -> None:
+        """Time requests out at deadline (time.monotonic()), so none outlives its invocation."""
+        self.deadline = deadline
+
+    def request_timeout(self) -> Optional[float]:
+        """Seconds the next request may take: what's left before the deadline, or None."""
+        if self.deadline is None:
+            return None
+        return max(MIN_REQUEST_TIMEOUT, self.deadline - time.monotonic())
+
     @property
     @abstractmethod
     def platform_name(self) -> str:
@@ -79,3 +124,35 @@ class BookingClient(ABC):
             BookingClientError: If the booking fails
         """
         ...
+
+    def validate_credentials(self) -> bool:
+        """
+        Check whether the client's current credentials are still accepted.
+
+        Platforms without a cheap check return True.
+        """
+        return True
+
+    @abstractmethod
+    def cancel_booking(self, confirmation: BookingConfirmation) -> None:
+        """
+        Cancel a reservation this platform confirmed.
+
+        Args:
+            confirmation: The BookingConfirmation book_slot returned (its
+                details carry the platform's cancellation token)
+
+        Raises:
+            BookingClientError: If the cancellation is refused or fails
+        """
+        ...
+
+    @abstractmethod
+    def update_credentials(self, credentials: dict) -> None:
+        """
+        Hot-swap credentials on a live client.
+
+        Args:
+            credentials: Platform-specific credential dict (same shape as create_client takes)
+        """
+        ...
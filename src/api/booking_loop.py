@@ -0,0 +1,306 @@
+"""
+The find → select → book retry loop shared by the CLI and Lambda handler.
+
+Both entry points previously carried their own copy of this loop. Keeping a
+single implementation with injectable sleep and logging lets the release-day
+simulator run exactly the code that runs in production, on a virtual clock.
+
+Given a Deadline (the Lambda handler's comes from the invocation's remaining
+time), the loop is driven by time rather than a count: it keeps polling past
+retry_count while there's time for a search and a booking after it, and
+never starts a booking it couldn't finish. Stopping for the deadline is a
+normal outcome (out_of_time), not the invocation being killed mid-booking.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Union
+
+from .base import BookingClient, BookingClientError, BookingConfirmation, Slot
+from .instrumentation import Instrumentation, traced, traced_sleep
+from .logs import get_logger
+from .retry_policy import BACKOFF, FATAL, NEXT_CANDIDATE, REFRESH, RetryPolicy
+from .slot_selection import select_best_slot
+from .time_preferences import TimePreferences
+
+
+logger = get_logger("booking")
+
+
+# Seconds kept back for a booking (details and book requests) before the deadline
+DEFAULT_BOOKING_RESERVE = 2.0
+# Fastest polling once past retry_count, waiting for the deadline
+DEFAULT_POLL_INTERVAL = 0.5
+
+
+@dataclass
+class Deadline:
+    """
+    When a booking loop must have stopped, and how much time its steps need.
+
+    The time kept for a search is the longest one seen so far, and for a
+    booking the longest seen or booking_reserve, whichever is more; the
+    loop only starts a step if what follows it still fits.
+
+    Args:
+        at: time.monotonic() by which the loop must have returned
+        booking_reserve: Least time kept for a booking
+        poll_interval: Least wait between searches once past retry_count
+        keep_polling: Keep searching past retry_count until the deadline
+        clock: Monotonic time source
+    """
+    at: float
+    booking_reserve: float = DEFAULT_BOOKING_RESERVE
+    poll_interval: float = DEFAULT_POLL_INTERVAL
+    keep_polling: bool = True
+    clock: Callable[[], float] = time.monotonic
+    search_time: float = field(default=0.0, init=False)
+    booking_time: float = field(default=0.0, init=False)
+
+    @classmethod
+    def after(cls, seconds: float, **kwargs) -> "Deadline":
+        clock = kwargs.get("clock", time.monotonic)
+        return cls(clock() + seconds, **kwargs)
+
+    def remaining(self) -> float:
+        return self.at - self.clock()
+
+    def _booking(self) -> float:
+        return max(self.booking_reserve, self.booking_time)
+
+    def can_search(self, after: float = 0.0) -> bool:
+        """Whether a search (after waiting `after` seconds) and a booking still fit."""
+        return self.remaining() - after > self.search_time + self._booking()
+
+    def can_book(self) -> bool:
+        return self.remaining() > self._booking()
+
+    def searched(self, seconds: float) -> None:
+        self.search_time = max(self.search_time, seconds)
+
+    def booked(self, seconds: float) -> None:
+        self.booking_time = max(self.booking_time, seconds)
+
+
+@dataclass
+class BookingOutcome:
+    """Result of a run of the booking loop."""
+    success: bool
+    attempts: int
+    slot: Optional[Slot] = None
+    confirmation: Optional[BookingConfirmation] = None
+    error: Optional[str] = None
+    dry_run: bool = False
+    error_category: Optional[str] = None
+    # Stopped by the deadline rather than running out of attempts; error is the last one seen, if any
+    out_of_time: bool = False
+    # Stopped because the booking was no longer wanted (see api.fanout)
+    cancelled: bool = False
+    # Stopped because a booking request failed after it may have gone through
+    # (see BookingClientError.outcome_unknown); check the account for it
+    outcome_unknown: bool = False
+
+
+def _select(slots, preferences, table_types, instrumentation) -> Optional[Slot]:
+    if instrumentation:
+        with instrumentation.phase("selection"):
+            return select_best_slot(slots, preferences, table_types)
+    return select_best_slot(slots, preferences, table_types)
+
+
+def attempt_booking(
+    client: BookingClient,
+    venue_id: str,
+    date: str,
+    party_size: int,
+    preferences: Union[TimePreferences, list[str]],
+    table_types: Optional[list[str]] = None,
+    retry_count: int = 3,
+    retry_delay: float = 0.0,
+    dry_run: bool = False,
+    instrumentation: Optional[Instrumentation] = None,
+    policy: Optional[RetryPolicy] = None,
+    refresh: Optional[Callable[[], bool]] = None,
+    sleep: Callable[[float], None] = time.sleep,
+    log: Callable[[str], None] = logger.info,
+    deadline: Optional[Deadline] = None,
+    cancelled: Optional[Callable[[], bool]] = None,
+) -> BookingOutcome:
+    """
+    Find, select and book a slot, retrying up to retry_count times.
+
+    Each attempt starts with a search. Without a policy every client error
+    waits retry_delay and tries again. With one, the error's category picks
+    the response: moving straight on to the next candidate from the same
+    search (which doesn't use up an attempt), backing off, refreshing
+    credentials, or giving up. A booking whose outcome is unknown (its
+    request failed after it may have been sent) is never retried.
+
+    Args:
+        client: Platform client to use
+        venue_id, date, party_size: What to book
+        preferences: Compiled time preferences, or times in HH:MM:SS format, best first
+        table_types: Optional table type preferences
+        retry_count: Maximum number of searches
+        retry_delay: Seconds to wait after an empty search (and after
+                     errors, when there's no policy)
+        dry_run: Stop after selecting a slot
+        instrumentation: Records selection timing and the 'confirmed' mark,
+                         and with a tracer, spans for each search, booking and wait
+        policy: Error classification and per-category actions
+        refresh: Refreshes credentials for the policy's refresh action;
+                 returns True if the retry should go ahead
+        sleep: Sleep function (replaced with a virtual clock in simulation)
+        log: Progress output
+        deadline: Stop in time for it, polling past retry_count until then
+                  if it says to keep polling
+        cancelled: Checked before each search and booking; the loop stops
+                   (outcome.cancelled) once it returns True
+
+    Returns:
+        BookingOutcome describing what happened
+    """
+    last_error = None
+    last_category = None
+    attempt = 0
+    slots: list[Slot] = []
+    candidates: list[Slot] = []  # rest of the last search, after losing a slot
+    candidates_tried = 0
+    sleep = traced_sleep(sleep, instrumentation)
+    polling = deadline is not None and deadline.keep_polling
+    out_of_time = False
+    stopped = False
+
+    def wait(seconds: float) -> bool:
+        """Wait before the next search; False if the deadline leaves no time for one."""
+        nonlocal out_of_time
+        if attempt >= retry_count:
+            if not polling:
+                return True  # no next search
+            seconds = max(seconds, deadline.poll_interval)
+        if deadline is not None and not deadline.can_search(after=seconds):
+            out_of_time = True
+            return False
+        sleep(seconds)
+        return True
+
+    while attempt < retry_count or candidates or polling:
+        selected_slot = None
+        try:
+            if candidates:
+                slots, candidates = candidates, []
+            else:
+                if cancelled is not None and cancelled():
+                    stopped = True
+                    break
+                if deadline is not None and not deadline.can_search():
+                    out_of_time = True
+                    break
+                attempt += 1
+                candidates_tried = 0
+                if attempt > retry_count:
+                    log(f"Attempt {attempt} ({deadline.remaining():.1f}s left)...")
+                else:
+                    log(f"Attempt {attempt}/{retry_count}...")
+
+                # Find available slots
+                started = deadline.clock() if deadline is not None else 0.0
+                try:
+                    with traced(instrumentation, "search", attempt=attempt) as span:
+                        slots = client.find_slots(venue_id, date, party_size)
+                        if span:
+                            span.attributes["slots"] = len(slots)
+                finally:
+                    if deadline is not None:
+                        deadline.searched(deadline.clock() - started)
+
+                if not slots:
+                    log("  No slots available.")
+                    last_error = "No slots available"
+                    if not wait(retry_delay):
+                        break
+                    continue
+
+                log(f"  Found {len(slots)} available slots")
+
+            selected_slot = _select(slots, preferences, table_types, instrumentation)
+
+            if not selected_slot:
+                log("  No slots match preferred times.")
+                last_error = "No slots match preferred times"
+                # After losing a slot the next search can follow immediately
+                if not candidates_tried and not wait(retry_delay):
+                    break
+                continue
+
+            log(f"  Selected: {selected_slot.time} - {selected_slot.table_type}")
+
+            if dry_run:
+                return BookingOutcome(success=True, attempts=attempt, slot=selected_slot, dry_run=True)
+
+            if cancelled is not None and cancelled():
+                stopped = True
+                break
+            if deadline is not None and not deadline.can_book():
+                log(f"  Not booking: {deadline.remaining():.1f}s left")
+                out_of_time = True
+                break
+
+            started = deadline.clock() if deadline is not None else 0.0
+            try:
+                with traced(instrumentation, "booking", attempt=attempt, time=selected_slot.time,
+                            table_type=selected_slot.table_type):
+                    result = client.book_slot(selected_slot, date, party_size)
+            finally:
+                if deadline is not None:
+                    deadline.booked(deadline.clock() - started)
+            if instrumentation:
+                instrumentation.mark("confirmed")
+
+            return BookingOutcome(success=True, attempts=attempt, slot=selected_slot, confirmation=result)
+
+        except BookingClientError as e:
+            log(f"  Error: {e}")
+            last_error = str(e)
+
+            if e.outcome_unknown:
+                # Whatever the policy says: the booking may have gone through
+                log("  Booking outcome unknown; not retrying")
+                return BookingOutcome(success=False, attempts=attempt, slot=selected_slot, error=last_error,
+                                      error_category=FATAL, outcome_unknown=True)
+
+            if policy is None:
+                if not wait(retry_delay):
+                    break
+                continue
+
+            decision = policy.decide(e, attempt)
+            last_category = decision.category
+            log(f"  {decision.category}: {decision.action}")
+
+            if decision.action == NEXT_CANDIDATE:
+                if selected_slot and candidates_tried < policy.max_candidates:
+                    candidates = [s for s in slots if s is not selected_slot]
+                    candidates_tried += 1
+                # Otherwise search again straight away
+            elif decision.action == REFRESH:
+                if not (refresh and refresh()):
+                    break
+            elif decision.action == BACKOFF:
+                if not wait(decision.delay):
+                    break
+            else:
+                break
+
+    if stopped:
+        log(f"  Cancelled after {attempt} attempts")
+        return BookingOutcome(success=False, attempts=attempt, error="Cancelled", cancelled=True)
+    if out_of_time:
+        log(f"  Out of time after {attempt} attempts")
+    return BookingOutcome(
+        success=False,
+        attempts=attempt,
+        error=last_error or ("Out of time" if out_of_time else None),
+        error_category=last_category,
+        out_of_time=out_of_time,
+    )
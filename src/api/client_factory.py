@@ -6,17 +6,23 @@ nested format for multi-platform configs.
 """
 
 import json
+from typing import TYPE_CHECKING, Optional
 
 from .base import BookingClient, BookingClientError
 
+if TYPE_CHECKING:
+    import requests
 
-def create_client(platform: str, credentials: dict) -> BookingClient:
+
+def create_client(platform: str, credentials: dict, session: Optional["requests.Session"] = None) -> BookingClient:
     """
     Create a booking client for the given platform.
 
     Args:
         platform: Platform name ('resy', 'opentable')
         credentials: Platform-specific credential dict
+        session: requests.Session to send on, shared with other clients;
+            the client creates its own without one
 
     Returns:
         A configured BookingClient instance
@@ -26,20 +32,23 @@ def create_client(platform: str, credentials: dict) -> BookingClient:
     """
     if platform == "resy":
         from .resy_client import ResyClient
+        kwargs = {"base_url": credentials["base_url"]} if credentials.get("base_url") else {}
         return ResyClient(
             api_key=credentials["api_key"],
             auth_token=credentials["auth_token"],
+            session=session,
+            **kwargs,
         )
     elif platform == "opentable":
         from .opentable_client import OpenTableClient
-        return OpenTableClient(credentials)
+        return OpenTableClient(credentials, session=session)
     else:
         raise BookingClientError(f"Unknown platform: {platform}", platform=platform)
 
 
-def load_client_from_config(platform: str = "resy", config_path: str = "config.json") -> BookingClient:
+def load_credentials_from_config(platform: str = "resy", config_path: str = "config.json") -> dict:
     """
-    Load a booking client from a config file.
+    Load a platform's credential dict from a config file.
 
     Supports two config formats:
 
@@ -54,17 +63,17 @@ def load_client_from_config(platform: str = "resy", config_path: str = "config.j
         config_path: Path to JSON config file
 
     Returns:
-        A configured BookingClient instance
+        The platform-specific credential dict
     """
     with open(config_path) as f:
         config = json.load(f)
 
     # Check for nested format first
     if platform in config and isinstance(config[platform], dict):
-        credentials = config[platform]
+        return config[platform]
     elif platform == "resy" and "api_key" in config:
         # Legacy flat format — only works for Resy
-        credentials = config
+        return config
     else:
         raise BookingClientError(
             f"No credentials found for platform '{platform}' in {config_path}. "
@@ -72,4 +81,18 @@ def load_client_from_config(platform: str = "resy", config_path: str = "config.j
             platform=platform,
         )
 
-    return create_client(platform, credentials)
+
+def load_client_from_config(platform: str = "resy", config_path: str = "config.json") -> BookingClient:
+    """
+    Load a booking client from a config file.
+
+    See load_credentials_from_config for the supported config formats.
+
+    Args:
+        platform: Platform name ('resy', 'opentable')
+        config_path: Path to JSON config file
+
+    Returns:
+        A configured BookingClient instance
+    """
+    return create_client(platform, load_credentials_from_config(platform, config_path))
@@ -0,0 +1,155 @@
+"""
+Single-flight coalescing of identical availability queries.
+
+When several jobs in one process target the same venue, date and party size
+at the same release instant, each would send its own find request to the
+platform at the worst possible moment. CoalescingClient wraps a client so
+that concurrent identical find_slots calls share one in-flight request: the
+first caller (the leader) makes it, and everyone who asks while it's in
+flight waits for and receives the same result, or the same exception.
+
+Only in-flight requests are shared; once a request completes the next call
+goes to the platform again, so nobody gets a stale answer.
+
+Several clients (e.g. one per user account) can share a SingleFlight group,
+since availability doesn't depend on who asks.
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional
+
+from .base import BookingClient, BookingConfirmation, Slot
+from .instrumentation import Instrumentation
+
+
+@dataclass
+class CoalescingMetrics:
+    """How many calls were answered by someone else's request."""
+    calls: int = 0
+    requests: int = 0
+    errors: int = 0
+
+    @property
+    def saved(self) -> int:
+        return self.calls - self.requests
+
+    @property
+    def saved_ratio(self) -> float:
+        return self.saved / self.calls if self.calls else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "requests": self.requests,
+            "saved": self.saved,
+            "saved_ratio": round(self.saved_ratio, 3),
+            "errors": self.errors,
+        }
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers share its outcome."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: dict[Hashable, _Flight] = {}
+        self.metrics = CoalescingMetrics()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Call fn, or wait for the identical call already in flight.
+
+        Raises:
+            Whatever fn raised, to the leader and every waiter alike
+        """
+        with self._lock:
+            self.metrics.calls += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.metrics.requests += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self.metrics.errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+
+class CoalescingClient(BookingClient):
+    """
+    BookingClient wrapper that coalesces concurrent identical find_slots calls.
+
+    Everything else (booking, credentials, instrumentation) goes straight
+    to the wrapped client.
+
+    Args:
+        client: The client to wrap
+        group: SingleFlight to share with other wrappers; a private one by default
+    """
+
+    def __init__(self, client: BookingClient, group: Optional[SingleFlight] = None):
+        self.client = client
+        self.group = group or SingleFlight()
+
+    @property
+    def metrics(self) -> CoalescingMetrics:
+        return self.group.metrics
+
+    @property
+    def platform_name(self) -> str:
+        return self.client.platform_name
+
+    def find_slots(self, venue_id: str, date: str, party_size: int) -> list[Slot]:
+        key = (self.client.platform_name, str(venue_id), date, party_size)
+        slots = self.group.do(key, lambda: self.client.find_slots(venue_id, date, party_size))
+        # Callers may filter the list; the Slot objects themselves are shared
+        return list(slots)
+
+    def book_slot(self, slot: Slot, date: str, party_size: int) -> BookingConfirmation:
+        return self.client.book_slot(slot, date, party_size)
+
+    def cancel_booking(self, confirmation: BookingConfirmation) -> None:
+        self.client.cancel_booking(confirmation)
+
+    def validate_credentials(self) -> bool:
+        return self.client.validate_credentials()
+
+    def update_credentials(self, credentials: dict) -> None:
+        self.client.update_credentials(credentials)
+
+    def instrument(self, instrumentation: Optional[Instrumentation]) -> None:
+        self.client.instrument(instrumentation)
+
+    @property
+    def instrumentation(self) -> Optional[Instrumentation]:
+        return self.client.instrumentation
+
+    def set_deadline(self, deadline: Optional[float]) -> None:
+        self.client.set_deadline(deadline)
+
+    def __getattr__(self, name: str):
+        # Platform-specific extras (session, login, ...) of the wrapped client
+        return getattr(self.client, name)
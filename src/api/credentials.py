@@ -0,0 +1,308 @@
+"""
+Credential lifecycle management for booking clients.
+
+Resy auth tokens and OpenTable session cookies both expire, and until now we
+only found out when the booking call failed at the release instant. The
+CredentialManager tracks when each platform's credentials expire, validates
+them ahead of a scheduled fire, refreshes them in the background where the
+platform allows it (Resy password login), and hot-swaps the result into
+every live client that was attached to it.
+"""
+
+import base64
+import json
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional
+
+from .base import BookingClient, BookingClientError
+from .logs import get_logger
+
+
+logger = get_logger("credentials")
+
+
+# HTTP statuses the platforms use for expired or rejected credentials
+AUTH_FAILURE_STATUSES = (401, 403, 419)
+
+
+class CredentialError(BookingClientError):
+    """Raised when credentials are invalid and cannot be refreshed."""
+
+
+@dataclass
+class CredentialState:
+    """Current credentials for one platform and what we know about them."""
+    platform: str
+    credentials: dict
+    expires_at: Optional[float] = None  # epoch seconds, None if unknown
+    validated_at: Optional[float] = None
+    refreshed_at: Optional[float] = None
+    last_error: Optional[str] = None
+
+
+def resy_token_expiry(auth_token: str) -> Optional[float]:
+    """Read the exp claim from a Resy auth token (a JWT). Returns None if it can't be decoded."""
+    try:
+        payload = auth_token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        return float(claims["exp"])
+    except (IndexError, KeyError, ValueError, TypeError):
+        return None
+
+
+def configured_expiry(credentials: dict) -> Optional[float]:
+    """
+    Read an explicit expires_at from a credential dict.
+
+    Accepts epoch seconds or an ISO-8601 timestamp. OpenTable cookies are
+    captured by hand, so the capture date plus the cookie lifetime is the
+    only expiry we have for them.
+    """
+    value = credentials.get("expires_at")
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+def credential_expiry(platform: str, credentials: dict) -> Optional[float]:
+    """Best known expiry for a platform's credentials."""
+    if platform == "resy":
+        return resy_token_expiry(credentials.get("auth_token", "")) or configured_expiry(credentials)
+    return configured_expiry(credentials)
+
+
+def refresh_resy(credentials: dict) -> dict:
+    """Obtain a new Resy auth token through the password login flow."""
+    email = credentials.get("email")
+    password = credentials.get("password")
+    if not email or not password:
+        raise CredentialError(
+            "Auth token needs refreshing but no email/password is configured",
+            platform="resy",
+        )
+
+    from .resy_client import BASE_URL, ResyClient
+    client = ResyClient(
+        api_key=credentials["api_key"],
+        auth_token="",
+        base_url=credentials.get("base_url") or BASE_URL,
+    )
+    token = client.login(email, password)
+    return {**credentials, "auth_token": token}
+
+
+def refresh_opentable(credentials: dict) -> dict:
+    """OpenTable sessions can only be recaptured from a browser."""
+    raise CredentialError(
+        "Session expired or expiring — recapture csrf_token and cookies from the browser",
+        platform="opentable",
+    )
+
+
+DEFAULT_REFRESHERS: dict[str, Callable[[dict], dict]] = {
+    "resy": refresh_resy,
+    "opentable": refresh_opentable,
+}
+
+
+def is_auth_failure(error: BookingClientError) -> bool:
+    """True if a client error means the credentials were rejected."""
+    return error.status_code in AUTH_FAILURE_STATUSES
+
+
+class CredentialManager:
+    """
+    Tracks, validates, refreshes and hot-swaps platform credentials.
+
+    Typical use:
+        manager = CredentialManager()
+        manager.register("resy", credentials)
+        manager.attach(client)
+        manager.prepare_for_fire("resy", fire_at)  # background refresh before the release
+    """
+
+    def __init__(
+        self,
+        refresh_margin: float = 3600,
+        refreshers: Optional[dict[str, Callable[[dict], dict]]] = None,
+        on_refresh: Optional[Callable[[str, dict], None]] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            refresh_margin: Refresh credentials expiring within this many seconds of when they're needed
+            refreshers: Per-platform refresh functions (credentials -> new credentials)
+            on_refresh: Called with (platform, credentials) after a refresh, e.g. to persist them
+            clock: Time source in epoch seconds
+        """
+        self.refresh_margin = refresh_margin
+        self.refreshers = {**DEFAULT_REFRESHERS, **(refreshers or {})}
+        self.on_refresh = on_refresh
+        self.clock = clock
+        self._states: dict[str, CredentialState] = {}
+        self._clients: dict[str, list[BookingClient]] = {}
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def register(self, platform: str, credentials: dict) -> CredentialState:
+        """Start tracking a platform's credentials."""
+        with self._lock:
+            state = CredentialState(
+                platform=platform,
+                credentials=dict(credentials),
+                expires_at=credential_expiry(platform, credentials),
+            )
+            self._states[platform] = state
+            return state
+
+    def attach(self, client: BookingClient) -> None:
+        """Keep a live client in sync with future refreshes (until it's detached)."""
+        with self._lock:
+            self._clients.setdefault(client.platform_name, []).append(client)
+
+    def detach(self, client: BookingClient) -> None:
+        """Stop syncing a client that's done; long-running callers must, or attached clients pile up."""
+        with self._lock:
+            clients = self._clients.get(client.platform_name, [])
+            if client in clients:
+                clients.remove(client)
+
+    def state(self, platform: str) -> CredentialState:
+        with self._lock:
+            if platform not in self._states:
+                raise CredentialError("No credentials registered", platform=platform)
+            return self._states[platform]
+
+    def credentials(self, platform: str) -> dict:
+        """Current credentials for a platform."""
+        return dict(self.state(platform).credentials)
+
+    def needs_refresh(self, platform: str, at: Optional[float] = None) -> bool:
+        """True if the credentials will be expired (or within the margin) at the given time."""
+        expires_at = self.state(platform).expires_at
+        if expires_at is None:
+            return False
+        at = self.clock() if at is None else at
+        return expires_at - self.refresh_margin <= at
+
+    def validate(self, platform: str) -> bool:
+        """Check the credentials against the platform using an attached (or throwaway) client."""
+        state = self.state(platform)
+        with self._lock:
+            clients = list(self._clients.get(platform, []))
+        if clients:
+            client = clients[0]
+        else:
+            from .client_factory import create_client
+            client = create_client(platform, state.credentials)
+
+        try:
+            valid = client.validate_credentials()
+        except BookingClientError as e:
+            status = e.status_code
+            if e.transient or status == 429 or (status is not None and status >= 500):
+                # Network trouble or a struggling server isn't proof the credentials are bad
+                state.last_error = f"Validation inconclusive: {e}"
+                return True
+            state.last_error = str(e)
+            return False
+        except Exception as e:
+            # Network trouble isn't proof the credentials are bad
+            state.last_error = f"Validation request failed: {e}"
+            return True
+
+        if valid:
+            state.validated_at = self.clock()
+        else:
+            state.last_error = "Credentials rejected by platform"
+        return valid
+
+    def refresh(self, platform: str) -> dict:
+        """Refresh credentials now and hot-swap them into attached clients."""
+        state = self.state(platform)
+        refresher = self.refreshers.get(platform)
+        if refresher is None:
+            raise CredentialError("No refresh flow available", platform=platform)
+
+        try:
+            credentials = refresher(state.credentials)
+        except BookingClientError as e:
+            state.last_error = str(e)
+            raise
+
+        self._swap(platform, credentials)
+        if self.on_refresh:
+            try:
+                self.on_refresh(platform, credentials)
+            except Exception as e:
+                # The live clients already have the new credentials; persisting is best-effort
+                logger.warning(f"Could not persist refreshed {platform} credentials: {e}")
+        return credentials
+
+    def _swap(self, platform: str, credentials: dict) -> None:
+        with self._lock:
+            state = self._states[platform]
+            state.credentials = dict(credentials)
+            state.expires_at = credential_expiry(platform, credentials)
+            state.refreshed_at = self.clock()
+            state.validated_at = self.clock()
+            state.last_error = None
+            for client in self._clients.get(platform, []):
+                client.update_credentials(credentials)
+
+    def ensure_fresh(self, platform: str, needed_at: Optional[float] = None, validate: bool = True) -> dict:
+        """
+        Make sure the credentials will be usable at needed_at, refreshing if not.
+
+        Args:
+            platform: Platform name
+            needed_at: Epoch seconds when the credentials must work (default: now)
+            validate: Also check the credentials against the platform
+
+        Returns:
+            The credentials that will be used
+
+        Raises:
+            CredentialError: If they are expiring or rejected and can't be refreshed
+        """
+        if self.needs_refresh(platform, needed_at):
+            return self.refresh(platform)
+        if validate and not self.validate(platform):
+            return self.refresh(platform)
+        return self.credentials(platform)
+
+    def prepare_for_fire(self, platform: str, fire_at: float, lead: float = 120) -> threading.Thread:
+        """
+        Refresh in the background so credentials are known-good when fire_at arrives.
+
+        Checks immediately, then re-validates `lead` seconds before the fire
+        time. Failures are recorded on the state rather than raised, since
+        the thread has nobody to raise to.
+        """
+        def run():
+            for check_at in (self.clock(), fire_at - lead):
+                if self._stop.wait(max(0.0, check_at - self.clock())):
+                    return
+                try:
+                    self.ensure_fresh(platform, needed_at=fire_at)
+                except BookingClientError as e:
+                    logger.warning(f"Credential check for {platform} failed: {e}")
+
+        thread = threading.Thread(target=run, name=f"credentials-{platform}", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return thread
+
+    def stop(self) -> None:
+        """Stop any background refresh threads."""
+        self._stop.set()
@@ -0,0 +1,509 @@
+"""
+Fan a booking out across parallel worker invocations.
+
+On a big release one invocation's network concurrency becomes the limit:
+forty candidate (date, venue, party size) combinations are too many to
+poll from one process. The coordinator splits the candidates into shards
+and invokes one worker per shard, all at once; each worker books its
+shard's candidates concurrently, like a batch (see lambda_handler.py), and
+any confirmed booking will do.
+
+The first worker to confirm a booking sets the fan-out's cancellation flag
+in a shared store. Every worker watches the flag and stops its bookings
+before their next search or booking; ones that haven't started don't. A
+booking already in flight when the flag is set still completes, so two
+shards can occasionally both confirm. Given a way to reach the platforms,
+the coordinator keeps the best of them and cancels the rest as soon as
+every worker has returned (see api/reconcile.py); otherwise it returns the
+first confirmation as the booking and lists any others under
+extra_confirmations.
+
+Candidates are given as a list of booking events, or as one booking plus
+the values to vary (every combination is a candidate, in order):
+
+    {"action": "fan_out", "booking": {...}, "vary": {"date": [...], "party_size": [2, 3]}, "shards": 4}
+    {"action": "fan_out", "bookings": [{...}, {...}], "shards": 4}
+
+Shards are dealt round-robin, so the most preferred candidates start first
+on every worker.
+
+Invokers (how a shard runs):
+
+    LambdaInvoker     a synchronous invocation of a Lambda function (no
+                      automatic retries, which could book twice)
+    InProcessInvoker  calls a handler function in this process; the
+                      stand-in for tests and local runs
+
+Cancellation stores:
+
+    MemoryCancellationStore    one process; works with InProcessInvoker
+    DynamoDBCancellationStore  a DynamoDB table keyed by "fanout_id"
+
+open_invoker() and open_cancellation_store() pick one from a target string.
+"""
+
+import itertools
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from .base import BookingClient
+from .logs import get_logger
+from .reconcile import AuditLog, reconcile
+
+
+logger = get_logger("fanout")
+
+
+DEFAULT_SHARDS = 4
+# How often a worker checks the cancellation store
+DEFAULT_CANCEL_CHECK_INTERVAL = 0.2
+# How long cancellation flags are kept (DynamoDB TTL)
+FLAG_TTL = 24 * 3600
+# Candidate fields copied onto its confirmation, to tell it apart and rank it
+CONFIRMATION_FIELDS = ("date", "party_size", "venue_id", "venues", "best", "earliest", "latest", "tolerance")
+# Fields of a candidate that can be varied
+VARY_FIELDS = ("date", "venue_id", "platform", "venues", "party_size", "best", "earliest", "latest")
+
+
+class CancellationStore(ABC):
+    """
+    Where a fan-out's cancellation flag is kept, shared by all its workers.
+
+    `url` is what a worker passes to open_cancellation_store() to reach the
+    same store.
+    """
+
+    url: str
+
+    @abstractmethod
+    def cancel(self, fanout_id: str, reason: str = "") -> bool:
+        """Set the flag; returns True if this call set it (False if it was already set)."""
+        ...
+
+    @abstractmethod
+    def is_cancelled(self, fanout_id: str) -> bool:
+        ...
+
+
+class MemoryCancellationStore(CancellationStore):
+    """Flags held in this process, shared by name (memory://NAME)."""
+
+    _stores: dict[str, "MemoryCancellationStore"] = {}
+    _stores_lock = threading.Lock()
+
+    def __init__(self, name: str = "default"):
+        self.url = f"memory://{name}"
+        self._flags: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def named(cls, name: str) -> "MemoryCancellationStore":
+        with cls._stores_lock:
+            if name not in cls._stores:
+                cls._stores[name] = cls(name)
+            return cls._stores[name]
+
+    def cancel(self, fanout_id: str, reason: str = "") -> bool:
+        with self._lock:
+            if fanout_id in self._flags:
+                return False
+            self._flags[fanout_id] = reason
+            return True
+
+    def is_cancelled(self, fanout_id: str) -> bool:
+        with self._lock:
+            return fanout_id in self._flags
+
+
+class DynamoDBCancellationStore(CancellationStore):
+    """
+    Flags as items of a DynamoDB table whose partition key is "fanout_id".
+
+    Items expire after FLAG_TTL through the table's "expires_at" TTL
+    attribute, if TTL is enabled on it.
+
+    Args:
+        table: Table name
+        region: AWS region
+        client: boto3 DynamoDB client; created on first use by default
+    """
+
+    def __init__(self, table: str, region: str = "us-east-1", client=None):
+        self.table = table
+        self.region = region
+        self.url = f"dynamodb://{table}?region={region}"
+        self._client = client
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        # Can be first used from several threads at once, and boto3's default
+        # session isn't safe to create clients from concurrently
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import boto3
+                    self._client = boto3.session.Session().client("dynamodb", region_name=self.region)
+        return self._client
+
+    def cancel(self, fanout_id: str, reason: str = "") -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.put_item(
+                TableName=self.table,
+                Item={
+                    "fanout_id": {"S": fanout_id},
+                    "reason": {"S": reason},
+                    "cancelled_at": {"N": str(time.time())},
+                    "expires_at": {"N": str(int(time.time() + FLAG_TTL))},
+                },
+                ConditionExpression="attribute_not_exists(fanout_id)",
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise
+        return True
+
+    def is_cancelled(self, fanout_id: str) -> bool:
+        response = self.client.get_item(
+            TableName=self.table,
+            Key={"fanout_id": {"S": fanout_id}},
+            ProjectionExpression="fanout_id",
+            ConsistentRead=True,
+        )
+        return "Item" in response
+
+
+def open_cancellation_store(target: str) -> CancellationStore:
+    """
+    The store for a target: memory://NAME (this process only) or
+    dynamodb://TABLE[?region=REGION].
+    """
+    if target.startswith("memory://"):
+        return MemoryCancellationStore.named(target[len("memory://"):] or "default")
+    if target.startswith("dynamodb://"):
+        table, _, query = target[len("dynamodb://"):].partition("?")
+        region = dict(part.split("=", 1) for part in query.split("&") if "=" in part).get("region", "us-east-1")
+        if not table:
+            raise ValueError("Missing DynamoDB table name")
+        return DynamoDBCancellationStore(table, region)
+    raise ValueError(f"Unknown cancellation store '{target}'. Use memory://NAME or dynamodb://TABLE")
+
+
+class CancellationWatcher:
+    """
+    Polls a fan-out's flag in the background so checking it costs nothing.
+
+    The booking loops check cancelled() before every search and booking;
+    with the store behind a network call that would add a round trip each
+    time. Once the flag is seen set, the watcher stops polling.
+
+    Args:
+        store: The fan-out's store
+        fanout_id: The fan-out
+        interval: Seconds between checks
+    """
+
+    def __init__(self, store: CancellationStore, fanout_id: str, interval: float = DEFAULT_CANCEL_CHECK_INTERVAL):
+        self.store = store
+        self.fanout_id = fanout_id
+        self.interval = interval
+        self._cancelled = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="oddjob-cancel-watch", daemon=True)
+
+    def __enter__(self) -> "CancellationWatcher":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stopping.set()
+        self._thread.join(self.interval + 1.0)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                if self.store.is_cancelled(self.fanout_id):
+                    self._cancelled.set()
+                    return
+            except Exception as e:
+                logger.warning(f"Could not check cancellation of {self.fanout_id}: {e}")
+            self._stopping.wait(self.interval)
+
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self, reason: str = "") -> bool:
+        """Set the flag (for this worker straight away, for the others on their next check)."""
+        self._cancelled.set()
+        return self.store.cancel(self.fanout_id, reason)
+
+
+class Invoker(ABC):
+    """Runs one shard and returns its handler's response."""
+
+    @abstractmethod
+    def invoke(self, event: dict) -> dict:
+        """Invoke a worker with event and wait for its response; raise if the invocation itself fails."""
+        ...
+
+
+class InProcessInvoker(Invoker):
+    """
+    Calls a handler (lambda_handler.lambda_handler) in this process, with no context.
+
+    Workers then have no invocation deadline of their own; the coordinator
+    gives each booking a max_duration instead.
+    """
+
+    def __init__(self, handler: Callable[[dict, object], dict]):
+        self.handler = handler
+
+    def invoke(self, event: dict) -> dict:
+        return self.handler(json.loads(json.dumps(event)), None)
+
+
+class LambdaInvoker(Invoker):
+    """
+    Invokes a Lambda function synchronously.
+
+    The client makes no retries of its own: a retried invocation whose
+    first try is still running would book the same candidates twice.
+
+    Args:
+        function_name: Name or ARN of the worker function
+        region: AWS region
+        client: boto3 Lambda client; created on first use by default
+    """
+
+    # Longest a Lambda invocation can run
+    READ_TIMEOUT = 905
+
+    def __init__(self, function_name: str, region: str = "us-east-1", client=None):
+        self.function_name = function_name
+        self.region = region
+        self._client = client
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        # Every shard invokes from its own thread at once (see fan_out), so the
+        # client is created under a lock, from a session of its own
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import boto3
+                    from botocore.config import Config
+                    self._client = boto3.session.Session().client(
+                        "lambda", region_name=self.region,
+                        config=Config(read_timeout=self.READ_TIMEOUT, retries={"total_max_attempts": 1}),
+                    )
+        return self._client
+
+    def invoke(self, event: dict) -> dict:
+        response = self.client.invoke(
+            FunctionName=self.function_name,
+            InvocationType="RequestResponse",
+            Payload=json.dumps(event).encode(),
+        )
+        payload = json.loads(response["Payload"].read() or b"null")
+        if response.get("FunctionError"):
+            raise RuntimeError(f"Worker failed: {payload}")
+        return payload
+
+
+def open_invoker(target: str, handler: Optional[Callable[[dict, object], dict]] = None) -> Invoker:
+    """
+    The invoker for a target: "local" (handler, in this process) or
+    lambda://FUNCTION[?region=REGION].
+    """
+    if target == "local":
+        if handler is None:
+            raise ValueError("The local invoker needs a handler")
+        return InProcessInvoker(handler)
+    if target.startswith("lambda://"):
+        function_name, _, query = target[len("lambda://"):].partition("?")
+        region = dict(part.split("=", 1) for part in query.split("&") if "=" in part).get("region", "us-east-1")
+        if not function_name:
+            raise ValueError("Missing Lambda function name")
+        return LambdaInvoker(function_name, region)
+    raise ValueError(f"Unknown invoker '{target}'. Use local or lambda://FUNCTION")
+
+
+def expand_candidates(event: dict) -> list[dict]:
+    """
+    The candidate bookings of a fan-out event, each with an "id", in order.
+
+    Raises:
+        ValueError: Without candidates, or for a field that can't be varied
+    """
+    if isinstance(event.get("bookings"), list):
+        candidates = [dict(booking) for booking in event["bookings"]]
+    elif isinstance(event.get("booking"), dict):
+        vary = event.get("vary") or {}
+        unknown = sorted(set(vary) - set(VARY_FIELDS))
+        if unknown:
+            raise ValueError(f"Can't vary {', '.join(unknown)}; use {', '.join(VARY_FIELDS)}")
+        if not all(isinstance(values, list) and values for values in vary.values()):
+            raise ValueError("Each varied field needs a non-empty list of values")
+        keys = list(vary)
+        candidates = [
+            {**event["booking"], **dict(zip(keys, values))}
+            for values in itertools.product(*(vary[key] for key in keys))
+        ]
+    else:
+        raise ValueError('A fan-out needs "bookings" or a "booking" to vary')
+    if not candidates:
+        raise ValueError("No candidates to fan out")
+    for i, candidate in enumerate(candidates):
+        candidate.setdefault("id", str(i))
+    return candidates
+
+
+def partition(candidates: list[dict], shards: int) -> list[list[dict]]:
+    """Deal candidates round-robin into at most `shards` non-empty shards."""
+    shards = max(1, min(shards, len(candidates)))
+    return [candidates[i::shards] for i in range(shards)]
+
+
+@dataclass
+class FanOutResult:
+    """What came of a fan-out."""
+    fanout_id: str
+    # The booking kept (a batch result plus its candidate's date, party size, ...):
+    # the best one once reconciled, else the first confirmed
+    booking: Optional[dict] = None
+    # Further confirmations from bookings that were already in flight when the flag was set
+    extra_confirmations: list = field(default_factory=list)
+    # The audit record of cancelling the extra confirmations (ReconcileRecord.to_dict())
+    reconciliation: Optional[dict] = None
+    # Per shard: statusCode, succeeded, failed, cancelled, or the invocation error
+    shards: list = field(default_factory=list)
+    results: list = field(default_factory=list)
+    elapsed_ms: float = 0.0
+
+    @property
+    def success(self) -> bool:
+        return self.booking is not None
+
+    def body(self) -> dict:
+        return {
+            "success": self.success,
+            "fanout_id": self.fanout_id,
+            "booking": self.booking,
+            "extra_confirmations": self.extra_confirmations,
+            "reconciliation": self.reconciliation,
+            "candidates": len(self.results),
+            "attempts": sum(result.get("attempts") or 0 for result in self.results),
+            "shards": self.shards,
+            "elapsed_ms": round(self.elapsed_ms, 1),
+            "results": self.results,
+        }
+
+
+def fan_out(
+    candidates: list[dict],
+    invoker: Invoker,
+    store: CancellationStore,
+    shards: int = DEFAULT_SHARDS,
+    max_workers: Optional[int] = None,
+    fanout_id: Optional[str] = None,
+    client_for: Optional[Callable[[str], BookingClient]] = None,
+    audit: Optional[AuditLog] = None,
+    log: Callable[[str], None] = logger.info,
+) -> FanOutResult:
+    """
+    Run candidates across parallel workers and resolve the first confirmed booking.
+
+    Each shard is invoked as a batch event with a "fanout" section (id,
+    shard number, store URL); see lambda_handler.handle_batch. As soon as a
+    shard reports a confirmation the flag is set (the shard will normally
+    have set it already). Every shard is waited for, so bookings confirmed
+    in the meantime are reported too; with client_for, all but the best
+    are then cancelled.
+
+    Args:
+        candidates: Booking events, each with an "id" (see expand_candidates)
+        invoker: Runs a shard
+        store: Holds the cancellation flag; must be reachable from the workers
+        shards: Most workers invoked
+        max_workers: Concurrent bookings per worker (its candidates by default)
+        fanout_id: Identifies the fan-out and its flag; a new one by default
+        client_for: A client for a platform, to cancel surplus confirmations
+            through; they're only reported without one
+        audit: Where the reconciliation's audit record is written
+        log: Progress output
+
+    Returns:
+        FanOutResult
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    fanout_id = fanout_id or os.urandom(8).hex()
+    started = time.monotonic()
+    result = FanOutResult(fanout_id)
+    by_id = {candidate["id"]: candidate for candidate in candidates}
+    parts = partition(candidates, shards)
+    log(f"Fan-out {fanout_id}: {len(candidates)} candidates over {len(parts)} workers")
+
+    def shard_event(number: int, part: list[dict]) -> dict:
+        return {
+            "bookings": part,
+            "max_workers": max_workers or len(part),
+            "fanout": {"id": fanout_id, "shard": number, "store": store.url},
+        }
+
+    confirmations = []
+    with ThreadPoolExecutor(max_workers=len(parts), thread_name_prefix="oddjob-fanout") as executor:
+        futures = {executor.submit(invoker.invoke, shard_event(i, part)): i for i, part in enumerate(parts)}
+        for future in as_completed(futures):
+            number = futures[future]
+            try:
+                response = future.result()
+                body = json.loads(response["body"])
+            except Exception as e:
+                log(f"  Worker {number} failed: {e}")
+                result.shards.append({"shard": number, "error": str(e)})
+                continue
+
+            shard_results = body.get("results", [])
+            booked = [r for r in shard_results if r.get("statusCode") == 200 and r.get("success")]
+            result.shards.append({
+                "shard": number,
+                "statusCode": response.get("statusCode"),
+                "succeeded": len(booked),
+                "failed": len(shard_results) - len(booked),
+                "cancelled": sum(1 for r in shard_results if r.get("cancelled")),
+            })
+            result.results.extend(shard_results)
+            for booking in booked:
+                candidate = by_id.get(booking.get("id"), {})
+                confirmations.append({
+                    **{key: candidate[key] for key in CONFIRMATION_FIELDS if key in candidate},
+                    **booking,
+                })
+            if booked and store.cancel(fanout_id, f"booked by worker {number}"):
+                log(f"  Worker {number} booked; cancelling the others")
+
+    # Earliest confirmation first; the rest were in flight when the flag went up
+    confirmations.sort(key=lambda booking: booking.get("confirmed_at") or float("inf"))
+    if confirmations:
+        result.booking = confirmations[0]
+        result.extra_confirmations = confirmations[1:]
+    if result.extra_confirmations and client_for is not None:
+        order = {candidate["id"]: i for i, candidate in enumerate(candidates)}
+        record = reconcile(fanout_id, confirmations, client_for, order, audit=audit, log=log)
+        kept = next(b for b in confirmations if b.get("confirmation_id") == record.kept["confirmation_id"])
+        result.booking = kept
+        result.extra_confirmations = [b for b in confirmations if b is not kept]
+        result.reconciliation = record.to_dict()
+    result.shards.sort(key=lambda shard: shard["shard"])
+    result.elapsed_ms = (time.monotonic() - started) * 1000
+    return result
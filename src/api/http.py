@@ -0,0 +1,167 @@
+"""
+HTTP plumbing shared by the platform clients.
+
+Each client gets its own requests.Session so connections are pooled across
+find/details/book calls. The session's adapter uses connection classes that
+time TCP connect (including DNS) and the TLS handshake, which plain
+requests doesn't expose. request() records those alongside the status,
+time-to-first-byte and download time as a PhaseTiming.
+"""
+
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+
+from .instrumentation import Instrumentation, PhaseTiming
+
+
+# Timing for the request currently being sent on this thread; filled in by the connection classes
+_current = threading.local()
+
+
+class _TimedConnectionMixin:
+    def _new_conn(self):
+        started = time.perf_counter()
+        sock = super()._new_conn()
+        timing = getattr(_current, "timing", None)
+        if timing is not None:
+            timing.connect_ms = (time.perf_counter() - started) * 1000
+        return sock
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        timing = getattr(_current, "timing", None)
+        if timing is not None:
+            total_ms = (time.perf_counter() - started) * 1000
+            timing.tls_ms = total_ms - (timing.connect_ms or 0)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools use the timed connection classes."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+def create_session(pool_maxsize: int = 10) -> requests.Session:
+    """
+    A requests.Session with the timed adapter mounted for http and https.
+
+    pool_maxsize is the most connections kept per host; raise it when
+    several threads share the session.
+    """
+    session = requests.Session()
+    adapter = TimedHTTPAdapter(pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def request(
+    session: requests.Session,
+    method: str,
+    url: str,
+    phase: str,
+    instrumentation: Optional[Instrumentation] = None,
+    **kwargs,
+) -> requests.Response:
+    """
+    Send a request and record its timing breakdown.
+
+    The PhaseTiming is also attached to the response as `response.timing`
+    so parse_json() can add the parse time to it.
+    """
+    timing = PhaseTiming(phase=phase, endpoint=urlsplit(url).path, method=method)
+    _current.timing = timing
+    started = time.perf_counter()
+    try:
+        response = session.request(method, url, **kwargs)
+    except requests.RequestException as e:
+        timing.error = type(e).__name__
+        timing.total_ms = (time.perf_counter() - started) * 1000
+        if instrumentation is not None:
+            instrumentation.record(timing)
+        raise
+    finally:
+        _current.timing = None
+
+    timing.total_ms = (time.perf_counter() - started) * 1000
+    timing.status = response.status_code
+    timing.reused_connection = timing.connect_ms is None
+    headers_ms = response.elapsed.total_seconds() * 1000
+    timing.ttfb_ms = max(0.0, headers_ms - (timing.connect_ms or 0) - (timing.tls_ms or 0))
+    timing.download_ms = max(0.0, timing.total_ms - headers_ms)
+
+    response.timing = timing
+    if instrumentation is not None:
+        instrumentation.record(timing)
+    return response
+
+
+def never_sent(error: requests.RequestException) -> bool:
+    """
+    Whether a failed request certainly never reached the server: it failed
+    while connecting (DNS, TCP, TLS or the proxy), before anything was sent.
+
+    A read timeout or a connection dropped after sending could have come
+    after the server acted on the request.
+    """
+    if isinstance(error, (requests.ConnectTimeout, requests.exceptions.SSLError, requests.exceptions.ProxyError)):
+        return True
+    if isinstance(error, requests.ConnectionError):
+        # requests wraps urllib3's MaxRetryError, whose reason is the failure itself
+        reason = error.args[0] if error.args else None
+        return isinstance(getattr(reason, "reason", reason), NewConnectionError)
+    return False
+
+
+def parse_json(response: requests.Response):
+    """response.json(), with the parse time added to the request's PhaseTiming."""
+    started = time.perf_counter()
+    data = response.json()
+    timing = getattr(response, "timing", None)
+    if timing is not None:
+        timing.parse_ms = (time.perf_counter() - started) * 1000
+    return data
+
+
+def retry_after(response: requests.Response) -> Optional[float]:
+    """Seconds to wait per the Retry-After header (delta-seconds or HTTP-date), or None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
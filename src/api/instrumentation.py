@@ -0,0 +1,202 @@
+"""
+Phase-level latency instrumentation for booking clients.
+
+Every HTTP call a client makes is recorded as a PhaseTiming (find, details,
+book, lock, make_reservation) with its connect, TLS, time-to-first-byte,
+download and JSON-parse components. Non-HTTP work such as slot selection is
+recorded through Instrumentation.phase(). Together with the fire and
+confirmation marks this shows where a lost release actually lost its time.
+
+Output is JSON lines, or CloudWatch embedded metric format (EMF) documents
+when running in Lambda. With a tracer (see api.tracing), every timing is
+also recorded as a span of the booking's trace, and span() times other
+steps of the booking under it.
+"""
+
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING, ContextManager, Iterator, Optional, TextIO
+
+if TYPE_CHECKING:
+    from .tracing import Span, Tracer
+
+
+EMF_NAMESPACE = "OddJob"
+
+# Metrics published per phase in EMF output
+EMF_PHASE_METRICS = ("total_ms", "connect_ms", "tls_ms", "ttfb_ms", "download_ms", "parse_ms")
+
+
+@dataclass
+class PhaseTiming:
+    """Timing breakdown for one phase of a booking attempt (milliseconds)."""
+    phase: str
+    endpoint: str = ""
+    method: str = ""
+    status: Optional[int] = None
+    started_at: float = field(default_factory=time.time)
+    total_ms: Optional[float] = None
+    connect_ms: Optional[float] = None  # DNS + TCP; None when a pooled connection was reused
+    tls_ms: Optional[float] = None
+    ttfb_ms: Optional[float] = None
+    download_ms: Optional[float] = None
+    parse_ms: Optional[float] = None
+    reused_connection: Optional[bool] = None
+    error: Optional[str] = None
+
+
+class Instrumentation:
+    """Collects phase timings and end-to-end marks for one booking run."""
+
+    def __init__(self, platform: str = "unknown", clock=time.perf_counter, tracer: Optional["Tracer"] = None):
+        self.platform = platform
+        self.clock = clock
+        self.tracer = tracer
+        self.timings: list[PhaseTiming] = []
+        self.marks: dict[str, float] = {}
+
+    def record(self, timing: PhaseTiming) -> None:
+        self.timings.append(timing)
+        if self.tracer is not None and timing.total_ms is not None:
+            attributes = {
+                k: _round(v) for k, v in asdict(timing).items()
+                if v not in (None, "") and k not in ("phase", "started_at", "total_ms", "error")
+            }
+            self.tracer.record(
+                timing.phase, timing.started_at, timing.started_at + timing.total_ms / 1000,
+                error=timing.error, **attributes,
+            )
+
+    def span(self, name: str, **attributes) -> ContextManager[Optional["Span"]]:
+        """A span of the trace around a block (see api.tracing); does nothing without a tracer."""
+        if self.tracer is None:
+            return nullcontext()
+        return self.tracer.span(name, **attributes)
+
+    def mark(self, name: str) -> None:
+        """Record a named instant (e.g. 'fire', 'confirmed'). The first mark of a name wins."""
+        self.marks.setdefault(name, self.clock())
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[PhaseTiming]:
+        """Time a non-HTTP phase such as slot selection."""
+        timing = PhaseTiming(phase=name)
+        started = self.clock()
+        try:
+            yield timing
+        except Exception as e:
+            timing.error = type(e).__name__
+            raise
+        finally:
+            timing.total_ms = (self.clock() - started) * 1000
+            self.record(timing)
+
+    def elapsed_ms(self, start: str, end: str) -> Optional[float]:
+        """Milliseconds between two marks, or None if either is missing."""
+        if start not in self.marks or end not in self.marks:
+            return None
+        return (self.marks[end] - self.marks[start]) * 1000
+
+    @property
+    def fire_to_confirmation_ms(self) -> Optional[float]:
+        return self.elapsed_ms("fire", "confirmed")
+
+    def summary(self) -> dict:
+        """Compact dict for response bodies: per-phase timings plus the end-to-end figure (and trace ID)."""
+        summary = {
+            "platform": self.platform,
+            "fire_to_confirmation_ms": _round(self.fire_to_confirmation_ms),
+            "phases": [
+                {k: _round(v) for k, v in asdict(t).items() if v is not None and k != "started_at"}
+                for t in self.timings
+            ],
+        }
+        if self.tracer is not None:
+            summary["trace_id"] = self.tracer.trace_id
+        return summary
+
+    def json_lines(self) -> list[str]:
+        """One JSON object per phase, then a summary line."""
+        lines = []
+        for timing in self.timings:
+            record = {"type": "phase", "platform": self.platform}
+            record.update({k: _round(v) for k, v in asdict(timing).items()})
+            lines.append(json.dumps(record))
+        lines.append(json.dumps({
+            "type": "summary",
+            "platform": self.platform,
+            "phase_count": len(self.timings),
+            "fire_to_confirmation_ms": _round(self.fire_to_confirmation_ms),
+        }))
+        return lines
+
+    def emf_documents(self, namespace: str = EMF_NAMESPACE) -> list[dict]:
+        """CloudWatch embedded metric format documents, one per phase plus the end-to-end metric."""
+        now_ms = int(time.time() * 1000)
+        docs = []
+        for timing in self.timings:
+            metrics = {name: getattr(timing, name) for name in EMF_PHASE_METRICS
+                       if getattr(timing, name) is not None}
+            docs.append({
+                "_aws": {
+                    "Timestamp": now_ms,
+                    "CloudWatchMetrics": [{
+                        "Namespace": namespace,
+                        "Dimensions": [["Platform", "Phase"]],
+                        "Metrics": [{"Name": name, "Unit": "Milliseconds"} for name in metrics],
+                    }],
+                },
+                "Platform": self.platform,
+                "Phase": timing.phase,
+                "Endpoint": timing.endpoint,
+                "Status": timing.status,
+                **{name: _round(value) for name, value in metrics.items()},
+            })
+        if self.fire_to_confirmation_ms is not None:
+            docs.append({
+                "_aws": {
+                    "Timestamp": now_ms,
+                    "CloudWatchMetrics": [{
+                        "Namespace": namespace,
+                        "Dimensions": [["Platform"]],
+                        "Metrics": [{"Name": "fire_to_confirmation_ms", "Unit": "Milliseconds"}],
+                    }],
+                },
+                "Platform": self.platform,
+                "fire_to_confirmation_ms": _round(self.fire_to_confirmation_ms),
+            })
+        return docs
+
+    def write(self, stream: TextIO, fmt: str = "json") -> None:
+        """Write all records to a stream as JSON lines ('json') or EMF documents ('emf')."""
+        if fmt == "emf":
+            lines = [json.dumps(doc) for doc in self.emf_documents()]
+        else:
+            lines = self.json_lines()
+        for line in lines:
+            stream.write(line + "\n")
+        stream.flush()
+
+
+def traced(instrumentation: Optional[Instrumentation], name: str, **attributes) -> ContextManager[Optional["Span"]]:
+    """instrumentation.span(name, ...), or nothing without instrumentation."""
+    if instrumentation is None:
+        return nullcontext()
+    return instrumentation.span(name, **attributes)
+
+
+def traced_sleep(sleep, instrumentation: Optional[Instrumentation]):
+    """sleep, recording each wait as a "wait" span when there's a tracer."""
+    if instrumentation is None or instrumentation.tracer is None:
+        return sleep
+
+    def wait(seconds: float) -> None:
+        with instrumentation.span("wait", seconds=round(seconds, 3)):
+            sleep(seconds)
+    return wait
+
+
+def _round(value):
+    return round(value, 2) if isinstance(value, float) else value
@@ -0,0 +1,329 @@
+"""
+Queues of booking jobs for the worker pool.
+
+Every adapter has the same at-least-once semantics as SQS:
+
+    receive()       hands out visible messages and hides each one for a
+                    visibility timeout; a message that isn't acked in time
+                    becomes visible again and is redelivered
+    ack()           deletes a message for good (the job is done)
+    release()       makes a message visible again after a delay (retry later)
+    extend()        keeps a long-running job's message hidden
+    dead_letter()   moves a message to the dead-letter queue
+
+A message received max_receives times without being acked goes to the
+dead-letter queue instead of being handed out again. Each receive issues a
+new receipt, and ack/release/extend with a stale receipt (the message timed
+out and went to someone else) do nothing and return False.
+
+SQLiteJobQueue is the local stand-in: one database file holds any number of
+named queues, and several processes can share it. SQSJobQueue wraps an SQS
+queue (boto3 is imported on first use). open_queue() picks the adapter from
+a URL:
+
+    sqlite:///path/to/jobs.db?queue=bookings
+    https://sqs.us-east-1.amazonaws.com/123456789012/bookings
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+
+DEFAULT_VISIBILITY_TIMEOUT = 60.0
+DEFAULT_MAX_RECEIVES = 3
+DEAD_LETTER_SUFFIX = "-dlq"
+
+
+@dataclass
+class QueueMessage:
+    """One received message."""
+    message_id: str
+    body: dict
+    receipt: str
+    receive_count: int = 1
+
+
+class JobQueue(ABC):
+    """A queue of JSON job bodies with visibility timeouts and dead-lettering."""
+
+    @abstractmethod
+    def send(self, body: dict, delay: float = 0.0) -> str:
+        """Enqueue a job; returns its message id."""
+        ...
+
+    @abstractmethod
+    def receive(self, max_messages: int = 1, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT,
+                wait: float = 0.0) -> list[QueueMessage]:
+        """
+        Receive up to max_messages visible messages, hiding them for visibility_timeout.
+
+        Waits up to `wait` seconds for a message to become available.
+        """
+        ...
+
+    @abstractmethod
+    def ack(self, message: QueueMessage) -> bool:
+        ...
+
+    @abstractmethod
+    def release(self, message: QueueMessage, delay: float = 0.0) -> bool:
+        ...
+
+    @abstractmethod
+    def extend(self, message: QueueMessage, visibility_timeout: float) -> bool:
+        ...
+
+    @abstractmethod
+    def dead_letter(self, message: QueueMessage, reason: str = "") -> bool:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Job queue in a SQLite database.
+
+    Args:
+        path: Database file (created if missing)
+        name: Queue name; its dead letters go to name + "-dlq"
+        max_receives: Receives before a message is dead-lettered
+        clock: Time source in epoch seconds
+    """
+
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, path: str, name: str = "bookings", max_receives: int = DEFAULT_MAX_RECEIVES,
+                 clock: Callable[[], float] = time.time):
+        self.path = path
+        self.name = name
+        self.dead_letter_name = name + DEAD_LETTER_SUFFIX
+        self.max_receives = max_receives
+        self.clock = clock
+        self._lock = threading.Lock()
+        # One connection shared by the pool's threads, serialized by _lock
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id TEXT PRIMARY KEY,
+                queue TEXT NOT NULL,
+                body TEXT NOT NULL,
+                visible_at REAL NOT NULL,
+                receive_count INTEGER NOT NULL DEFAULT 0,
+                receipt TEXT,
+                sent_at REAL NOT NULL,
+                error TEXT
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS messages_visible ON messages (queue, visible_at)")
+
+    def send(self, body: dict, delay: float = 0.0) -> str:
+        message_id = str(uuid.uuid4())
+        now = self.clock()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO messages (id, queue, body, visible_at, sent_at) VALUES (?, ?, ?, ?, ?)",
+                (message_id, self.name, json.dumps(body), now + delay, now),
+            )
+        return message_id
+
+    def _receive_now(self, max_messages: int, visibility_timeout: float) -> list[QueueMessage]:
+        now = self.clock()
+        messages = []
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(
+                    "SELECT id, body, receive_count FROM messages WHERE queue = ? AND visible_at <= ? "
+                    "ORDER BY visible_at LIMIT ?",
+                    (self.name, now, max_messages),
+                ).fetchall()
+                for message_id, body, receive_count in rows:
+                    if receive_count >= self.max_receives:
+                        self._db.execute(
+                            "UPDATE messages SET queue = ?, receipt = NULL, "
+                            "error = COALESCE(error, 'max receives exceeded') WHERE id = ?",
+                            (self.dead_letter_name, message_id),
+                        )
+                        continue
+                    receipt = uuid.uuid4().hex
+                    self._db.execute(
+                        "UPDATE messages SET visible_at = ?, receive_count = ?, receipt = ? WHERE id = ?",
+                        (now + visibility_timeout, receive_count + 1, receipt, message_id),
+                    )
+                    messages.append(QueueMessage(message_id, json.loads(body), receipt, receive_count + 1))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return messages
+
+    def receive(self, max_messages: int = 1, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT,
+                wait: float = 0.0) -> list[QueueMessage]:
+        deadline = time.monotonic() + wait
+        while True:
+            messages = self._receive_now(max_messages, visibility_timeout)
+            if messages or time.monotonic() >= deadline:
+                return messages
+            time.sleep(min(self.POLL_INTERVAL, max(0.0, deadline - time.monotonic())))
+
+    def _update(self, sql: str, params: tuple) -> bool:
+        with self._lock:
+            return self._db.execute(sql, params).rowcount > 0
+
+    def ack(self, message: QueueMessage) -> bool:
+        return self._update("DELETE FROM messages WHERE id = ? AND receipt = ?", (message.message_id, message.receipt))
+
+    def release(self, message: QueueMessage, delay: float = 0.0) -> bool:
+        return self._update(
+            "UPDATE messages SET visible_at = ? WHERE id = ? AND receipt = ?",
+            (self.clock() + delay, message.message_id, message.receipt),
+        )
+
+    def extend(self, message: QueueMessage, visibility_timeout: float) -> bool:
+        return self.release(message, visibility_timeout)
+
+    def dead_letter(self, message: QueueMessage, reason: str = "") -> bool:
+        return self._update(
+            "UPDATE messages SET queue = ?, receipt = NULL, error = ? WHERE id = ? AND receipt = ?",
+            (self.dead_letter_name, reason, message.message_id, message.receipt),
+        )
+
+    def counts(self) -> dict:
+        """Visible, in-flight (hidden) and dead-lettered message counts."""
+        now = self.clock()
+        with self._lock:
+            visible, hidden = self._db.execute(
+                "SELECT COALESCE(SUM(visible_at <= ?), 0), COALESCE(SUM(visible_at > ?), 0) "
+                "FROM messages WHERE queue = ?",
+                (now, now, self.name),
+            ).fetchone()
+            dead = self._db.execute(
+                "SELECT COUNT(*) FROM messages WHERE queue = ?", (self.dead_letter_name,)
+            ).fetchone()[0]
+        return {"visible": visible, "in_flight": hidden, "dead_lettered": dead}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class SQSJobQueue(JobQueue):
+    """
+    Job queue on Amazon SQS.
+
+    Messages received more than max_receives times are moved to the
+    dead-letter queue by this adapter; a redrive policy on the queue works
+    as well.
+
+    Args:
+        queue_url: The queue's URL
+        dead_letter_url: Dead-letter queue URL; without one, dead letters are deleted
+        max_receives: Receives before a message is dead-lettered
+        client: boto3 SQS client; created on first use by default
+    """
+
+    def __init__(self, queue_url: str, dead_letter_url: Optional[str] = None,
+                 max_receives: int = DEFAULT_MAX_RECEIVES, client=None):
+        self.queue_url = queue_url
+        self.dead_letter_url = dead_letter_url
+        self.max_receives = max_receives
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+            region = urlsplit(self.queue_url).hostname.split(".")[1]
+            self._client = boto3.client("sqs", region_name=region)
+        return self._client
+
+    def send(self, body: dict, delay: float = 0.0) -> str:
+        response = self.client.send_message(
+            QueueUrl=self.queue_url, MessageBody=json.dumps(body), DelaySeconds=min(900, int(delay)),
+        )
+        return response["MessageId"]
+
+    def receive(self, max_messages: int = 1, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT,
+                wait: float = 0.0) -> list[QueueMessage]:
+        response = self.client.receive_message(
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=max(1, min(10, max_messages)),
+            VisibilityTimeout=int(visibility_timeout),
+            WaitTimeSeconds=min(20, int(wait)),
+            AttributeNames=["ApproximateReceiveCount"],
+        )
+        messages = []
+        for raw in response.get("Messages", []):
+            receive_count = int(raw.get("Attributes", {}).get("ApproximateReceiveCount", 1))
+            try:
+                body = json.loads(raw["Body"])
+            except json.JSONDecodeError:
+                body = {"_unparsed": raw["Body"]}
+            message = QueueMessage(raw["MessageId"], body, raw["ReceiptHandle"], receive_count)
+            if receive_count > self.max_receives:
+                self.dead_letter(message, "max receives exceeded")
+                continue
+            messages.append(message)
+        return messages
+
+    def ack(self, message: QueueMessage) -> bool:
+        self.client.delete_message(QueueUrl=self.queue_url, ReceiptHandle=message.receipt)
+        return True
+
+    def release(self, message: QueueMessage, delay: float = 0.0) -> bool:
+        return self.extend(message, delay)
+
+    def extend(self, message: QueueMessage, visibility_timeout: float) -> bool:
+        from botocore.exceptions import ClientError
+        try:
+            self.client.change_message_visibility(
+                QueueUrl=self.queue_url, ReceiptHandle=message.receipt,
+                VisibilityTimeout=min(43200, int(visibility_timeout)),
+            )
+        except ClientError:
+            # The receipt is stale: the message timed out and was received again
+            return False
+        return True
+
+    def dead_letter(self, message: QueueMessage, reason: str = "") -> bool:
+        if self.dead_letter_url:
+            self.client.send_message(
+                QueueUrl=self.dead_letter_url,
+                MessageBody=json.dumps(message.body),
+                MessageAttributes={"error": {"DataType": "String", "StringValue": reason or "dead-lettered"}},
+            )
+        return self.ack(message)
+
+
+def open_queue(url: str, max_receives: int = DEFAULT_MAX_RECEIVES) -> JobQueue:
+    """
+    The queue adapter for a URL (see module docstring).
+
+    For SQS, ?dlq=<url-encoded queue URL> names the dead-letter queue.
+
+    Raises:
+        ValueError: If the URL isn't a sqlite:// or SQS https:// URL
+    """
+    parts = urlsplit(url)
+    query = parse_qs(parts.query)
+    if parts.scheme == "sqlite":
+        path = parts.netloc + parts.path if parts.netloc else parts.path
+        # sqlite:///relative.db has path "/relative.db"; sqlite:////abs/path.db has "//abs/path.db"
+        path = path[1:] if path.startswith("/") else path
+        if not path:
+            raise ValueError(f"No database path in queue URL '{url}'")
+        return SQLiteJobQueue(path, query.get("queue", ["bookings"])[0], max_receives)
+    if parts.scheme == "https" and parts.hostname and parts.hostname.startswith("sqs."):
+        queue_url = f"{parts.scheme}://{parts.netloc}{parts.path}"
+        return SQSJobQueue(queue_url, query.get("dlq", [None])[0], max_receives)
+    raise ValueError(f"Unsupported queue URL '{url}'. Use sqlite:///path.db or an SQS queue URL.")
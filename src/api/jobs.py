@@ -0,0 +1,506 @@
+"""
+Booking jobs carried by batch events.
+
+A Lambda invocation normally books one reservation, described by an event
+in the single-booking shape (see lambda_handler.py). On a busy release
+morning one invocation can instead take many:
+
+    [ {booking}, {booking}, ... ]
+    {"bookings": [ {booking}, ... ], "max_workers": 8, "coalesce": true}
+    {"Records": [ {"messageId": "...", "body": "{booking as JSON}"}, ... ]}   (SQS)
+
+parse_batch() turns any of these into BatchItems. An item whose SQS body
+doesn't parse still becomes a BatchItem, with the error set, so it can be
+reported as a failure instead of failing the whole batch.
+
+run_booking_job() books one such event with a shared BookingResources; the
+Lambda handler (one booking or a batch) and the queue worker pool both run
+jobs through it.
+"""
+
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Callable, Optional
+
+from .base import BookingClientError
+from .booking_loop import DEFAULT_BOOKING_RESERVE, DEFAULT_POLL_INTERVAL, BookingOutcome, Deadline, attempt_booking
+from .client_factory import create_client
+from .coalescing import CoalescingClient, SingleFlight
+from .credentials import CredentialManager
+from .instrumentation import Instrumentation
+from .logs import OUTCOME, get_logger
+from .retry_policy import policy_for
+from .time_preferences import compile_preferences
+
+if TYPE_CHECKING:
+    from .notifications import Notifier
+    from .tracing import Tracer
+
+
+logger = get_logger("jobs")
+
+
+SQS_SOURCE = "aws:sqs"
+
+# Batch-level options of a {"bookings": [...]} event
+BATCH_OPTIONS = ("max_workers", "coalesce", "metrics_format", "fanout")
+
+
+@dataclass
+class BatchItem:
+    """One booking from a batch event."""
+    item_id: str
+    event: dict = field(default_factory=dict)
+    # Why the item couldn't be read, if it couldn't
+    error: Optional[str] = None
+
+
+def is_batch(event) -> bool:
+    """True for a list, {"bookings": [...]} or SQS Records event."""
+    if isinstance(event, list):
+        return True
+    return isinstance(event, dict) and (
+        isinstance(event.get("bookings"), list) or isinstance(event.get("Records"), list)
+    )
+
+
+def is_sqs_batch(event) -> bool:
+    return isinstance(event, dict) and isinstance(event.get("Records"), list)
+
+
+def batch_options(event) -> dict:
+    """The batch-level options of a {"bookings": [...]} event (empty for other shapes)."""
+    if isinstance(event, dict) and "bookings" in event:
+        return {k: event[k] for k in BATCH_OPTIONS if k in event}
+    return {}
+
+
+def _sqs_item(record: dict, index: int) -> BatchItem:
+    item_id = record.get("messageId") or str(index)
+    if record.get("eventSource", SQS_SOURCE) != SQS_SOURCE:
+        return BatchItem(item_id, error=f"Unsupported record source '{record.get('eventSource')}'")
+    try:
+        body = json.loads(record.get("body") or "")
+    except json.JSONDecodeError as e:
+        return BatchItem(item_id, error=f"Message body is not JSON: {e}")
+    if not isinstance(body, dict):
+        return BatchItem(item_id, error="Message body is not a booking object")
+    return BatchItem(item_id, body)
+
+
+def parse_batch(event) -> list[BatchItem]:
+    """
+    The bookings in a batch event, in order.
+
+    Items are identified by their SQS message id, their "id" field, or
+    their position in the batch.
+
+    Raises:
+        ValueError: If the event isn't a batch
+    """
+    if is_sqs_batch(event):
+        return [_sqs_item(record, i) for i, record in enumerate(event["Records"])]
+
+    if isinstance(event, list):
+        entries = event
+    elif isinstance(event, dict) and isinstance(event.get("bookings"), list):
+        entries = event["bookings"]
+    else:
+        raise ValueError("Not a batch event: expected a list, {\"bookings\": [...]} or SQS Records")
+
+    items = []
+    for i, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            items.append(BatchItem(str(i), error="Booking is not an object"))
+            continue
+        items.append(BatchItem(str(entry.get("id", i)), entry))
+    return items
+
+
+def parse_utc(value: str) -> float:
+    """Epoch seconds from a UTC 'YYYY-MM-DDTHH:MM:SS[.fff]' string."""
+    fmt = "%Y-%m-%dT%H:%M:%S.%f" if "." in value else "%Y-%m-%dT%H:%M:%S"
+    return datetime.strptime(value, fmt).replace(tzinfo=timezone.utc).timestamp()
+
+
+def wait_for_fire(fire_at: str, max_wait: float = 60.0) -> None:
+    """Sleep until fire_at (the schedule triggers a few seconds early to absorb start-up)."""
+    remaining = parse_utc(fire_at) - time.time()
+    if 0 < remaining <= max_wait:
+        time.sleep(remaining)
+
+
+class BookingResources:
+    """
+    Credentials and HTTP connection pools shared by concurrent bookings.
+
+    Credentials are fetched once per platform, every client on a platform
+    shares one CredentialManager and one pooled session, and concurrent
+    credential refreshes on a platform collapse into one. With coalesce,
+    identical concurrent find requests are shared as well.
+
+    Args:
+        fetch_credentials: Loads a platform's credentials (Secrets Manager,
+            config.json)
+        on_refresh: Called with (platform, credentials) after a refresh, to persist them
+        pool_size: Connections kept per host (one per concurrent booking)
+        coalesce: Share identical in-flight find_slots calls between bookings
+    """
+
+    def __init__(
+        self,
+        fetch_credentials: Callable[[str], dict],
+        on_refresh: Optional[Callable[[str, dict], None]] = None,
+        pool_size: int = 10,
+        coalesce: bool = False,
+    ):
+        self.fetch_credentials = fetch_credentials
+        self.on_refresh = on_refresh
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._managers: dict[str, CredentialManager] = {}
+        self._sessions: dict = {}
+        self._refreshes = SingleFlight()
+        self._finds = SingleFlight() if coalesce else None
+
+    def manager(self, platform: str) -> CredentialManager:
+        """The platform's credential manager, fetching its credentials on first use."""
+        with self._lock:
+            if platform not in self._managers:
+                manager = CredentialManager(on_refresh=self.on_refresh)
+                manager.register(platform, self.fetch_credentials(platform))
+                self._managers[platform] = manager
+            return self._managers[platform]
+
+    def client(self, platform: str):
+        """
+        A new client for one booking, sharing the platform's credentials and session.
+
+        Only the expiry is checked, so there's no network round trip on the
+        booking path. The client is kept in sync with credential refreshes
+        until it's given back with release().
+        """
+        manager = self.manager(platform)
+        with self._lock:
+            if platform not in self._sessions:
+                from . import http
+                self._sessions[platform] = http.create_session(self.pool_size)
+            session = self._sessions[platform]
+        client = create_client(platform, manager.ensure_fresh(platform, validate=False), session=session)
+        manager.attach(client)
+        if self._finds is not None:
+            client = CoalescingClient(client, self._finds)
+        return client
+
+    def release(self, *clients) -> None:
+        """Detach finished bookings' clients (from client()) from their credential managers."""
+        for client in clients:
+            if isinstance(client, CoalescingClient):
+                client = client.client
+            self.manager(client.platform_name).detach(client)
+
+    def refresh(self, platform: str) -> dict:
+        """Refresh the platform's credentials once, however many bookings ask at the same time."""
+        manager = self.manager(platform)
+        return self._refreshes.do(platform, lambda: manager.refresh(platform))
+
+
+def booking_deadline(event: dict, deadline: Optional[float], started: float) -> Optional[Deadline]:
+    """
+    The Deadline for a booking: the caller's (an invocation's remaining
+    time), brought forward by the event's "max_duration" seconds if it has
+    one, with the event's "booking_reserve", "poll_interval" and
+    "keep_polling" settings.
+
+    Raises:
+        ValueError: For a setting that isn't a number
+    """
+    max_duration = event.get("max_duration")
+    if max_duration is not None:
+        limit = started + float(max_duration)
+        deadline = limit if deadline is None else min(deadline, limit)
+    if deadline is None:
+        return None
+    return Deadline(
+        deadline,
+        booking_reserve=float(event.get("booking_reserve", DEFAULT_BOOKING_RESERVE)),
+        poll_interval=float(event.get("poll_interval", DEFAULT_POLL_INTERVAL)),
+        keep_polling=bool(event.get("keep_polling", True)),
+    )
+
+
+def _result(result: BookingOutcome, instrumentation: Instrumentation, started: float,
+            deadline: Optional[Deadline]) -> dict:
+    """The attempt count and timing fields every booking response body carries."""
+    return {
+        "attempts": result.attempts,
+        "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+        "remaining_ms": round(deadline.remaining() * 1000, 1) if deadline is not None else None,
+        "out_of_time": result.out_of_time,
+        "timings": instrumentation.summary(),
+    }
+
+
+def run_booking_job(
+    event: dict,
+    resources: BookingResources,
+    deadline: Optional[float] = None,
+    log: Callable[[str], None] = logger.info,
+    emit: Optional[Callable[[Instrumentation], None]] = None,
+    notifier: Optional["Notifier"] = None,
+    outcome: Optional[Callable[[str], None]] = None,
+    tracer: Optional["Tracer"] = None,
+    cancelled: Optional[Callable[[], bool]] = None,
+) -> dict:
+    """
+    Book the reservation described by a booking event.
+
+    Returns a Lambda-style response: statusCode 200 on success, 400 for a
+    job that can never succeed as written, 500 for a failed attempt, 504
+    when the deadline stopped it, 409 when it was cancelled; body is the
+    JSON result. Every response
+    to an attempt says how many searches it made, how long it took, how
+    much time was left and whether the deadline stopped it.
+
+    An event with "venues" ({"resy": "25973", "opentable": "1234"}) in
+    place of platform and venue_id is raced across those platforms (see
+    api.race), and the body's "platform" says where it was booked.
+
+    Args:
+        event: A booking in the Lambda event shape
+        resources: Credentials and connection pools to use
+        deadline: time.monotonic() by which the attempt must have stopped;
+            with one, the booking keeps polling past "retries" until then
+            (unless the event sets "keep_polling": false), never starts a
+            booking it couldn't finish, and times requests out at it
+        log: Progress output
+        emit: Called with the booking's instrumentation once it's done
+        notifier: Told the outcome (queued, never waited on)
+        outcome: Where the line saying how the booking ended goes; logged at
+            OUTCOME level by default, so it's all quiet mode shows
+        tracer: Records the booking's spans (warm-up, fire wait, searches,
+            requests, selection, booking); the trace ID is returned under
+            "timings"
+        cancelled: Stops the booking before its next search or booking once
+            it returns True (another booking of a fan-out got there first)
+    """
+    started = time.monotonic()
+    outcome = outcome or (lambda message: logger.log(OUTCOME, message))
+    # Parse event; "venues" ({platform: venue_id}) races the booking across platforms
+    venues = event.get("venues")
+    if venues is not None and not (isinstance(venues, dict) and venues):
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": "venues must map platforms to venue IDs"})
+        }
+    platform = event.get("platform", "resy")
+    instrumentation = Instrumentation("+".join(venues) if venues else platform, tracer=tracer)
+    # Scheduled with a release recommendation: set up first, fire at fire_at
+    fire_at = event.get("fire_at")
+    if not fire_at:
+        instrumentation.mark("fire")
+    try:
+        if venues:
+            venues = {p: str(v) for p, v in venues.items()}
+        else:
+            venues = {platform: str(event["venue_id"])}
+        date = event["date"]
+        party_size = event["party_size"]
+        best = event["best"]
+        earliest = event["earliest"]
+        latest = event["latest"]
+    except KeyError as e:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": f"Missing field: {e}"})
+        }
+    table_types = event.get("table_types")
+    retries = event.get("retries", 3)
+    retry_delay = event.get("retry_delay", 0.0)
+
+    # Validate and compile the time window
+    try:
+        preferences = compile_preferences(best, earliest, latest, event.get("tolerance"))
+    except ValueError as e:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": f"Invalid time parameters: {e}"})
+        }
+
+    try:
+        policies = {p: policy_for(p, event.get("retry_policy")) for p in venues}
+        budget = booking_deadline(event, deadline, started)
+    except ValueError as e:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": str(e)})
+        }
+
+    with instrumentation.span("warm_up", platforms=list(venues)):
+        try:
+            for venue_platform in venues:
+                resources.manager(venue_platform)
+        except Exception as e:
+            log(f"Failed to get credentials: {e}")
+            return {
+                "statusCode": 500,
+                "body": json.dumps({"error": str(e)})
+            }
+
+        log(f"Preferences: {preferences}")
+
+        clients = {}
+        try:
+            for venue_platform in venues:
+                clients[venue_platform] = resources.client(venue_platform)
+            for client in clients.values():
+                client.instrument(instrumentation)
+                client.set_deadline(budget.at if budget else None)
+        except BookingClientError as e:
+            resources.release(*clients.values())
+            log(f"Failed to create client: {e}")
+            return {
+                "statusCode": 400,
+                "body": json.dumps({"error": str(e)})
+            }
+
+    def refresh_credentials(refresh_platform: str) -> bool:
+        try:
+            resources.refresh(refresh_platform)
+        except BookingClientError as refresh_error:
+            log(f"Could not refresh {refresh_platform} credentials: {refresh_error}")
+            return False
+        log(f"{refresh_platform} credentials refreshed")
+        return True
+
+    if fire_at:
+        with instrumentation.span("fire_wait", fire_at=fire_at):
+            wait_for_fire(fire_at)
+        instrumentation.mark("fire")
+
+    try:
+        if len(venues) > 1:
+            from .race import race_booking
+            result = race_booking(
+                clients,
+                venues,
+                date,
+                party_size,
+                preferences,
+                table_types=table_types,
+                retry_count=retries,
+                retry_delay=retry_delay,
+                instrumentation=instrumentation,
+                policies=policies,
+                refresh=refresh_credentials,
+                log=log,
+                deadline=budget,
+                cancelled=cancelled,
+            )
+        else:
+            (platform, venue_id), = venues.items()
+            result = attempt_booking(
+                clients[platform],
+                venue_id,
+                date,
+                party_size,
+                preferences,
+                table_types=table_types,
+                retry_count=retries,
+                retry_delay=retry_delay,
+                instrumentation=instrumentation,
+                policy=policies[platform],
+                refresh=lambda: refresh_credentials(platform),
+                log=log,
+                deadline=budget,
+                cancelled=cancelled,
+            )
+    finally:
+        # Finished with; refreshes needn't reach them any more
+        resources.release(*clients.values())
+
+    if notifier is not None:
+        # Only imported when there's someone to notify (keeps it off the cold path)
+        from .notifications import notify_booking
+        notify_booking(notifier, result, venues, date, party_size)
+    if emit:
+        emit(instrumentation)
+
+    if result.success:
+        confirmation = result.confirmation
+        selected_slot = result.slot
+        outcome(f"SUCCESS! {selected_slot.platform} {selected_slot.time[:5]} confirmation: {confirmation.confirmation_id}")
+        return {
+            "statusCode": 200,
+            "body": json.dumps({
+                "success": True,
+                "platform": selected_slot.platform,
+                "confirmation_id": confirmation.confirmation_id,
+                "reservation_id": confirmation.reservation_id,
+                # What the platform needs to cancel it (see api/reconcile.py)
+                "details": confirmation.details,
+                "time": selected_slot.time,
+                "table_type": selected_slot.table_type,
+                **_result(result, instrumentation, started, budget),
+            })
+        }
+
+    if result.outcome_unknown:
+        slot = result.slot
+        outcome(f"UNKNOWN: the {slot.platform} {slot.time[:5]} booking may have gone through; "
+                f"check the account ({result.error})")
+        return {
+            "statusCode": 502,
+            "body": json.dumps({
+                "success": False,
+                "error": "Booking outcome unknown",
+                "outcome_unknown": True,
+                "platform": slot.platform,
+                "time": slot.time,
+                "table_type": slot.table_type,
+                "last_error": result.error,
+                "error_category": result.error_category,
+                **_result(result, instrumentation, started, budget),
+            })
+        }
+
+    if result.cancelled:
+        outcome(f"Cancelled after {result.attempts} attempts")
+        return {
+            "statusCode": 409,
+            "body": json.dumps({
+                "success": False,
+                "error": "Cancelled",
+                "cancelled": True,
+                **_result(result, instrumentation, started, budget),
+            })
+        }
+
+    if result.out_of_time:
+        outcome(f"Stopped: out of time after {result.attempts} attempts ({result.error})")
+        return {
+            "statusCode": 504,
+            "body": json.dumps({
+                "success": False,
+                "error": "Out of time",
+                "last_error": result.error,
+                "error_category": result.error_category,
+                **_result(result, instrumentation, started, budget),
+            })
+        }
+
+    # All retries failed
+    outcome(f"FAILED after {result.attempts} attempts: {result.error}")
+    return {
+        "statusCode": 500,
+        "body": json.dumps({
+            "success": False,
+            "error": "Failed to book after all retries",
+            "last_error": result.error,
+            "error_category": result.error_category,
+            **_result(result, instrumentation, started, budget),
+        })
+    }
@@ -0,0 +1,226 @@
+"""
+Structured logging that doesn't block the booking path.
+
+Everything logs through the "oddjob" logger tree (get_logger). Once
+configure_logging() has run, a record is handed to a background thread
+through a queue; the calling thread pays for building the record and a
+queue put, never for formatting it or for a write to a slow terminal,
+pipe or log agent. The listener thread writes text (just the message, as print did) or JSON lines
+with the level, logger, time and any fields passed as `extra`.
+
+Levels are the standard ones plus OUTCOME, for the one line that says how
+a booking ended. Quiet mode logs only OUTCOME records.
+
+The functions that take a `log` callable (attempt_booking, race_booking,
+run_booking_job, WorkerPool, ...) default to a logger's info method, and
+callers with context to add pass their own.
+
+Before a process can be frozen or exit (a Lambda returning, the CLI
+finishing), call flush_logging() so queued records are written.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+from typing import Optional, TextIO, Union
+
+
+ROOT_LOGGER = "oddjob"
+
+# The final outcome of a booking; above ERROR so quiet mode shows nothing else
+OUTCOME = 45
+logging.addLevelName(OUTCOME, "OUTCOME")
+
+TEXT = "text"
+JSON = "json"
+LOG_FORMATS = (TEXT, JSON)
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "OUTCOME")
+
+# LogRecord attributes that aren't caller-supplied fields
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listener: Optional["_Listener"] = None
+_flush_lock = threading.Lock()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """The logger for a part of OddJob, e.g. get_logger("booking") -> "oddjob.booking"."""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+class JobLogger(logging.LoggerAdapter):
+    """
+    A logger for one job among many running at once.
+
+    Messages are prefixed with "[job] " and records carry a "job" field, so
+    interleaved progress from concurrent bookings can be told apart.
+    """
+
+    def process(self, msg, kwargs):
+        kwargs["extra"] = {**self.extra, **kwargs.get("extra", {})}
+        return f"[{self.extra['job']}] {msg}", kwargs
+
+    def outcome(self, msg, *args, **kwargs) -> None:
+        self.log(OUTCOME, msg, *args, **kwargs)
+
+
+def job_logger(logger: logging.Logger, job_id: str) -> JobLogger:
+    return JobLogger(logger, {"job": job_id})
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and any extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+# logging.handlers' QueueHandler/QueueListener would do, but importing it
+# pulls in socket, pickle and more: a fifth of the Lambda handler's cold
+# start. These are the few lines of it that are needed.
+
+class _QueueHandler(logging.Handler):
+    """
+    Puts records on the queue with as little work as possible on the caller.
+
+    Only the message is merged with its args (so a mutable arg changed
+    after the call can't alter what's logged); the rest of the formatting,
+    exception included, is left to the writer thread.
+    """
+
+    def __init__(self, records: queue.SimpleQueue):
+        super().__init__()
+        self.records = records
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            record.msg = record.getMessage()
+            record.args = None
+            self.records.put_nowait(record)
+        except Exception:
+            self.handleError(record)
+
+
+_STOP = None
+
+
+class _Listener:
+    """The writer thread: hands queued records to the writer until stopped."""
+
+    def __init__(self, records: queue.SimpleQueue, writer: logging.Handler):
+        self.records = records
+        self.writer = writer
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="oddjob-log-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            record = self.records.get()
+            if record is _STOP:
+                return
+            self.writer.handle(record)
+
+    def stop(self) -> None:
+        """Write out everything queued so far and stop the thread."""
+        if self._thread is not None:
+            self.records.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+
+class _BatchingStreamHandler(logging.StreamHandler):
+    """
+    The writer: flushes the stream only once the queue has run dry, so a
+    burst of records goes out in one write rather than one per record.
+    """
+
+    def __init__(self, stream: TextIO, records: queue.SimpleQueue):
+        super().__init__(stream)
+        self.records = records
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            if self.records.empty():
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+
+def configure_logging(
+    level: Union[int, str] = logging.INFO,
+    fmt: str = TEXT,
+    quiet: bool = False,
+    stream: Optional[TextIO] = None,
+) -> _Listener:
+    """
+    Send the "oddjob" loggers through a queue to a background writer.
+
+    Calling it again replaces the previous configuration (after writing out
+    whatever it still had queued).
+
+    Args:
+        level: Lowest level logged (a name such as "INFO", or a number)
+        fmt: "text" (message only) or "json"
+        quiet: Log only OUTCOME records
+        stream: Where records are written (stdout by default)
+
+    Returns:
+        The running listener
+
+    Raises:
+        ValueError: For an unknown format or level name
+    """
+    global _listener
+    if fmt not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format '{fmt}'. Use one of: {', '.join(LOG_FORMATS)}")
+    if isinstance(level, str):
+        if level.upper() not in LOG_LEVELS:
+            raise ValueError(f"Unknown log level '{level}'. Use one of: {', '.join(LOG_LEVELS)}")
+        level = logging.getLevelName(level.upper())
+
+    root = logging.getLogger(ROOT_LOGGER)
+    flush_logging(restart=False)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    writer = _BatchingStreamHandler(stream or sys.stdout, records)
+    writer.setFormatter(JsonFormatter() if fmt == JSON else logging.Formatter("%(message)s"))
+    root.addHandler(_QueueHandler(records))
+    root.setLevel(OUTCOME if quiet else level)
+    root.propagate = False
+
+    first = _listener is None
+    _listener = _Listener(records, writer)
+    _listener.start()
+    if first:
+        atexit.register(flush_logging, restart=False)
+    return _listener
+
+
+def flush_logging(restart: bool = True) -> None:
+    """Write out everything queued so far (blocks until the writer has caught up)."""
+    with _flush_lock:
+        if _listener is not None and _listener._thread is not None:
+            # stop() drains the queue and joins the writer; start a fresh one for later records
+            _listener.stop()
+            if restart:
+                _listener.start()
@@ -0,0 +1,395 @@
+"""
+Booking notifications, delivered off the booking path.
+
+Booking code only calls Notifier.notify(), which puts the notification on
+an in-memory queue and returns; it never waits on the network and never
+raises. A background thread takes notifications off the queue in batches
+(up to batch_size, or whatever arrived within batch_wait of the first) and
+hands each batch to a transport, retrying a failed send with exponential
+backoff.
+
+Notifications can carry a dedupe key. A second notification with the same
+key within dedupe_window seconds is dropped, so a booking retried every
+few minutes against a sold-out venue sends one "no slots" text, not one
+per run. The next one sent after the window says how many were dropped.
+
+Transports:
+
+    LocalTransport  JSON lines to stdout or a file; the stand-in for
+                    development and the default in Lambda (CloudWatch logs)
+    SNSTransport    publishes each batch as one message to an SNS topic
+                    (SMS, email, ...); boto3 is imported on first use
+
+open_transport() picks one from a target string: "-" (stdout), a file path
+or file:// URL, or an SNS topic ARN.
+"""
+
+import json
+import queue
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Optional, TextIO
+
+from .logs import get_logger
+
+
+logger = get_logger("notifications")
+
+
+# Notification kinds
+BOOKED = "booked"
+FAILED = "failed"
+NO_SLOTS = "no_slots"
+OPENING = "opening"
+
+DEFAULT_BATCH_SIZE = 10
+DEFAULT_BATCH_WAIT = 0.5
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_RETRY_BASE_DELAY = 1.0
+DEFAULT_DEDUPE_WINDOW = 900.0
+DEFAULT_MAX_PENDING = 1000
+
+# Booking errors that mean "nothing to book", as opposed to a failure
+NO_SLOTS_ERRORS = ("No slots available", "No slots match preferred times")
+
+
+@dataclass
+class Notification:
+    """One message for the user."""
+    kind: str
+    message: str
+    dedupe_key: Optional[str] = None
+    details: dict = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+    # Notifications with the same dedupe key dropped since the last one sent
+    suppressed: int = 0
+
+    def text(self) -> str:
+        if self.suppressed:
+            return f"{self.message} (repeated {self.suppressed} more times)"
+        return self.message
+
+
+class Transport(ABC):
+    """Delivers batches of notifications."""
+
+    @abstractmethod
+    def send(self, notifications: list[Notification]) -> None:
+        """Deliver a batch; raise on failure so the batch is retried."""
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class LocalTransport(Transport):
+    """
+    Writes notifications as JSON lines, to a file (appended) or a stream.
+
+    Args:
+        path: File to append to; stdout if neither path nor stream is given
+        stream: Stream to write to
+    """
+
+    def __init__(self, path: Optional[str] = None, stream: Optional[TextIO] = None):
+        self.path = path
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def send(self, notifications: list[Notification]) -> None:
+        lines = "".join(
+            json.dumps({"notification": n.kind, "text": n.text(), **asdict(n)}) + "\n" for n in notifications
+        )
+        with self._lock:
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write(lines)
+            else:
+                stream = self.stream or sys.stdout
+                stream.write(lines)
+                stream.flush()
+
+
+class SNSTransport(Transport):
+    """
+    Publishes each batch as a single message to an SNS topic.
+
+    One message per batch keeps a burst of notifications to one text.
+
+    Args:
+        topic_arn: The topic's ARN (its region is taken from it)
+        client: boto3 SNS client; created on first use by default
+    """
+
+    SUBJECT = "OddJob"
+
+    def __init__(self, topic_arn: str, client=None):
+        self.topic_arn = topic_arn
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+            self._client = boto3.client("sns", region_name=self.topic_arn.split(":")[3])
+        return self._client
+
+    def send(self, notifications: list[Notification]) -> None:
+        self.client.publish(
+            TopicArn=self.topic_arn,
+            Subject=self.SUBJECT,
+            Message="\n".join(n.text() for n in notifications),
+        )
+
+
+def open_transport(target: str) -> Transport:
+    """
+    The transport for a target: "-" (stdout), a path or file:// URL, or an SNS topic ARN.
+    """
+    if target in ("-", "stdout"):
+        return LocalTransport()
+    if target.startswith("arn:aws:sns:"):
+        return SNSTransport(target)
+    if target.startswith("file://"):
+        target = target[len("file://"):]
+    if not target:
+        raise ValueError("Empty notification target")
+    return LocalTransport(path=target)
+
+
+@dataclass
+class NotifierStats:
+    queued: int = 0
+    sent: int = 0
+    batches: int = 0
+    deduplicated: int = 0
+    retries: int = 0
+    failed: int = 0
+    # Dropped because max_pending notifications were already waiting
+    dropped: int = 0
+
+
+_FLUSH = object()
+_STOP = object()
+
+
+class Notifier:
+    """
+    Queues notifications and delivers them in the background.
+
+    Args:
+        transport: Where notifications go
+        batch_size: Most notifications sent at once
+        batch_wait: Seconds to wait for more notifications after the first of a batch
+        max_retries: Retries of a failed send before its batch is given up on
+        retry_base_delay: First retry delay in seconds, doubling each retry
+        dedupe_window: Seconds during which a repeated dedupe key is dropped
+        max_pending: Notifications held before new ones are dropped
+        clock: Time source for deduplication
+        log: Where delivery failures are reported
+    """
+
+    def __init__(
+        self,
+        transport: Transport,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        batch_wait: float = DEFAULT_BATCH_WAIT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        retry_base_delay: float = DEFAULT_RETRY_BASE_DELAY,
+        dedupe_window: float = DEFAULT_DEDUPE_WINDOW,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        clock: Callable[[], float] = time.monotonic,
+        log: Callable[[str], None] = logger.warning,
+    ):
+        self.transport = transport
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.dedupe_window = dedupe_window
+        self.clock = clock
+        self.log = log
+        self.stats = NotifierStats()
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        # dedupe key -> (last sent at, dropped since)
+        self._recent: dict[str, list] = {}
+        self._closing = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="oddjob-notifier", daemon=True)
+            self._thread.start()
+
+    def notify(self, kind: str, message: str, dedupe_key: Optional[str] = None, **details) -> bool:
+        """
+        Queue a notification. Never blocks and never raises.
+
+        Returns:
+            True if queued, False if deduplicated, dropped or the notifier is closed
+        """
+        with self._lock:
+            if self._closing.is_set():
+                return False
+            suppressed = 0
+            if dedupe_key is not None:
+                now = self.clock()
+                recent = self._recent.get(dedupe_key)
+                if recent and now - recent[0] < self.dedupe_window:
+                    recent[1] += 1
+                    self.stats.deduplicated += 1
+                    return False
+                suppressed = recent[1] if recent else 0
+                self._recent[dedupe_key] = [now, 0]
+            try:
+                self._queue.put_nowait(Notification(kind, message, dedupe_key, details, suppressed=suppressed))
+            except queue.Full:
+                self.stats.dropped += 1
+                return False
+            self._pending += 1
+            self.stats.queued += 1
+            self._ensure_thread()
+        return True
+
+    def _collect(self) -> tuple[list[Notification], bool]:
+        """The next batch, and whether the notifier is stopping."""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        if first is _FLUSH:
+            return [], False
+        batch = [first]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            if item is _FLUSH:
+                break
+            batch.append(item)
+        return batch, False
+
+    def _deliver(self, batch: list[Notification]) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.transport.send(batch)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self.log(f"Notification delivery failed, giving up on {len(batch)}: {e}")
+                    with self._lock:
+                        self.stats.failed += len(batch)
+                    return
+                with self._lock:
+                    self.stats.retries += 1
+                # Retry straight away when closing rather than hold up the exit
+                self._closing.wait(self.retry_base_delay * 2 ** attempt)
+                continue
+            with self._lock:
+                self.stats.sent += len(batch)
+                self.stats.batches += 1
+            return
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect()
+            if batch:
+                self._deliver(batch)
+                with self._lock:
+                    self._pending -= len(batch)
+                    self._idle.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Deliver everything queued so far without waiting out batch_wait.
+
+        Returns:
+            True if nothing is left undelivered
+        """
+        with self._lock:
+            if not self._pending:
+                return True
+        try:
+            self._queue.put_nowait(_FLUSH)
+        except queue.Full:
+            pass
+        with self._lock:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def close(self, timeout: Optional[float] = 5.0) -> bool:
+        """Deliver what's queued (within timeout) and stop the background thread."""
+        delivered = self.flush(timeout)
+        with self._lock:
+            self._closing.set()
+            thread = self._thread
+        if thread is not None:
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            thread.join(timeout)
+        self.transport.close()
+        return delivered
+
+
+def describe_venues(venues: dict[str, str]) -> str:
+    return " / ".join(f"{platform} {venue_id}" for platform, venue_id in venues.items())
+
+
+def notify_booking(
+    notifier: Optional[Notifier],
+    outcome,
+    venues: dict[str, str],
+    date: str,
+    party_size: int,
+) -> None:
+    """
+    Queue the notification for a booking loop's outcome (an api.booking_loop.BookingOutcome).
+
+    Runs that found nothing to book send a "no slots" notification,
+    deduplicated per venue, date and party size. Cancelled runs send nothing.
+    A booking whose outcome is unknown says to check the account.
+    """
+    if notifier is None or outcome.dry_run or outcome.cancelled:
+        return
+    where = describe_venues(venues)
+    if outcome.success:
+        slot = outcome.slot
+        notifier.notify(
+            BOOKED,
+            f"Booked {slot.platform} {slot.venue_id} on {date} at {slot.time[:5]} for {party_size} "
+            f"({slot.table_type}). Confirmation {outcome.confirmation.confirmation_id[:40]}",
+            platform=slot.platform, venue_id=slot.venue_id, date=date, time=slot.time,
+            confirmation_id=outcome.confirmation.confirmation_id,
+        )
+    elif outcome.outcome_unknown:
+        slot = outcome.slot
+        notifier.notify(
+            FAILED,
+            f"Booking {slot.platform} {slot.venue_id} on {date} at {slot.time[:5]} for {party_size} may have "
+            f"gone through (no response); check the account: {outcome.error}",
+            platform=slot.platform, venue_id=slot.venue_id, date=date, time=slot.time,
+            error=outcome.error, error_category=outcome.error_category, outcome_unknown=True,
+        )
+    elif outcome.error in NO_SLOTS_ERRORS:
+        notifier.notify(
+            NO_SLOTS,
+            f"No slots at {where} on {date} for {party_size}",
+            dedupe_key=f"{NO_SLOTS}:{where}:{date}:{party_size}",
+            venues=venues, date=date,
+        )
+    else:
+        notifier.notify(
+            FAILED,
+            f"Couldn't book {where} on {date} for {party_size}: {outcome.error}",
+            venues=venues, date=date, error=outcome.error, error_category=outcome.error_category,
+        )
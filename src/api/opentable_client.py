@@ -8,35 +8,63 @@ Booking flow:
 1. RestaurantsAvailability (GraphQL query) — find available time slots
 2. BookDetailsStandardSlotLock (GraphQL mutation) — lock a slot temporarily
 3. make-reservation (REST POST) — complete the booking
+
+A booking is cancelled (cancel-reservation, REST POST) by its confirmation
+number and the securityToken make-reservation returned with it.
 """
 
 import json
 import uuid
-import requests
 from datetime import datetime, timedelta
+from typing import Optional
+
+import requests
 
+from . import http
 from .base import BookingClient, BookingClientError, Slot, BookingConfirmation
 
 
-BASE_URL = "https://www.opentable.com/dapi"
+SITE_URL = "https://www.opentable.com"
+BASE_URL = f"{SITE_URL}/dapi"
 
 # Persisted query hashes — these may rotate when OpenTable deploys frontend updates.
 # If requests start returning errors about unknown queries, recapture from browser dev tools.
 AVAILABILITY_HASH = "b2d05a06151b3cb21d9dfce4f021303eeba288fac347068b29c1cb66badc46af"
 SLOT_LOCK_HASH = "1100bf68905fd7cb1d4fd0f4504a4954aa28ec45fb22913fa977af8b06fd97fa"
 
+# Cancellation endpoint (under BASE_URL); like the hashes, recapture it if it starts failing.
+CANCEL_PATH = "/booking/cancel-reservation"
+
+# Account page used to check the session — redirects to login once the cookies expire.
+PROFILE_PATH = "/user/profile"
+
 
 class OpenTableApiError(BookingClientError):
     """Exception for OpenTable API errors."""
 
-    def __init__(self, message: str):
-        super().__init__(message, platform="opentable")
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+        transient: bool = False,
+        outcome_unknown: bool = False,
+    ):
+        super().__init__(
+            message, platform="opentable", status_code=status_code, retry_after=retry_after, transient=transient,
+            outcome_unknown=outcome_unknown,
+        )
 
 
 class OpenTableClient(BookingClient):
     """Client for interacting with the OpenTable web API."""
 
-    def __init__(self, credentials: dict):
+    # Requests that make a reservation: one that fails after it may have been
+    # sent can't be retried, since the first may have gone through (a slot
+    # lock just expires, so "lock" can be)
+    BOOKING_PHASES = ("make_reservation",)
+
+    def __init__(self, credentials: dict, session: Optional[requests.Session] = None):
         self.csrf_token = credentials["csrf_token"]
         self.cookies = credentials["cookies"]
         self.first_name = credentials["first_name"]
@@ -47,11 +75,43 @@ class OpenTableClient(BookingClient):
         self.country = credentials.get("country", "US")
         self.gpid = credentials["gpid"]
         self.database_region = credentials.get("database_region", "NA")
+        # Overridable so the client can be pointed at a local mock server
+        self.site_url = credentials.get("site_url", SITE_URL).rstrip("/")
+        self.base_url = f"{self.site_url}/dapi"
+        # A session shared with other clients (see api.jobs.BookingResources), or one of its own
+        self.session = session if session is not None else http.create_session()
+
+    def _request(self, method: str, url: str, phase: str, **kwargs):
+        """Send a request on the pooled session, recording its timing."""
+        kwargs.setdefault("timeout", self.request_timeout())
+        try:
+            return http.request(self.session, method, url, phase, self.instrumentation, **kwargs)
+        except requests.RequestException as e:
+            if phase in self.BOOKING_PHASES and not http.never_sent(e):
+                raise OpenTableApiError(f"{phase} request failed, outcome unknown: {type(e).__name__}: {e}",
+                                        outcome_unknown=True) from e
+            raise OpenTableApiError(f"{phase} request failed: {type(e).__name__}: {e}", transient=True) from e
 
     @property
     def platform_name(self) -> str:
         return "opentable"
 
+    def update_credentials(self, credentials: dict) -> None:
+        """Swap in a recaptured CSRF token and cookie string."""
+        self.csrf_token = credentials["csrf_token"]
+        self.cookies = credentials["cookies"]
+
+    def validate_credentials(self) -> bool:
+        """
+        Check the session cookies by loading the account page without following redirects.
+
+        Only a 401 or 403, or the redirect to the login page, means they're
+        rejected; any other answer (a 429, a server error) says nothing about them.
+        """
+        headers = {k: v for k, v in self._headers().items() if k != "content-type"}
+        response = self._request("GET", f"{self.site_url}{PROFILE_PATH}", "validate", headers=headers, allow_redirects=False)
+        return response.status_code not in (401, 403) and not 300 <= response.status_code < 400
+
     def _headers(self) -> dict:
         """Build headers for API requests."""
         return {
@@ -63,17 +123,19 @@ class OpenTableClient(BookingClient):
             "Cookie": self.cookies,
         }
 
-    def _gql_request(self, optype: str, opname: str, payload: dict) -> dict:
+    def _gql_request(self, optype: str, opname: str, payload: dict, phase: str) -> dict:
         """Make a GraphQL request to the dapi endpoint."""
-        url = f"{BASE_URL}/fe/gql?optype={optype}&opname={opname}"
-        response = requests.post(url, headers=self._headers(), json=payload)
+        url = f"{self.base_url}/fe/gql?optype={optype}&opname={opname}"
+        response = self._request("POST", url, phase, headers=self._headers(), json=payload)
 
         if response.status_code != 200:
             raise OpenTableApiError(
-                f"{opname} failed: {response.status_code} {response.text}"
+                f"{opname} failed: {response.status_code} {response.text}",
+                status_code=response.status_code,
+                retry_after=http.retry_after(response),
             )
 
-        data = response.json()
+        data = http.parse_json(response)
         if "errors" in data:
             raise OpenTableApiError(
                 f"{opname} returned errors: {json.dumps(data['errors'])}"
@@ -112,7 +174,7 @@ class OpenTableClient(BookingClient):
             },
         }
 
-        data = self._gql_request("query", "RestaurantsAvailability", payload)
+        data = self._gql_request("query", "RestaurantsAvailability", payload, "find")
 
         availability = data.get("data", {}).get("availability", [])
         if not availability:
@@ -195,7 +257,7 @@ class OpenTableClient(BookingClient):
             },
         }
 
-        data = self._gql_request("mutation", "BookDetailsStandardSlotLock", payload)
+        data = self._gql_request("mutation", "BookDetailsStandardSlotLock", payload, "lock")
 
         lock_response = data.get("data", {}).get("lockSlot", {})
         if not lock_response.get("success"):
@@ -225,7 +287,7 @@ class OpenTableClient(BookingClient):
         Returns:
             The raw reservation response dict.
         """
-        url = f"{BASE_URL}/booking/make-reservation"
+        url = f"{self.base_url}/booking/make-reservation"
 
         payload = {
             "restaurantId": restaurant_id,
@@ -262,14 +324,16 @@ class OpenTableClient(BookingClient):
         }
 
         headers = {**self._headers(), "accept": "application/json"}
-        response = requests.post(url, headers=headers, json=payload)
+        response = self._request("POST", url, "make_reservation", headers=headers, json=payload)
 
         if response.status_code != 200:
             raise OpenTableApiError(
-                f"make-reservation failed: {response.status_code} {response.text}"
+                f"make-reservation failed: {response.status_code} {response.text}",
+                status_code=response.status_code,
+                retry_after=http.retry_after(response),
             )
 
-        data = response.json()
+        data = http.parse_json(response)
 
         if not data.get("success"):
             raise OpenTableApiError(
@@ -314,8 +378,38 @@ class OpenTableClient(BookingClient):
             confirmation_id=str(result["confirmationNumber"]),
             reservation_id=str(result.get("reservationId", "")),
             details={
+                "restaurant_id": restaurant_id,
                 "security_token": result.get("securityToken"),
                 "environment": result.get("environment"),
                 "reservation_type": result.get("reservationType"),
             },
         )
+
+    def cancel_booking(self, confirmation: BookingConfirmation) -> None:
+        """Cancel an OpenTable reservation by confirmation number and security token."""
+        details = confirmation.details or {}
+        security_token = details.get("security_token")
+        if not security_token:
+            raise OpenTableApiError("Confirmation missing security_token in details")
+
+        payload = {
+            "confirmationNumber": int(confirmation.confirmation_id),
+            "securityToken": security_token,
+            "databaseRegion": self.database_region,
+        }
+        if details.get("restaurant_id") is not None:
+            payload["restaurantId"] = int(details["restaurant_id"])
+
+        headers = {**self._headers(), "accept": "application/json"}
+        response = self._request("POST", f"{self.base_url}{CANCEL_PATH}", "cancel", headers=headers, json=payload)
+
+        if response.status_code != 200:
+            raise OpenTableApiError(
+                f"cancel-reservation failed: {response.status_code} {response.text}",
+                status_code=response.status_code,
+                retry_after=http.retry_after(response),
+            )
+
+        data = http.parse_json(response)
+        if data.get("success") is False:
+            raise OpenTableApiError(f"Cancellation failed: {json.dumps(data)}")
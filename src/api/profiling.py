@@ -0,0 +1,285 @@
+"""
+Opt-in profiling of a single booking attempt.
+
+Two modes:
+    cprofile  Deterministic (cProfile). Exact call counts and times; adds
+              per-call overhead, so absolute numbers run a little high.
+    sample    Statistical. A background thread snapshots the profiled
+              threads' stacks every `interval` seconds; near-zero overhead,
+              so timings stay representative of an unprofiled run.
+
+Both cover the thread that starts the profiler and every thread started
+while it runs, so race, batch and fan-out bookings, whose work runs in
+executor threads, are profiled too.
+
+Both produce a text report and a folded-stacks file ("a;b;c <weight>" per
+line) that flamegraph.pl, speedscope and inferno read directly. cprofile mode
+also writes the raw .prof for snakeviz/pstats.
+
+Usage:
+    profiler = create_profiler("sample")
+    with profiler:
+        ...booking attempt...
+    paths = profiler.write("oddjob-profile")
+"""
+
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Optional
+
+
+PROFILE_MODES = ("cprofile", "sample")
+DEFAULT_SAMPLE_INTERVAL = 0.001
+
+# From 3.12 cProfile is built on sys.monitoring and sees every thread; before
+# that it only sees the thread that enabled it
+_CPROFILE_PER_THREAD = sys.version_info < (3, 12)
+
+
+def _frame_label(filename: str, lineno: int, name: str) -> str:
+    # Semicolons separate frames in the folded format; cProfile files built-ins under "~"
+    label = name if filename == "~" else f"{name} ({filename}:{lineno})"
+    return label.replace(";", ":")
+
+
+class Profiler(ABC):
+    """Base class: context manager around the profiled window."""
+
+    mode = ""
+
+    def __init__(self):
+        self.started_at: Optional[float] = None
+        self.duration_ms: Optional[float] = None
+
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+
+    def stop(self) -> None:
+        self.duration_ms = (time.perf_counter() - self.started_at) * 1000
+
+    def __enter__(self) -> "Profiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    @abstractmethod
+    def report(self, limit: int = 30) -> str:
+        """Human-readable report of where the time went."""
+        ...
+
+    @abstractmethod
+    def folded(self) -> str:
+        """Folded stacks ("a;b;c <weight>" per line) for flamegraph tools."""
+        ...
+
+    def write(self, prefix: str) -> dict[str, str]:
+        """
+        Write <prefix>.txt (report) and <prefix>.folded (flamegraph input).
+
+        Returns:
+            Dict of output kind to path
+        """
+        paths = {"report": f"{prefix}.txt", "folded": f"{prefix}.folded"}
+        with open(paths["report"], "w") as f:
+            f.write(self.report())
+        with open(paths["folded"], "w") as f:
+            f.write(self.folded())
+        return paths
+
+
+class DeterministicProfiler(Profiler):
+    """
+    cProfile over the window; folded stacks are reconstructed from the caller graph.
+
+    Where cProfile only sees its own thread, each thread started during the
+    window gets a profile of its own (through threading.setprofile), and
+    the stats are merged when profiling stops.
+    """
+
+    mode = "cprofile"
+
+    def __init__(self):
+        super().__init__()
+        self._profile = cProfile.Profile()
+        self._thread_profiles: list[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._profiling = False
+        self._stats: Optional[pstats.Stats] = None
+
+    def start(self) -> None:
+        super().start()
+        self._profiling = True
+        if _CPROFILE_PER_THREAD:
+            threading.setprofile(self._profile_thread)
+        self._profile.enable()
+
+    def _profile_thread(self, frame, event, arg) -> None:
+        # Runs once, as each new thread starts: hand the thread over to a profile of its own
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        with self._lock:
+            if not self._profiling:
+                return
+            self._thread_profiles.append(profile)
+        profile.enable()
+
+    def stop(self) -> None:
+        self._profile.disable()
+        if _CPROFILE_PER_THREAD:
+            threading.setprofile(None)
+        with self._lock:
+            self._profiling = False
+        super().stop()
+        self._stats = pstats.Stats(self._profile, *self._thread_profiles)
+
+    def report(self, limit: int = 30) -> str:
+        out = io.StringIO()
+        out.write(f"cProfile report ({self.duration_ms:.1f} ms profiled")
+        if self._thread_profiles:
+            out.write(f", {len(self._thread_profiles)} threads besides the caller's")
+        out.write(")\n\n")
+        stats = self._stats
+        stats.stream = out
+        stats.sort_stats("cumulative").print_stats(limit)
+        stats.sort_stats("tottime").print_stats(limit)
+        return out.getvalue()
+
+    def folded(self, min_us: int = 10) -> str:
+        """
+        Folded stacks weighted in microseconds, dropping stacks under min_us.
+
+        cProfile only keeps caller→callee edges, so deeper stacks apportion a
+        function's time among its callers by their share of its cumulative
+        time (the same approximation flameprof makes).
+        """
+        stats = self._stats.stats
+        callees: dict[tuple, list[tuple]] = {}
+        for func, (_, _, _, _, callers) in stats.items():
+            for caller in callers:
+                callees.setdefault(caller, []).append(func)
+
+        lines: Counter = Counter()
+
+        def walk(func, stack, tt, ct, seen):
+            label = _frame_label(*func)
+            path = f"{stack};{label}" if stack else label
+            if tt > 0:
+                lines[path] += tt
+            total_ct = stats[func][3]
+            if total_ct <= 0:
+                return
+            scale = ct / total_ct
+            seen = seen | {func}
+            for child in callees.get(func, ()):
+                if child in seen:
+                    continue  # recursion; its time is already counted higher up the stack
+                _, _, edge_tt, edge_ct = stats[child][4][func][:4]
+                walk(child, path, edge_tt * scale, edge_ct * scale, seen)
+
+        for func, (_, _, tt, ct, callers) in stats.items():
+            if not callers:
+                walk(func, "", tt, ct, frozenset())
+
+        return "".join(
+            f"{path} {round(seconds * 1e6)}\n" for path, seconds in lines.items() if seconds * 1e6 >= min_us
+        )
+
+    def write(self, prefix: str) -> dict[str, str]:
+        paths = super().write(prefix)
+        paths["prof"] = f"{prefix}.prof"
+        self._stats.dump_stats(paths["prof"])
+        return paths
+
+
+class SamplingProfiler(Profiler):
+    """Samples the stacks of the starting thread, and threads it starts, from a background thread."""
+
+    mode = "sample"
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        super().__init__()
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._target: Optional[int] = None
+        # Threads already running at the start, other than the target; not sampled
+        self._ignored: set[int] = set()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        super().start()
+        self._target = threading.get_ident()
+        self._ignored = {thread.ident for thread in threading.enumerate()} - {self._target}
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._thread.join()
+        super().stop()
+
+    def _run(self) -> None:
+        ignored = self._ignored | {threading.get_ident()}
+        while not self._stopping.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident in ignored:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                if stack:
+                    self.samples[tuple(reversed(stack))] += 1
+
+    @property
+    def sample_count(self) -> int:
+        return sum(self.samples.values())
+
+    def report(self, limit: int = 30) -> str:
+        total = self.sample_count
+        own: Counter = Counter()
+        inclusive: Counter = Counter()
+        for stack, count in self.samples.items():
+            own[stack[-1]] += count
+            for frame in set(stack):
+                inclusive[frame] += count
+
+        out = io.StringIO()
+        out.write(f"Sampling report: {total} samples every {self.interval * 1000:g} ms "
+                  f"({self.duration_ms:.1f} ms profiled)\n")
+        for title, counts in (("Self", own), ("Inclusive", inclusive)):
+            out.write(f"\n{title}:\n{'samples':>8} {'%':>6}  function\n")
+            for frame, count in counts.most_common(limit):
+                pct = 100 * count / total if total else 0
+                out.write(f"{count:>8} {pct:>5.1f}%  {_frame_label(*frame)}\n")
+        return out.getvalue()
+
+    def folded(self) -> str:
+        return "".join(
+            f"{';'.join(_frame_label(*frame) for frame in stack)} {count}\n"
+            for stack, count in self.samples.items()
+        )
+
+
+def create_profiler(mode: str = "cprofile", interval: float = DEFAULT_SAMPLE_INTERVAL) -> Profiler:
+    """
+    Create a profiler for one of PROFILE_MODES.
+
+    Raises:
+        ValueError: If the mode is unknown
+    """
+    if mode == "cprofile":
+        return DeterministicProfiler()
+    if mode == "sample":
+        return SamplingProfiler(interval)
+    raise ValueError(f"Unknown profile mode '{mode}'. Use one of: {', '.join(PROFILE_MODES)}")
@@ -0,0 +1,286 @@
+"""
+Race one booking across platforms.
+
+Some restaurants take reservations on both Resy and OpenTable. race_booking()
+searches every platform at once, merges the slots into one ranked list
+(time preference, then table type, then the order platforms were given)
+and books the best slot on whichever platform has it. If that slot is gone,
+the next candidate is tried, possibly on the other platform.
+
+Searches don't wait on a slow platform longer than they have to: once a
+platform has answered with a slot nothing can beat (the best time, and the
+first preferred table type if there are any), it's booked straight away
+and the other platforms' searches are abandoned. Otherwise the race waits
+for every platform, but no more than straggler_timeout after the first
+answer. Only one booking request is ever in flight, so the race can't end
+up holding two reservations. For the same reason a booking that fails
+fatally, or whose outcome is unknown, ends the race: it may have gone
+through, so nothing is booked on another platform after it.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional, Union
+
+from .base import BookingClient, BookingClientError, Slot
+from .booking_loop import BookingOutcome, Deadline
+from .instrumentation import Instrumentation, traced, traced_sleep
+from .logs import get_logger
+from .retry_policy import ABORT, BACKOFF, FATAL, NEXT_CANDIDATE, REFRESH, RetryPolicy, policy_for
+from .slot_selection import rank_slots
+from .time_preferences import TimePreferences
+
+
+logger = get_logger("race")
+
+
+DEFAULT_STRAGGLER_TIMEOUT = 1.0
+
+
+def _unbeatable(slot: Slot, preferences: TimePreferences, table_types: Optional[list[str]]) -> bool:
+    if preferences.rank(slot.time) != 0:
+        return False
+    return not table_types or table_types[0].lower() in slot.table_type.lower()
+
+
+def race_booking(
+    clients: dict[str, BookingClient],
+    venues: dict[str, str],
+    date: str,
+    party_size: int,
+    preferences: Union[TimePreferences, list[str]],
+    table_types: Optional[list[str]] = None,
+    retry_count: int = 3,
+    retry_delay: float = 0.0,
+    dry_run: bool = False,
+    instrumentation: Optional[Instrumentation] = None,
+    policies: Optional[dict[str, RetryPolicy]] = None,
+    refresh: Optional[Callable[[str], bool]] = None,
+    straggler_timeout: float = DEFAULT_STRAGGLER_TIMEOUT,
+    sleep: Callable[[float], None] = time.sleep,
+    log: Callable[[str], None] = logger.info,
+    deadline: Optional[Deadline] = None,
+    cancelled: Optional[Callable[[], bool]] = None,
+) -> BookingOutcome:
+    """
+    Find slots on every platform at once and book the best one anywhere.
+
+    Errors are handled per platform with that platform's policy: an expired
+    token is refreshed, a platform whose search fails fatally drops out of
+    the race, and a lost slot moves on to the next candidate. A booking
+    that fails fatally or with an unknown outcome ends the race.
+
+    Args:
+        clients: Platform -> client
+        venues: Platform -> that platform's venue ID; the order breaks ties
+        date, party_size: What to book
+        preferences: Compiled time preferences (or times, best first)
+        table_types: Optional table type preferences
+        retry_count: Maximum number of searches
+        retry_delay: Seconds to wait after a search with nothing to book
+        dry_run: Stop after selecting a slot
+        instrumentation: Records selection timing and the 'confirmed' mark,
+            and with a tracer, spans for each search, booking and wait
+        policies: Platform -> retry policy; the platform defaults otherwise
+        refresh: Refreshes a platform's credentials; returns True on success
+        straggler_timeout: Longest wait for the other platforms after the first answers
+        sleep: Sleep function
+        log: Progress output
+        deadline: Stop in time for it, polling past retry_count until then
+            if it says to keep polling (see api.booking_loop.Deadline)
+        cancelled: Checked before each search and booking; the race stops
+            (outcome.cancelled) once it returns True
+
+    Returns:
+        BookingOutcome; the winning platform is outcome.slot.platform
+    """
+    if not isinstance(preferences, TimePreferences):
+        preferences = TimePreferences.from_times(preferences)
+    active = [p for p in venues if p in clients]
+    policies = {p: (policies or {}).get(p) or policy_for(p) for p in active}
+    max_candidates = max((policy.max_candidates for policy in policies.values()), default=0)
+
+    last_error = None
+    last_category = None
+    attempt = 0
+    executor = ThreadPoolExecutor(max_workers=max(1, len(active)), thread_name_prefix="oddjob-race")
+    sleep = traced_sleep(sleep, instrumentation)
+    polling = deadline is not None and deadline.keep_polling
+    out_of_time = False
+    stopped = False
+
+    def pause(seconds: float) -> bool:
+        """Wait before the next search; False if the deadline leaves no time for one."""
+        nonlocal out_of_time
+        if attempt >= retry_count:
+            if not polling:
+                return True  # no next search
+            seconds = max(seconds, deadline.poll_interval)
+        if deadline is not None and not deadline.can_search(after=seconds):
+            out_of_time = True
+            return False
+        sleep(seconds)
+        return True
+
+    def search(platform: str) -> list[Slot]:
+        with traced(instrumentation, "search", platform=platform, attempt=attempt) as span:
+            slots = clients[platform].find_slots(venues[platform], date, party_size)
+            if span:
+                span.attributes["slots"] = len(slots)
+            return slots
+
+    def drop(platform: str, reason: str) -> None:
+        if platform in active:
+            active.remove(platform)
+            log(f"  {platform} out of the race: {reason}")
+
+    try:
+        while (attempt < retry_count or polling) and active:
+            if cancelled is not None and cancelled():
+                stopped = True
+                break
+            if deadline is not None and not deadline.can_search():
+                out_of_time = True
+                break
+            attempt += 1
+            if attempt > retry_count:
+                log(f"Attempt {attempt} on {', '.join(active)} ({deadline.remaining():.1f}s left)...")
+            else:
+                log(f"Attempt {attempt}/{retry_count} on {', '.join(active)}...")
+            searching_since = deadline.clock() if deadline is not None else 0.0
+
+            # Search every platform at once
+            futures = {
+                executor.submit(search, p): p for p in active
+            }
+            found: list[Slot] = []
+            ranked: list[Slot] = []
+            backoff = 0.0
+            failed = False
+            pending = set(futures)
+            stragglers_until = None
+            while pending:
+                timeout = None if stragglers_until is None else max(0.0, stragglers_until - time.monotonic())
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    platform = futures[future]
+                    try:
+                        slots = future.result()
+                    except BookingClientError as e:
+                        log(f"  {platform} search failed: {e}")
+                        failed = True
+                        last_error = str(e)
+                        decision = policies[platform].decide(e, attempt)
+                        last_category = decision.category
+                        if decision.action == REFRESH:
+                            if not (refresh and refresh(platform)):
+                                drop(platform, "credentials could not be refreshed")
+                        elif decision.action == ABORT:
+                            drop(platform, decision.category)
+                        elif decision.action == BACKOFF:
+                            backoff = max(backoff, decision.delay)
+                        continue
+                    log(f"  {platform}: {len(slots)} slots")
+                    found.extend(slots)
+
+                if stragglers_until is None:
+                    stragglers_until = time.monotonic() + straggler_timeout
+                ranked = rank_slots(found, preferences, table_types)
+                if pending and ranked and _unbeatable(ranked[0], preferences, table_types):
+                    log(f"  Not waiting for {', '.join(futures[f] for f in pending)}: "
+                        f"{ranked[0].platform} has the best slot")
+                    break
+            for future in pending:
+                future.cancel()
+            if deadline is not None:
+                deadline.searched(deadline.clock() - searching_since)
+
+            if instrumentation:
+                with instrumentation.phase("selection"):
+                    ranked = rank_slots(found, preferences, table_types)
+            else:
+                ranked = rank_slots(found, preferences, table_types)
+
+            if not ranked:
+                log("  No slots match preferred times." if found else "  No slots available.")
+                if found:
+                    last_error = "No slots match preferred times"
+                elif not failed:
+                    last_error = "No slots available"
+                if not pause(max(retry_delay, backoff)):
+                    break
+                continue
+
+            # Book down the merged list, one request at a time
+            tried = 0
+            for slot in ranked:
+                if slot.platform not in active:
+                    continue
+                if tried > max_candidates:
+                    break
+                tried += 1
+                log(f"  Selected: {slot.platform} {slot.time} - {slot.table_type}")
+                if dry_run:
+                    return BookingOutcome(success=True, attempts=attempt, slot=slot, dry_run=True)
+                if cancelled is not None and cancelled():
+                    stopped = True
+                    break
+                if deadline is not None and not deadline.can_book():
+                    log(f"  Not booking: {deadline.remaining():.1f}s left")
+                    out_of_time = True
+                    break
+                booking_since = deadline.clock() if deadline is not None else 0.0
+                try:
+                    with traced(instrumentation, "booking", platform=slot.platform, attempt=attempt,
+                                time=slot.time, table_type=slot.table_type):
+                        confirmation = clients[slot.platform].book_slot(slot, date, party_size)
+                except BookingClientError as e:
+                    log(f"  Error: {e}")
+                    last_error = str(e)
+                    decision = policies[slot.platform].decide(e, attempt)
+                    last_category = decision.category
+                    log(f"  {decision.category}: {decision.action}")
+                    if e.outcome_unknown or decision.category == FATAL:
+                        # It may have booked (a lost response, an acceptance
+                        # without a token), so booking elsewhere could hold two tables
+                        log(f"  Stopping the race after a failed {slot.platform} booking")
+                        return BookingOutcome(success=False, attempts=attempt, slot=slot, error=last_error,
+                                              error_category=last_category, outcome_unknown=e.outcome_unknown)
+                    if decision.action == NEXT_CANDIDATE:
+                        continue
+                    if decision.action == REFRESH:
+                        if not (refresh and refresh(slot.platform)):
+                            drop(slot.platform, "credentials could not be refreshed")
+                        break
+                    if decision.action == BACKOFF:
+                        pause(decision.delay)
+                        break
+                    drop(slot.platform, decision.category)
+                    continue
+                finally:
+                    if deadline is not None:
+                        deadline.booked(deadline.clock() - booking_since)
+
+                if instrumentation:
+                    instrumentation.mark("confirmed")
+                return BookingOutcome(success=True, attempts=attempt, slot=slot, confirmation=confirmation)
+            if out_of_time or stopped:
+                break
+    finally:
+        # Abandon whatever's still running; its results are no longer wanted
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if stopped:
+        log(f"  Cancelled after {attempt} attempts")
+        return BookingOutcome(success=False, attempts=attempt, error="Cancelled", cancelled=True)
+    if out_of_time:
+        log(f"  Out of time after {attempt} attempts")
+    return BookingOutcome(
+        success=False,
+        attempts=attempt,
+        error=last_error or ("Out of time" if out_of_time else None),
+        error_category=last_category,
+        out_of_time=out_of_time,
+    )
@@ -0,0 +1,242 @@
+"""
+Keep one booking per job when a parallel strategy confirms several.
+
+Booking several candidates at once (a fan-out's dates, venues or platforms;
+see api/fanout.py) can confirm more than one reservation: bookings already
+in flight when the first one confirms still go through. reconcile() keeps
+the best of a job's confirmed bookings and cancels the rest straight away,
+all at once, retrying cancellations that fail for a transient reason.
+
+"Best" is the most preferred candidate (the earliest in the job's candidate
+list), then the slot nearest the candidate's preferred time, then the
+earliest confirmed.
+
+Every reconciliation produces an audit record: what was kept, each
+cancellation with its attempts and outcome, and any booking left standing
+because it couldn't be cancelled (which someone needs to cancel by hand).
+Records are written to an audit log; open_audit_log() picks one from a
+target string: "-" for the log (CloudWatch in Lambda) or a file of JSON
+lines.
+"""
+
+import json
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Optional
+
+from .base import BookingClient, BookingClientError, BookingConfirmation
+from .logs import OUTCOME, get_logger
+from .time_preferences import compile_preferences
+
+
+logger = get_logger("reconcile")
+
+
+DEFAULT_CANCEL_RETRIES = 2
+DEFAULT_CANCEL_RETRY_DELAY = 0.5
+# Booking fields kept in audit records (never its cancellation tokens)
+AUDIT_FIELDS = ("id", "platform", "venue_id", "date", "time", "party_size", "table_type",
+                "confirmation_id", "reservation_id", "confirmed_at")
+
+
+def booking_rank(booking: dict, candidate_order: Optional[dict] = None) -> tuple:
+    """
+    Sort key for a confirmed booking; lowest is best.
+
+    Args:
+        booking: A confirmed booking (a booking response body plus the
+            candidate's "id", "date", "best", ...)
+        candidate_order: Candidate id -> position in the job's list
+    """
+    position = (candidate_order or {}).get(booking.get("id"), len(candidate_order or {}))
+    time_rank = None
+    if booking.get("time") and all(booking.get(key) for key in ("best", "earliest", "latest")):
+        try:
+            preferences = compile_preferences(booking["best"], booking["earliest"], booking["latest"],
+                                              booking.get("tolerance"))
+            time_rank = preferences.rank(booking["time"])
+        except ValueError:
+            pass
+    return (
+        position,
+        time_rank if time_rank is not None else float("inf"),
+        booking.get("confirmed_at") or float("inf"),
+    )
+
+
+def confirmation_of(booking: dict) -> BookingConfirmation:
+    return BookingConfirmation(
+        platform=booking["platform"],
+        confirmation_id=str(booking["confirmation_id"]),
+        reservation_id=booking.get("reservation_id"),
+        details=booking.get("details"),
+    )
+
+
+def _is_transient(error: Exception) -> bool:
+    """Worth retrying: the request never completed, a rate limit or a server error."""
+    status = getattr(error, "status_code", None)
+    return getattr(error, "transient", False) or status == 429 or (status is not None and status >= 500)
+
+
+@dataclass
+class Cancellation:
+    """One surplus booking and what became of cancelling it."""
+    booking: dict
+    cancelled: bool = False
+    attempts: int = 0
+    error: Optional[str] = None
+    started_at: float = 0.0
+    finished_at: float = 0.0
+
+
+@dataclass
+class ReconcileRecord:
+    """The audit record of one job's reconciliation."""
+    job_id: str
+    kept: Optional[dict] = None
+    cancellations: list[Cancellation] = field(default_factory=list)
+    started_at: float = field(default_factory=time.time)
+    finished_at: float = 0.0
+
+    @property
+    def left_standing(self) -> list[dict]:
+        """Surplus bookings that couldn't be cancelled and still hold a table."""
+        return [c.booking for c in self.cancellations if not c.cancelled]
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "kept": self.kept,
+            "cancelled": sum(1 for c in self.cancellations if c.cancelled),
+            "left_standing": self.left_standing,
+            "cancellations": [asdict(c) for c in self.cancellations],
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class AuditLog:
+    """
+    Writes reconcile records as JSON lines, to a file (appended) or the log.
+
+    Args:
+        path: File to append to; the "oddjob.reconcile" logger without one
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, record: ReconcileRecord) -> None:
+        entry = record.to_dict()
+        if self.path is None:
+            logger.info(json.dumps(entry, default=str), extra={"audit": entry})
+            return
+        with self._lock, open(self.path, "a") as f:
+            f.write(json.dumps(entry, default=str) + "\n")
+
+
+def open_audit_log(target: Optional[str]) -> AuditLog:
+    """The audit log for a target: "-" (the log, also the default) or a path or file:// URL."""
+    if not target or target in ("-", "log"):
+        return AuditLog()
+    if target.startswith("file://"):
+        target = target[len("file://"):]
+    return AuditLog(path=target)
+
+
+def cancel_with_retries(
+    client: BookingClient,
+    booking: dict,
+    retries: int = DEFAULT_CANCEL_RETRIES,
+    retry_delay: float = DEFAULT_CANCEL_RETRY_DELAY,
+    sleep: Callable[[float], None] = time.sleep,
+) -> Cancellation:
+    """
+    Cancel one booking, retrying transient failures with exponential backoff
+    (or the response's Retry-After). Never raises.
+    """
+    cancellation = Cancellation({key: booking[key] for key in AUDIT_FIELDS if key in booking},
+                                started_at=time.time())
+    for attempt in range(retries + 1):
+        cancellation.attempts = attempt + 1
+        try:
+            client.cancel_booking(confirmation_of(booking))
+        except (BookingClientError, KeyError, ValueError) as e:
+            cancellation.error = f"{type(e).__name__}: {e}"
+            if attempt < retries and isinstance(e, BookingClientError) and _is_transient(e):
+                sleep(e.retry_after if e.retry_after is not None else retry_delay * 2 ** attempt)
+                continue
+            break
+        cancellation.cancelled = True
+        cancellation.error = None
+        break
+    cancellation.finished_at = time.time()
+    return cancellation
+
+
+def reconcile(
+    job_id: str,
+    bookings: list[dict],
+    client_for: Callable[[str], BookingClient],
+    candidate_order: Optional[dict] = None,
+    audit: Optional[AuditLog] = None,
+    retries: int = DEFAULT_CANCEL_RETRIES,
+    retry_delay: float = DEFAULT_CANCEL_RETRY_DELAY,
+    sleep: Callable[[float], None] = time.sleep,
+    log: Callable[[str], None] = logger.info,
+) -> ReconcileRecord:
+    """
+    Keep a job's best confirmed booking and cancel the others, concurrently.
+
+    Args:
+        job_id: Identifies the job in the audit record (e.g. a fan-out's id)
+        bookings: The job's confirmed bookings, each with "platform",
+            "confirmation_id" and the "details" its platform cancels by
+        client_for: A client for a platform, to cancel through
+        candidate_order: Candidate id -> position in the job's list (see booking_rank)
+        audit: Where the record is written; not written without one
+        retries: Retries of a cancellation that failed for a transient reason
+        retry_delay: First retry delay in seconds, doubling each retry
+        sleep: Used between retries
+        log: Progress output
+
+    Returns:
+        ReconcileRecord
+    """
+    record = ReconcileRecord(job_id)
+    if bookings:
+        ranked = sorted(bookings, key=lambda booking: booking_rank(booking, candidate_order))
+        record.kept = {key: ranked[0][key] for key in AUDIT_FIELDS if key in ranked[0]}
+        surplus = ranked[1:]
+        if surplus:
+            log(f"Job {job_id}: keeping {record.kept.get('confirmation_id')}, cancelling {len(surplus)} more")
+
+            def cancel(booking: dict) -> Cancellation:
+                try:
+                    client = client_for(booking["platform"])
+                except Exception as e:
+                    cancellation = Cancellation({key: booking[key] for key in AUDIT_FIELDS if key in booking},
+                                                error=f"No client: {e}")
+                    cancellation.started_at = cancellation.finished_at = time.time()
+                    return cancellation
+                return cancel_with_retries(client, booking, retries, retry_delay, sleep)
+
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(max_workers=len(surplus), thread_name_prefix="oddjob-cancel") as executor:
+                record.cancellations = list(executor.map(cancel, surplus))
+
+    record.finished_at = time.time()
+    for booking in record.left_standing:
+        logger.log(OUTCOME, f"Job {job_id}: could not cancel surplus booking {booking.get('platform')} "
+                            f"{booking.get('confirmation_id')}; cancel it by hand")
+    if audit is not None:
+        try:
+            audit.write(record)
+        except Exception as e:
+            # The cancellations happened either way; the record is also in the response
+            logger.warning(f"Could not write the audit record of {job_id}: {e}")
+    return record
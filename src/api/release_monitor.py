@@ -0,0 +1,263 @@
+"""
+Learn when a venue actually releases its inventory.
+
+We fire at the advertised release instant (e.g. exactly 09:00:00), but some
+venues drop slots a little early or late, and popular slots are gone within
+seconds. monitor_release() polls a venue at a high rate around an expected
+release and records when slots first appeared (relative to the expected
+instant) and how long each stayed up. Observations are stored per venue as
+JSON, and recommend() turns them into a fire offset, a polling interval and
+the number of retries needed to cover the window where slots typically
+appear.
+
+scheduler.schedule_booking and `cli.py --run-at` apply the recommendation
+automatically when a venue has history (see load_recommendation, and
+load_race_recommendation for a booking raced across platforms).
+
+Usage:
+    python cli.py --monitor-release "2026-02-05 09:00:00" --venue-id 25973 --date 2026-02-19 --guests 2
+"""
+
+import json
+import math
+import os
+import statistics
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+from .base import BookingClient, BookingClientError
+from .logs import get_logger
+from .retry_policy import RATE_LIMITED, policy_for
+
+
+logger = get_logger("release")
+
+
+# Observations live next to config.json unless ODDJOB_RELEASE_DIR says otherwise
+DEFAULT_RELEASE_DIR = Path(__file__).resolve().parent.parent.parent / "releases"
+
+DEFAULT_POLL_INTERVAL = 0.25
+# Time for the find request itself to reach the platform, taken off the fire offset
+REQUEST_MARGIN = 0.15
+MAX_FIRE_OFFSET = 30.0
+MAX_RETRIES = 60
+
+
+@dataclass
+class ReleaseObservation:
+    """What one monitored release looked like, in seconds relative to the expected release."""
+    platform: str
+    venue_id: str
+    date: str
+    party_size: int
+    expected_release: float  # epoch seconds
+    first_seen_offset: Optional[float] = None
+    # Slot time -> seconds it stayed listed; None if still listed when monitoring ended
+    slot_lifetimes: dict[str, Optional[float]] = field(default_factory=dict)
+    polls: int = 0
+    errors: int = 0
+    interval: float = DEFAULT_POLL_INTERVAL
+
+
+@dataclass
+class ReleaseRecommendation:
+    """
+    When to fire and how long to keep polling, relative to the expected release.
+
+    fire_offset is added to the scheduled time (negative fires early);
+    poll_interval and retries are the retry_delay and retry_count that cover
+    the window in which slots have been seen to appear.
+    """
+    samples: int
+    fire_offset: float
+    window: float
+    poll_interval: float
+    retries: int
+    median_first_seen: float
+    median_lifetime: Optional[float]
+
+
+def _quantile(values: list[float], q: float) -> float:
+    """Nearest-rank quantile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def monitor_release(
+    client: BookingClient,
+    venue_id: str,
+    date: str,
+    party_size: int,
+    expected_release: float,
+    before: float = 30.0,
+    after: float = 120.0,
+    interval: float = DEFAULT_POLL_INTERVAL,
+    clock: Callable[[], float] = time.time,
+    sleep: Callable[[float], None] = time.sleep,
+    log: Callable[[str], None] = logger.info,
+) -> ReleaseObservation:
+    """
+    Poll a venue from `before` seconds ahead of the expected release until
+    `after` seconds past it, recording slot appearances and lifetimes.
+
+    Monitoring stops early once every slot seen has disappeared again.
+
+    Args:
+        client: Platform client
+        venue_id, date, party_size: The query to watch
+        expected_release: Advertised release instant, epoch seconds
+        before, after: Window around the release to poll
+        interval: Seconds between polls
+        clock, sleep: Time source and sleep (replaceable for simulation)
+        log: Progress output
+    """
+    observation = ReleaseObservation(
+        platform=client.platform_name,
+        venue_id=str(venue_id),
+        date=date,
+        party_size=party_size,
+        expected_release=expected_release,
+        interval=interval,
+    )
+    policy = policy_for(client.platform_name)
+    first_seen: dict[str, float] = {}
+    last_seen: dict[str, float] = {}
+    gone: set[str] = set()
+
+    start = expected_release - before
+    if clock() < start:
+        log(f"Monitoring starts in {start - clock():.0f}s")
+        sleep(start - clock())
+
+    end = expected_release + after
+    while clock() < end:
+        polled_at = clock()
+        try:
+            slots = client.find_slots(venue_id, date, party_size)
+        except BookingClientError as e:
+            observation.errors += 1
+            log(f"  {polled_at - expected_release:+.2f}s error: {e}")
+            if policy.classify(e) == RATE_LIMITED:
+                sleep(policy.backoff(RATE_LIMITED, observation.errors, e.retry_after))
+            else:
+                sleep(interval)
+            continue
+        observation.polls += 1
+        # The response reflects the platform's state around the middle of the round trip
+        seen_at = (polled_at + clock()) / 2 - expected_release
+
+        current = {s.time for s in slots}
+        for t in current - first_seen.keys():
+            first_seen[t] = seen_at
+            log(f"  {seen_at:+.2f}s appeared: {t}")
+        for t in current:
+            last_seen[t] = seen_at
+        for t in first_seen.keys() - current - gone:
+            gone.add(t)
+            log(f"  {seen_at:+.2f}s gone: {t} (up {seen_at - first_seen[t]:.2f}s)")
+
+        if first_seen and observation.first_seen_offset is None:
+            observation.first_seen_offset = round(min(first_seen.values()), 3)
+        if first_seen and gone == first_seen.keys():
+            break
+        sleep(max(0.0, interval - (clock() - polled_at)))
+
+    # A slot that disappeared went sometime between its last sighting and the next poll
+    observation.slot_lifetimes = {
+        t: round(last_seen[t] - first_seen[t] + interval / 2, 3) if t in gone else None
+        for t in sorted(first_seen)
+    }
+    return observation
+
+
+def recommend(observations: list[ReleaseObservation]) -> Optional[ReleaseRecommendation]:
+    """
+    Recommend a fire offset and polling window from past observations.
+
+    Fires just before the earliest typical appearance (10th percentile, less
+    the request's own latency) and keeps polling until the 90th percentile
+    appearance plus a second. The poll interval is a quarter of the median
+    slot lifetime, so a slot is usually seen several times before it's gone.
+
+    Returns:
+        None if no observation saw any slots
+    """
+    offsets = [o.first_seen_offset for o in observations if o.first_seen_offset is not None]
+    if not offsets:
+        return None
+
+    lifetimes = [v for o in observations for v in o.slot_lifetimes.values() if v is not None]
+    median_lifetime = statistics.median(lifetimes) if lifetimes else None
+
+    fire_offset = _quantile(offsets, 0.1) - REQUEST_MARGIN
+    fire_offset = max(-MAX_FIRE_OFFSET, min(MAX_FIRE_OFFSET, fire_offset))
+    window = _quantile(offsets, 0.9) - fire_offset + 1.0
+
+    poll_interval = DEFAULT_POLL_INTERVAL
+    if median_lifetime is not None:
+        poll_interval = max(0.05, min(0.5, median_lifetime / 4))
+    retries = min(MAX_RETRIES, math.ceil(window / poll_interval) + 1)
+
+    return ReleaseRecommendation(
+        samples=len(offsets),
+        fire_offset=round(fire_offset, 3),
+        window=round(window, 3),
+        poll_interval=round(poll_interval, 3),
+        retries=retries,
+        median_first_seen=round(statistics.median(offsets), 3),
+        median_lifetime=round(median_lifetime, 3) if median_lifetime is not None else None,
+    )
+
+
+def release_dir(directory: Optional[str] = None) -> Path:
+    return Path(directory or os.environ.get("ODDJOB_RELEASE_DIR") or DEFAULT_RELEASE_DIR)
+
+
+def _history_path(platform: str, venue_id: str, directory: Optional[str] = None) -> Path:
+    return release_dir(directory) / f"{platform}-{venue_id}.json"
+
+
+def load_observations(platform: str, venue_id: str, directory: Optional[str] = None) -> list[ReleaseObservation]:
+    """All stored observations for a venue (empty if none)."""
+    path = _history_path(platform, str(venue_id), directory)
+    if not path.exists():
+        return []
+    with open(path) as f:
+        return [ReleaseObservation(**entry) for entry in json.load(f)]
+
+
+def record_observation(observation: ReleaseObservation, directory: Optional[str] = None) -> Path:
+    """Append an observation to its venue's history file."""
+    path = _history_path(observation.platform, observation.venue_id, directory)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    history = [asdict(o) for o in load_observations(observation.platform, observation.venue_id, directory)]
+    history.append(asdict(observation))
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(history, f, indent=2)
+    tmp.replace(path)
+    return path
+
+
+def load_recommendation(
+    platform: str, venue_id: str, directory: Optional[str] = None
+) -> Optional[ReleaseRecommendation]:
+    """The recommendation from a venue's stored history, or None without usable history."""
+    return recommend(load_observations(platform, str(venue_id), directory))
+
+
+def load_race_recommendation(
+    venues: dict[str, str], directory: Optional[str] = None
+) -> Optional[ReleaseRecommendation]:
+    """
+    The recommendation for racing a booking across platforms (see api.race).
+
+    The venues' histories are pooled, so the race fires before the earliest
+    platform typically releases and polls until the latest has.
+    """
+    observations = []
+    for platform, venue_id in venues.items():
+        observations.extend(load_observations(platform, str(venue_id), directory))
+    return recommend(observations)
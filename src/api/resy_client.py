@@ -6,11 +6,13 @@ API documentation derived from community research: https://github.com/Alkaar/res
 """
 
 import json
-import requests
 from dataclasses import dataclass
 from typing import Optional
 from urllib.parse import urlencode
 
+import requests
+
+from . import http
 from .base import BookingClient, BookingClientError, Slot, BookingConfirmation
 
 
@@ -27,21 +29,140 @@ class BookingDetails:
 class ResyApiError(BookingClientError):
     """Exception for Resy API errors."""
 
-    def __init__(self, message: str):
-        super().__init__(message, platform="resy")
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+        transient: bool = False,
+        outcome_unknown: bool = False,
+    ):
+        super().__init__(
+            message, platform="resy", status_code=status_code, retry_after=retry_after, transient=transient,
+            outcome_unknown=outcome_unknown,
+        )
+
+
+def parse_find_response(data: dict, venue_id) -> list[Slot]:
+    """
+    Build Slot objects from a /4/find response body.
+
+    Shared by ResyClient and the Selenium daemon, which reads the same JSON
+    from the browser's network traffic instead of scraping the page.
+
+    Raises:
+        ResyApiError: If the response cannot be parsed
+    """
+    slots = []
+    try:
+        venues = data.get("results", {}).get("venues", [])
+        if not venues:
+            return []
+
+        for slot in venues[0].get("slots", []):
+            config = slot.get("config", {})
+            date_info = slot.get("date", {})
+
+            # Time format: "2024-03-15 18:00:00" -> extract "18:00:00"
+            start_time = date_info.get("start", "")
+            time_part = start_time.split(" ")[1] if " " in start_time else start_time
+
+            slots.append(Slot(
+                platform="resy",
+                venue_id=str(venue_id),
+                time=time_part,
+                table_type=config.get("type", ""),
+                platform_data={"config_token": config.get("token", "")},
+            ))
+    except (KeyError, IndexError) as e:
+        raise ResyApiError(f"Failed to parse reservation response: {e}")
+
+    return slots
 
 
 class ResyClient(BookingClient):
     """Client for interacting with the Resy API."""
 
-    def __init__(self, api_key: str, auth_token: str):
+    # Requests that make a reservation: one that fails after it may have been
+    # sent can't be retried, since the first may have gone through
+    BOOKING_PHASES = ("book",)
+
+    def __init__(
+        self, api_key: str, auth_token: str, base_url: str = BASE_URL, session: Optional[requests.Session] = None,
+    ):
         self.api_key = api_key
         self.auth_token = auth_token
+        self.base_url = base_url.rstrip("/")
+        # A session shared with other clients (see api.jobs.BookingResources), or one of its own
+        self.session = session if session is not None else http.create_session()
+
+    def _request(self, method: str, url: str, phase: str, **kwargs):
+        """Send a request on the pooled session, recording its timing."""
+        kwargs.setdefault("timeout", self.request_timeout())
+        try:
+            return http.request(self.session, method, url, phase, self.instrumentation, **kwargs)
+        except requests.RequestException as e:
+            if phase in self.BOOKING_PHASES and not http.never_sent(e):
+                raise ResyApiError(f"{phase} request failed, outcome unknown: {type(e).__name__}: {e}",
+                                   outcome_unknown=True) from e
+            raise ResyApiError(f"{phase} request failed: {type(e).__name__}: {e}", transient=True) from e
 
     @property
     def platform_name(self) -> str:
         return "resy"
 
+    def update_credentials(self, credentials: dict) -> None:
+        """Swap in a refreshed auth token (and API key, if given)."""
+        self.api_key = credentials.get("api_key", self.api_key)
+        self.auth_token = credentials["auth_token"]
+
+    def validate_credentials(self) -> bool:
+        """
+        Check the auth token against the account endpoint.
+
+        Only a 401 or 403 means it's rejected; any other answer (a 429, a
+        server error) says nothing about the token.
+        """
+        response = self._request("GET", f"{self.base_url}/2/user", "validate", headers=self._headers())
+        return response.status_code not in (401, 403)
+
+    def login(self, email: str, password: str) -> str:
+        """
+        Log in with email and password.
+
+        Returns:
+            A fresh auth token
+
+        Raises:
+            ResyApiError: If the login is rejected
+        """
+        headers = {
+            "Authorization": f'ResyAPI api_key="{self.api_key}"',
+            "Content-Type": "application/x-www-form-urlencoded",
+            "Origin": "https://resy.com",
+            "Referer": "https://resy.com/",
+        }
+        response = self._request(
+            "POST",
+            f"{self.base_url}/3/auth/password",
+            "login",
+            headers=headers,
+            data=urlencode({"email": email, "password": password}),
+        )
+
+        if response.status_code != 200:
+            raise ResyApiError(
+                f"Login failed: {response.status_code} {response.text}",
+                status_code=response.status_code,
+                retry_after=http.retry_after(response),
+            )
+
+        token = http.parse_json(response).get("token")
+        if not token:
+            raise ResyApiError("Login response missing token")
+
+        return token
+
     def _headers(self) -> dict:
         """Build headers for API requests."""
         return {
@@ -87,39 +208,17 @@ class ResyClient(BookingClient):
             "venue_id": str(venue_id),
         }
 
-        url = f"{BASE_URL}/4/find?{urlencode(params)}"
-        response = requests.get(url, headers=self._headers())
+        url = f"{self.base_url}/4/find?{urlencode(params)}"
+        response = self._request("GET", url, "find", headers=self._headers())
 
         if response.status_code != 200:
-            raise ResyApiError(f"Find reservations failed: {response.status_code} {response.text}")
+            raise ResyApiError(
+                f"Find reservations failed: {response.status_code} {response.text}",
+                status_code=response.status_code,
+                retry_after=http.retry_after(response),
+            )
 
-        data = response.json()
-
-        slots = []
-        try:
-            venues = data.get("results", {}).get("venues", [])
-            if not venues:
-                return []
-
-            for slot in venues[0].get("slots", []):
-                config = slot.get("config", {})
-                date_info = slot.get("date", {})
-
-                # Time format: "2024-03-15 18:00:00" -> extract "18:00:00"
-                start_time = date_info.get("start", "")
-                time_part = start_time.split(" ")[1] if " " in start_time else start_time
-
-                slots.append(Slot(
-                    platform="resy",
-                    venue_id=str(venue_id),
-                    time=time_part,
-                    table_type=config.get("type", ""),
-                    platform_data={"config_token": config.get("token", "")},
-                ))
-        except (KeyError, IndexError) as e:
-            raise ResyApiError(f"Failed to parse reservation response: {e}")
-
-        return slots
+        return parse_find_response(http.parse_json(response), venue_id)
 
     def find_slots(self, venue_id: str, date: str, party_size: int) -> list[Slot]:
         """BookingClient interface — delegates to find_reservations."""
@@ -151,13 +250,17 @@ class ResyClient(BookingClient):
             "party_size": str(party_size),
         }
 
-        url = f"{BASE_URL}/3/details?{urlencode(params)}"
-        response = requests.get(url, headers=self._headers())
+        url = f"{self.base_url}/3/details?{urlencode(params)}"
+        response = self._request("GET", url, "details", headers=self._headers())
 
         if response.status_code != 200:
-            raise ResyApiError(f"Get details failed: {response.status_code} {response.text}")
+            raise ResyApiError(
+                f"Get details failed: {response.status_code} {response.text}",
+                status_code=response.status_code,
+                retry_after=http.retry_after(response),
+            )
 
-        data = response.json()
+        data = http.parse_json(response)
 
         try:
             book_token = data["book_token"]["value"]
@@ -198,17 +301,23 @@ class ResyClient(BookingClient):
             "struct_payment_method": json.dumps({"id": payment_method_id}),
         }
 
-        url = f"{BASE_URL}/3/book"
-        response = requests.post(
+        url = f"{self.base_url}/3/book"
+        response = self._request(
+            "POST",
             url,
+            "book",
             headers=self._post_headers(),
             data=urlencode(payload),
         )
 
         if response.status_code not in (200, 201):
-            raise ResyApiError(f"Booking failed: {response.status_code} {response.text}")
+            raise ResyApiError(
+                f"Booking failed: {response.status_code} {response.text}",
+                status_code=response.status_code,
+                retry_after=http.retry_after(response),
+            )
 
-        data = response.json()
+        data = http.parse_json(response)
 
         resy_token = data.get("resy_token")
         if not resy_token:
@@ -221,6 +330,36 @@ class ResyClient(BookingClient):
             details={"resy_token": resy_token},
         )
 
+    def cancel_reservation(self, resy_token: str) -> None:
+        """
+        Cancel a reservation.
+
+        Args:
+            resy_token: The resy_token from book_reservation
+
+        Raises:
+            ResyApiError: If the cancellation fails
+        """
+        response = self._request(
+            "POST",
+            f"{self.base_url}/3/cancel",
+            "cancel",
+            headers=self._post_headers(),
+            data=urlencode({"resy_token": resy_token}),
+        )
+
+        if response.status_code != 200:
+            raise ResyApiError(
+                f"Cancellation failed: {response.status_code} {response.text}",
+                status_code=response.status_code,
+                retry_after=http.retry_after(response),
+            )
+
+    def cancel_booking(self, confirmation: BookingConfirmation) -> None:
+        """BookingClient interface — cancels by the confirmation's resy_token."""
+        resy_token = (confirmation.details or {}).get("resy_token") or confirmation.confirmation_id
+        self.cancel_reservation(resy_token)
+
     def book_slot(self, slot: Slot, date: str, party_size: int) -> BookingConfirmation:
         """BookingClient interface — runs Resy's 3-step details+book flow."""
         config_token = slot.platform_data.get("config_token")
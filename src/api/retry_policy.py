@@ -0,0 +1,188 @@
+"""
+Classify booking failures and decide what to do about each.
+
+A 412 after someone else took the slot, a 429, an expired token and a 502
+call for different responses, but the booking loop used to treat them all
+alike. RetryPolicy maps a BookingClientError to a category by HTTP status
+and message text, and each category to an action:
+
+    slot_gone      -> next_candidate  book the next-best slot from the same
+                                      search, no sleep and no new find
+    rate_limited   -> backoff         exponential backoff with full jitter,
+                                      never shorter than Retry-After
+    auth_expired   -> refresh         refresh credentials, retry immediately
+    transient      -> backoff         same, from a smaller base delay (server
+                                      errors, and requests that never completed)
+    fatal          -> abort           stop; retrying can't help, or (a booking
+                                      whose outcome is unknown) could book twice
+
+Actions, delays and the text patterns are configurable per platform; see
+policy_for().
+"""
+
+import random
+from dataclasses import dataclass, field, replace
+from typing import Optional
+
+from .base import BookingClientError
+
+
+# Failure categories
+SLOT_GONE = "slot_gone"
+RATE_LIMITED = "rate_limited"
+AUTH_EXPIRED = "auth_expired"
+TRANSIENT = "transient"
+FATAL = "fatal"
+
+# Actions
+NEXT_CANDIDATE = "next_candidate"
+BACKOFF = "backoff"
+REFRESH = "refresh"
+ABORT = "abort"
+
+CATEGORIES = (SLOT_GONE, RATE_LIMITED, AUTH_EXPIRED, TRANSIENT, FATAL)
+ACTIONS = (NEXT_CANDIDATE, BACKOFF, REFRESH, ABORT)
+
+DEFAULT_ACTIONS = {
+    SLOT_GONE: NEXT_CANDIDATE,
+    RATE_LIMITED: BACKOFF,
+    AUTH_EXPIRED: REFRESH,
+    TRANSIENT: BACKOFF,
+    FATAL: ABORT,
+}
+
+
+@dataclass
+class RetryDecision:
+    """What the booking loop should do about one failure."""
+    category: str
+    action: str
+    delay: float = 0.0
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Error classification and per-category actions for one platform.
+
+    Args:
+        actions: Category -> action
+        slot_gone_statuses, rate_limited_statuses, auth_statuses: Status codes per category
+        slot_gone_patterns, rate_limited_patterns: Lower-case message substrings
+            that identify the category regardless of status (e.g. OpenTable
+            reports a lost slot lock with a 200 and an error list)
+        transient_base_delay, rate_limited_base_delay: First backoff, in seconds
+        max_delay: Backoff ceiling, in seconds
+        max_candidates: Most slots tried from a single search before finding again
+    """
+    actions: dict[str, str] = field(default_factory=lambda: dict(DEFAULT_ACTIONS))
+    slot_gone_statuses: tuple[int, ...] = (409, 410, 412)
+    rate_limited_statuses: tuple[int, ...] = (429,)
+    auth_statuses: tuple[int, ...] = (401, 403, 419)
+    slot_gone_patterns: tuple[str, ...] = (
+        "no longer available", "slot_unavailable", "not available", "already booked", "sold out",
+    )
+    rate_limited_patterns: tuple[str, ...] = ("rate limit", "too many requests")
+    transient_base_delay: float = 0.1
+    rate_limited_base_delay: float = 1.0
+    max_delay: float = 10.0
+    max_candidates: int = 5
+    rng: random.Random = field(default_factory=random.Random, repr=False)
+
+    def classify(self, error: BookingClientError) -> str:
+        """Map a client error to one of CATEGORIES."""
+        status = error.status_code
+        message = str(error).lower()
+
+        # A booking request that timed out or lost its response may have gone
+        # through; booking again could hold a second table
+        if getattr(error, "outcome_unknown", False):
+            return FATAL
+        if status in self.auth_statuses:
+            return AUTH_EXPIRED
+        if status in self.rate_limited_statuses:
+            return RATE_LIMITED
+        if status in self.slot_gone_statuses:
+            return SLOT_GONE
+        # Before the message patterns: a 503 "Service Not Available" is the
+        # server's trouble, not a sign the slot is gone, and a request that
+        # never completed has no server message to match
+        if error.transient or (status is not None and status >= 500):
+            return TRANSIENT
+        if any(p in message for p in self.rate_limited_patterns):
+            return RATE_LIMITED
+        if any(p in message for p in self.slot_gone_patterns):
+            return SLOT_GONE
+        # Including errors with no status that aren't transient: a response
+        # missing a field, no payment method, a booking accepted without a
+        # token. Retrying those fails the same way, or books twice
+        return FATAL
+
+    def backoff(self, category: str, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff for the given attempt (1-based), floored at Retry-After."""
+        base = self.rate_limited_base_delay if category == RATE_LIMITED else self.transient_base_delay
+        ceiling = min(self.max_delay, base * 2 ** (attempt - 1))
+        delay = self.rng.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def decide(self, error: BookingClientError, attempt: int) -> RetryDecision:
+        """Classify the error and pick the action (and delay, for backoff)."""
+        category = self.classify(error)
+        action = self.actions.get(category, ABORT)
+        delay = 0.0
+        if action == BACKOFF:
+            delay = self.backoff(category, attempt, getattr(error, "retry_after", None))
+        return RetryDecision(category, action, delay)
+
+
+# Platform defaults. OpenTable answers a lost slot lock with a 200 whose
+# slotLockErrors list says why, which the message patterns pick up.
+DEFAULT_POLICIES: dict[str, RetryPolicy] = {
+    "resy": RetryPolicy(),
+    "opentable": RetryPolicy(
+        slot_gone_patterns=RetryPolicy().slot_gone_patterns + ("slot lock failed",),
+    ),
+}
+
+
+def policy_for(platform: str, overrides: Optional[dict] = None) -> RetryPolicy:
+    """
+    The platform's default policy with optional overrides applied.
+
+    Overrides come from config.json's "retry_policy" section or the Lambda
+    event, e.g. {"actions": {"slot_gone": "backoff"}, "max_delay": 5}.
+    Either the overrides dict itself or a {platform: overrides} mapping is
+    accepted.
+
+    Raises:
+        ValueError: If an override names an unknown field, category or action
+    """
+    base = DEFAULT_POLICIES.get(platform, RetryPolicy())
+    # Each caller gets its own jitter source and actions dict
+    policy = replace(base, actions=dict(base.actions), rng=random.Random())
+    if not overrides:
+        return policy
+
+    if platform in overrides and isinstance(overrides[platform], dict):
+        overrides = overrides[platform]
+    elif any(isinstance(v, dict) and k in DEFAULT_POLICIES for k, v in overrides.items()):
+        return policy  # per-platform mapping without an entry for this platform
+
+    overrides = dict(overrides)
+    actions = overrides.pop("actions", {})
+    for category, action in actions.items():
+        if category not in CATEGORIES:
+            raise ValueError(f"Unknown retry category '{category}'. Use one of: {', '.join(CATEGORIES)}")
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown retry action '{action}'. Use one of: {', '.join(ACTIONS)}")
+        policy.actions[category] = action
+
+    for name, value in overrides.items():
+        if name == "rng" or not hasattr(policy, name):
+            raise ValueError(f"Unknown retry policy setting '{name}'")
+        if isinstance(getattr(policy, name), tuple):
+            value = tuple(value)
+        setattr(policy, name, value)
+    return policy
@@ -5,14 +5,15 @@ Extracts the "pick best slot" logic that was previously duplicated in
 cli.py, lambda_handler.py, and resy_client.py into a single function.
 """
 
-from typing import Optional
+from typing import Optional, Union
 
 from .base import Slot
+from .time_preferences import UNRANKED, TimePreferences
 
 
 def select_best_slot(
     slots: list[Slot],
-    preferred_times: list[str],
+    preferences: Union[TimePreferences, list[str]],
     preferred_table_types: Optional[list[str]] = None,
 ) -> Optional[Slot]:
     """
@@ -20,7 +21,8 @@ def select_best_slot(
 
     Args:
         slots: Available slots from any platform's find_slots()
-        preferred_times: Times in HH:MM:SS format, ordered by preference (best first)
+        preferences: Compiled time preferences, or times in HH:MM:SS format
+            ordered by preference (best first)
         preferred_table_types: Optional table type preferences, ordered by preference
 
     Returns:
@@ -28,26 +30,57 @@ def select_best_slot(
     """
     if not slots:
         return None
+    if not isinstance(preferences, TimePreferences):
+        preferences = TimePreferences.from_times(preferences)
 
-    # Build lookup: time -> list of slots
-    slots_by_time: dict[str, list[Slot]] = {}
+    # One pass: keep the slots at the best rank seen so far
+    best_rank = UNRANKED
+    available: list[Slot] = []
     for slot in slots:
-        slots_by_time.setdefault(slot.time, []).append(slot)
-
-    # Find best matching slot
-    for time in preferred_times:
-        if time not in slots_by_time:
+        rank = preferences.rank(slot.time)
+        if rank is None or rank > best_rank:
             continue
+        if rank < best_rank:
+            best_rank, available = rank, []
+        available.append(slot)
+
+    if not available:
+        return None
+
+    if preferred_table_types:
+        for table_type in preferred_table_types:
+            for slot in available:
+                if table_type.lower() in slot.table_type.lower():
+                    return slot
+
+    # No table type preference or no match — take first at this time
+    return available[0]
 
-        available = slots_by_time[time]
 
-        if preferred_table_types:
-            for table_type in preferred_table_types:
-                for slot in available:
-                    if table_type.lower() in slot.table_type.lower():
-                        return slot
+def rank_slots(
+    slots: list[Slot],
+    preferences: Union[TimePreferences, list[str]],
+    preferred_table_types: Optional[list[str]] = None,
+) -> list[Slot]:
+    """
+    All slots within the preferred times, best first.
+
+    Ordered as select_best_slot chooses: by time preference, then by the
+    first preferred table type each matches, then as given. The first
+    entry is what select_best_slot would return.
+    """
+    if not isinstance(preferences, TimePreferences):
+        preferences = TimePreferences.from_times(preferences)
+    table_types = [t.lower() for t in preferred_table_types or []]
 
-        # No table type preference or no match — take first at this time
-        return available[0]
+    def table_rank(slot: Slot) -> int:
+        slot_type = slot.table_type.lower()
+        return next((i for i, t in enumerate(table_types) if t in slot_type), len(table_types))
 
-    return None
+    ranked = []
+    for index, slot in enumerate(slots):
+        rank = preferences.rank(slot.time)
+        if rank is not None:
+            ranked.append((rank, table_rank(slot), index, slot))
+    ranked.sort(key=lambda entry: entry[:3])
+    return [entry[3] for entry in ranked]
@@ -0,0 +1,242 @@
+"""
+Time-window preferences, compiled to a minute-of-day rank table.
+
+Every entry point used to build its own list of preferred times in float
+hours on a fixed 15-minute grid, so a 19:10 slot (OpenTable offsets are
+arbitrary minutes) never matched anything. compile_preferences() turns
+best/earliest/latest and an optional tolerance curve into a table of 1440
+ranks, one per minute of the day: rank 0 is the best minute, and minutes
+outside the window are unranked. Looking up a slot's rank is O(1) at any
+slot granularity, and windows may cross midnight (earliest 22:00, latest
+01:00).
+
+The tolerance curve says how much being off by some minutes costs in each
+direction; minutes are ranked by cost, ties going to the later minute, so
+by default 19:15 ranks just ahead of 18:45 for a 19:00 best time. It is
+given as {"earlier": 2, "later": 1} (cost per minute in each direction),
+the string "2:1" (earlier:later), or a list of [offset_minutes, cost]
+points interpolated linearly, negative offsets being earlier.
+
+Kept free of heavy imports (argparse, boto3, requests) so the Lambda can
+use it without paying for the CLI on cold start.
+"""
+
+import re
+from array import array
+from typing import Optional, Union
+
+
+MINUTES_PER_DAY = 24 * 60
+UNRANKED = 0xFFFF
+
+_TIME = re.compile(r"^(\d{1,2})(?::?(\d{2}))?(?::(\d{2}))?\s*([ap])?\.?m?\.?$", re.IGNORECASE)
+
+TimePreferenceSpec = Union[None, str, dict, list]
+
+
+def parse_minutes(value: str, assume_pm: bool = False) -> int:
+    """
+    Parse a time of day into minutes after midnight.
+
+    Accepts "19:00", "19:00:00", "1900", "7:30", "7:30 PM" and "7pm".
+
+    Args:
+        value: The time
+        assume_pm: Read 1:00-11:59 without an AM/PM marker as evening
+            (the browser flow's dinner-time convention)
+
+    Raises:
+        ValueError: If it isn't a valid time of day
+    """
+    match = _TIME.match(str(value).strip())
+    if not match:
+        raise ValueError(f"Invalid time '{value}'. Use HH:MM.")
+    hours, minutes = int(match.group(1)), int(match.group(2) or 0)
+    marker = (match.group(4) or "").lower()
+    if marker:
+        if not 1 <= hours <= 12:
+            raise ValueError(f"Invalid time '{value}'. Use HH:MM.")
+        hours = hours % 12 + (12 if marker == "p" else 0)
+    elif assume_pm and 1 <= hours < 12:
+        hours += 12
+    if hours > 23 or minutes > 59:
+        raise ValueError(f"Invalid time '{value}'. Use HH:MM.")
+    return hours * 60 + minutes
+
+
+def format_minutes(minute: int) -> str:
+    """Minutes after midnight as HH:MM:SS, the slot time format."""
+    minute %= MINUTES_PER_DAY
+    return f"{minute // 60:02d}:{minute % 60:02d}:00"
+
+
+def _slot_minute(slot_time: str) -> int:
+    # Fast path for the HH:MM:SS times every client produces
+    if len(slot_time) >= 5 and slot_time[2] == ":":
+        return int(slot_time[:2]) * 60 + int(slot_time[3:5])
+    return parse_minutes(slot_time)
+
+
+def _tolerance_curve(spec: TimePreferenceSpec):
+    """
+    The cost function for a tolerance spec: signed offset in minutes -> cost.
+
+    Raises:
+        ValueError: If the spec can't be understood
+    """
+    if spec is None:
+        return abs
+
+    if isinstance(spec, str):
+        try:
+            earlier, later = (float(x) for x in spec.split(":"))
+        except ValueError:
+            raise ValueError(f"Invalid tolerance '{spec}'. Use EARLIER:LATER, e.g. 2:1.") from None
+        spec = {"earlier": earlier, "later": later}
+
+    if isinstance(spec, dict):
+        unknown = set(spec) - {"earlier", "later"}
+        if unknown:
+            raise ValueError(f"Unknown tolerance setting(s): {', '.join(sorted(unknown))}")
+        earlier, later = float(spec.get("earlier", 1.0)), float(spec.get("later", 1.0))
+        if earlier < 0 or later < 0:
+            raise ValueError("Tolerance weights must not be negative")
+        return lambda offset: offset * later if offset >= 0 else -offset * earlier
+
+    try:
+        points = sorted((float(offset), float(cost)) for offset, cost in spec)
+    except (TypeError, ValueError):
+        raise ValueError("Tolerance curve must be a list of [offset_minutes, cost] points") from None
+    if len(points) < 2:
+        raise ValueError("Tolerance curve needs at least two points")
+
+    def curve(offset: float) -> float:
+        # Linear between points, extending the end segments beyond them
+        for (x0, y0), (x1, y1) in zip(points, points[1:]):
+            if offset <= x1 or (x1, y1) == points[-1]:
+                return y0 + (y1 - y0) * (offset - x0) / (x1 - x0) if x1 != x0 else y0
+        return points[-1][1]
+
+    return curve
+
+
+class TimePreferences:
+    """
+    Compiled time preferences: the rank of every minute of the day.
+
+    Build with compile_preferences() or TimePreferences.from_times().
+    """
+
+    __slots__ = ("ranks", "order", "best", "earliest", "latest")
+
+    def __init__(self, order: list[int], best: int, earliest: int, latest: int):
+        self.order = order  # ranked minutes, best first
+        self.best, self.earliest, self.latest = best, earliest, latest
+        self.ranks = array("H", [UNRANKED]) * MINUTES_PER_DAY
+        for rank, minute in enumerate(order):
+            self.ranks[minute] = rank
+
+    @classmethod
+    def from_times(cls, times: list[str]) -> "TimePreferences":
+        """Preferences from an explicit list of times, best first."""
+        order = []
+        for t in times:
+            minute = _slot_minute(t)
+            if minute not in order:
+                order.append(minute)
+        if not order:
+            raise ValueError("No preferred times given")
+        return cls(order, order[0], min(order), max(order))
+
+    def rank_minute(self, minute: int) -> Optional[int]:
+        rank = self.ranks[minute % MINUTES_PER_DAY]
+        return None if rank == UNRANKED else rank
+
+    def rank(self, slot_time: str) -> Optional[int]:
+        """A slot time's rank (0 is best), or None outside the window."""
+        return self.rank_minute(_slot_minute(slot_time))
+
+    def __contains__(self, slot_time: str) -> bool:
+        return self.rank(slot_time) is not None
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def times(self, step: int = 15) -> list[str]:
+        """
+        Ranked times at `step` minutes from the best time, best first.
+
+        For anything that needs a list of times rather than a rank lookup
+        (display, the browser flow's buttons).
+        """
+        return [format_minutes(m) for m in self.order if (m - self.best) % step == 0]
+
+    def __repr__(self) -> str:
+        return (f"TimePreferences(best={format_minutes(self.best)}, earliest={format_minutes(self.earliest)}, "
+                f"latest={format_minutes(self.latest)}, minutes={len(self.order)})")
+
+
+def compile_preferences(
+    best: str,
+    earliest: str,
+    latest: str,
+    tolerance: TimePreferenceSpec = None,
+    assume_pm: bool = False,
+) -> TimePreferences:
+    """
+    Compile a time window into a rank table.
+
+    If earliest is after latest the window crosses midnight.
+
+    Args:
+        best, earliest, latest: Times of day (see parse_minutes)
+        tolerance: Cost curve for being early or late (see module docstring);
+            symmetric by default
+        assume_pm: Passed to parse_minutes
+
+    Raises:
+        ValueError: If a time or the tolerance can't be parsed, or best is
+            outside the window
+    """
+    best_m = parse_minutes(best, assume_pm)
+    earliest_m = parse_minutes(earliest, assume_pm)
+    latest_m = parse_minutes(latest, assume_pm)
+    cost = _tolerance_curve(tolerance)
+
+    span = (latest_m - earliest_m) % MINUTES_PER_DAY
+    later_span = (latest_m - best_m) % MINUTES_PER_DAY
+    if (best_m - earliest_m) % MINUTES_PER_DAY > span:
+        if earliest_m > best_m:
+            raise ValueError(f"Earliest time ({earliest}) is after best time ({best}).")
+        raise ValueError(f"Best time ({best}) is after latest time ({latest}).")
+
+    keyed = []
+    for i in range(span + 1):
+        minute = (earliest_m + i) % MINUTES_PER_DAY
+        later = (minute - best_m) % MINUTES_PER_DAY
+        offset = later if later <= later_span else later - MINUTES_PER_DAY
+        # Cheapest first; on a tie the later minute, then the nearer one
+        keyed.append((cost(offset), offset < 0, abs(offset), minute))
+    keyed.sort()
+    return TimePreferences([k[3] for k in keyed], best_m, earliest_m, latest_m)
+
+
+def generate_preferred_times(best: str, earliest: str, latest: str, step: int = 15) -> list[str]:
+    """
+    Preferred times at `step`-minute intervals from best, alternating
+    outward until reaching the earliest/latest boundaries.
+
+    E.g., best=19:00, earliest=18:00, latest=20:00 produces:
+    [19:00, 19:15, 18:45, 19:30, 18:30, 19:45, 18:15, 20:00, 18:00]
+    """
+    return compile_preferences(best, earliest, latest).times(step)
+
+
+def validate_times(best: str, earliest: str, latest: str) -> None:
+    """
+    Check that best lies within earliest..latest (which may cross midnight).
+
+    Raises:
+        ValueError: If a time can't be parsed or best is outside the window
+    """
+    compile_preferences(best, earliest, latest)
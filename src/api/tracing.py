@@ -0,0 +1,234 @@
+"""
+Traces that follow a booking from the schedule that created it to its result.
+
+scheduler.schedule_booking() puts a trace ID in the EventBridge payload.
+When the schedule fires, the Lambda handler opens a Tracer with that ID,
+and everything the booking does is recorded as a span under it:
+
+    fire_delay     from the schedule's trigger time to the handler starting
+    init           module import, on a cold start
+    warm_up        credentials and clients
+    fire_wait      waiting for a recommended fire_at
+    search         each search (the find request nested inside)
+    selection      picking the slot
+    booking        booking a slot (the details/book requests nested inside)
+    wait           each retry wait
+    find, book...  every HTTP call, with its connect/TLS/TTFB breakdown
+
+Spans are kept in memory while the booking runs and exported in one go by
+Tracer.flush(), so an exporter never adds latency to an attempt. Exporters
+are pluggable (SpanExporter); open_exporter() picks one from a target
+string: "-" for the log (CloudWatch in Lambda), a file of JSON lines, or
+"off". read_spans() loads a trace file back, e.g. to look into why one
+job missed its release.
+"""
+
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Iterator, Optional, TextIO
+
+from .logs import get_logger
+
+
+logger = get_logger("trace")
+
+
+# Event fields carrying a trace from the scheduler to the handler
+TRACE_ID_FIELD = "trace_id"
+TRIGGER_AT_FIELD = "trigger_at"
+
+
+def new_trace_id() -> str:
+    return os.urandom(16).hex()
+
+
+def _new_span_id() -> str:
+    return os.urandom(8).hex()
+
+
+@dataclass
+class Span:
+    """One timed step of a traced booking. Times are epoch seconds."""
+    trace_id: str
+    span_id: str
+    name: str
+    parent_id: Optional[str] = None
+    start: float = field(default_factory=time.time)
+    end: Optional[float] = None
+    attributes: dict = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end is None:
+            return None
+        return (self.end - self.start) * 1000
+
+    def to_dict(self) -> dict:
+        record = asdict(self)
+        record["duration_ms"] = round(self.duration_ms, 2) if self.end is not None else None
+        return record
+
+
+class SpanExporter(ABC):
+    """Sends finished spans somewhere."""
+
+    @abstractmethod
+    def export(self, spans: list[Span]) -> None:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class FileExporter(SpanExporter):
+    """
+    Writes spans as JSON lines, to a file (appended) or a stream.
+
+    Args:
+        path: File to append to
+        stream: Stream to write to, when there's no path
+    """
+
+    def __init__(self, path: Optional[str] = None, stream: Optional[TextIO] = None):
+        if path is None and stream is None:
+            raise ValueError("FileExporter needs a path or a stream")
+        self.path = path
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def export(self, spans: list[Span]) -> None:
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        with self._lock:
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write(lines)
+            else:
+                self.stream.write(lines)
+                self.stream.flush()
+
+
+class LogExporter(SpanExporter):
+    """Logs each span as a JSON line through the "oddjob.trace" logger (CloudWatch in Lambda)."""
+
+    def export(self, spans: list[Span]) -> None:
+        for span in spans:
+            record = span.to_dict()
+            logger.info(json.dumps(record, default=str), extra={"span": record})
+
+
+def open_exporter(target: Optional[str]) -> Optional[SpanExporter]:
+    """
+    The exporter for a target: "-" (the log), a path or file:// URL, or
+    "off" (no tracing, None).
+    """
+    if not target or target.lower() in ("off", "none"):
+        return None
+    if target in ("-", "log"):
+        return LogExporter()
+    if target.startswith("file://"):
+        target = target[len("file://"):]
+    return FileExporter(path=target)
+
+
+def read_spans(path: str, trace_id: Optional[str] = None) -> list[dict]:
+    """The spans in a trace file (optionally one trace's), ordered by start time."""
+    spans = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            span = json.loads(line)
+            if trace_id is None or span["trace_id"] == trace_id:
+                spans.append(span)
+    return sorted(spans, key=lambda span: span["start"])
+
+
+class Tracer:
+    """
+    Records the spans of one trace.
+
+    Spans opened with span() nest: a span's parent is the innermost span
+    still open on the same thread. Spans started on other threads (a
+    race's searches, a pool's workers) hang off the trace's first span.
+
+    Args:
+        trace_id: The trace to record under; a new one by default
+        exporter: Where flush() sends spans; kept in memory only without one
+        clock: Epoch time source
+    """
+
+    def __init__(
+        self,
+        trace_id: Optional[str] = None,
+        exporter: Optional[SpanExporter] = None,
+        clock=time.time,
+    ):
+        self.trace_id = trace_id or new_trace_id()
+        self.exporter = exporter
+        self.clock = clock
+        self.spans: list[Span] = []
+        self._exported = 0
+        self._root_id: Optional[str] = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self) -> list[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _parent_id(self) -> Optional[str]:
+        stack = self._stack()
+        return stack[-1].span_id if stack else self._root_id
+
+    def _new_span(self, name: str, start: float, attributes: dict) -> Span:
+        span = Span(self.trace_id, _new_span_id(), name, self._parent_id(), start, attributes=attributes)
+        with self._lock:
+            if self._root_id is None:
+                self._root_id = span.span_id
+        return span
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """Time a block as a span; more attributes can be set on the yielded span."""
+        span = self._new_span(name, self.clock(), attributes)
+        stack = self._stack()
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            stack.pop()
+            span.end = self.clock()
+            with self._lock:
+                self.spans.append(span)
+
+    def record(self, name: str, start: float, end: float, error: Optional[str] = None, **attributes) -> Span:
+        """Add a span measured elsewhere (an HTTP call, a delay before the handler ran)."""
+        span = self._new_span(name, start, attributes)
+        span.end = end
+        span.error = error
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def flush(self) -> None:
+        """Export the spans finished since the last flush."""
+        with self._lock:
+            spans = self.spans[self._exported:]
+            self._exported = len(self.spans)
+        if spans and self.exporter is not None:
+            try:
+                self.exporter.export(spans)
+            except Exception as e:
+                # Losing a trace mustn't fail the booking it describes
+                logger.warning(f"Could not export {len(spans)} spans of trace {self.trace_id}: {e}")
@@ -0,0 +1,415 @@
+"""
+Watch mode: keep tabs on openings for many targets at once.
+
+Each target is a (platform, venue, date, party size, time window). Targets
+that ask the same question of the platform (platform, venue, date, party
+size) share one poll. Polls are kept in a heap by due time, so the engine
+always services the most overdue query next. Each poll's slot set is diffed
+against the previous one, and only slots that newly appeared are considered
+for a target's window: on a match the target is notified, or booked if it
+asked to be. A booking that fails for a reason worth retrying (a request
+that never reached the server, a 5xx, a rate limit, an expired token once
+credentials are refreshed) is tried again on the next poll, for as long as
+the slot stays listed. One whose outcome is unknown (it timed out after it
+was sent) may have gone through, so its target stops being watched.
+
+Poll intervals adapt per query:
+    - nearer dates are polled more often (cancellations cluster close in),
+    - venues whose availability changes often ("volatile", an exponentially
+      weighted share of polls that saw a change) are polled more often,
+    - errors back the query off, and a rate-limit response pauses all
+      polling on that platform.
+
+Every request goes through one token bucket, so the engine stays within a
+global requests-per-minute budget however many targets it holds. Scheduling
+costs O(log n) per poll, so thousands of targets fit on one core; the budget,
+not the CPU, decides how often each gets polled.
+"""
+
+import heapq
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import date as date_cls, datetime
+from typing import Callable, Optional
+
+from .base import BookingClient, BookingClientError, BookingConfirmation, Slot
+from .retry_policy import AUTH_EXPIRED, RATE_LIMITED, TRANSIENT, RetryPolicy, policy_for
+from .slot_selection import select_best_slot
+from .time_preferences import TimePreferenceSpec, compile_preferences
+
+
+# Base poll interval (seconds) by days until the reservation date
+DEFAULT_INTERVALS = ((1, 30.0), (7, 120.0), (30, 600.0))
+DEFAULT_FAR_INTERVAL = 1800.0
+DEFAULT_MIN_INTERVAL = 10.0
+
+# How strongly volatility shortens the interval, and how fast it adapts
+VOLATILITY_WEIGHT = 0.75
+VOLATILITY_DECAY = 0.8
+
+
+@dataclass
+class WatchTarget:
+    """A booking someone wants, watched until it opens up (or its date passes)."""
+    venue_id: str
+    date: str
+    party_size: int
+    best: str
+    earliest: str
+    latest: str
+    platform: str = "resy"
+    table_types: Optional[list[str]] = None
+    book: bool = False
+    name: str = ""
+    tolerance: TimePreferenceSpec = None
+
+    def __post_init__(self):
+        self.venue_id = str(self.venue_id)
+        self.preferences = compile_preferences(self.best, self.earliest, self.latest, self.tolerance)
+        if not self.name:
+            self.name = f"{self.platform}:{self.venue_id}:{self.date}:{self.party_size}"
+
+    @property
+    def query_key(self) -> tuple:
+        return (self.platform, self.venue_id, self.date, self.party_size)
+
+
+@dataclass
+class Opening:
+    """A newly appeared slot matching a target's window."""
+    target: WatchTarget
+    slot: Slot
+    found_at: float
+    confirmation: Optional[BookingConfirmation] = None
+    error: Optional[str] = None
+    # The booking failed after it may have gone through; the target is no longer watched
+    outcome_unknown: bool = False
+
+
+@dataclass
+class _Query:
+    """Poll state shared by every target asking the same question."""
+    key: tuple
+    targets: list[WatchTarget]
+    last_slots: Optional[dict[tuple, Slot]] = None
+    # (target name, slot key) of bookings that failed in a way worth retrying
+    retry_slots: set = field(default_factory=set)
+    polls: int = 0
+    errors: int = 0
+    next_due: float = 0.0
+
+    @property
+    def platform(self) -> str:
+        return self.key[0]
+
+    @property
+    def venue_key(self) -> tuple:
+        return self.key[:2]
+
+
+class TokenBucket:
+    """Requests-per-minute budget with a small burst allowance."""
+
+    def __init__(self, per_minute: float, burst: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = per_minute / 60
+        self.capacity = burst if burst is not None else max(1.0, per_minute / 60)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill()
+        # Tolerance so float rounding can't leave us waiting on a sliver of a token
+        return 0.0 if self.tokens >= 1 - 1e-9 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self._refill()
+        self.tokens -= 1
+
+
+@dataclass
+class WatchStats:
+    polls: int = 0
+    errors: int = 0
+    openings: int = 0
+    bookings: int = 0
+    budget_wait_s: float = 0.0
+
+
+class WatchEngine:
+    """
+    Polls many watch targets within a global request budget.
+
+    Args:
+        clients: Platform name -> BookingClient
+        requests_per_minute: Global polling budget across all targets
+        on_opening: Called with each Opening (after booking, if the target books)
+        refresh: Called with a platform name on auth failures; returns True if
+                 credentials were refreshed
+        intervals: ((max_days_out, seconds), ...) base intervals, nearest first
+        far_interval: Base interval beyond the last bucket
+        min_interval: Floor for any poll interval
+        policies: Platform -> RetryPolicy for classifying poll errors
+        clock, sleep: Time source and sleep (replaceable for simulation)
+        seed: Random seed for interval jitter
+    """
+
+    def __init__(
+        self,
+        clients: dict[str, BookingClient],
+        requests_per_minute: float = 60.0,
+        on_opening: Optional[Callable[[Opening], None]] = None,
+        refresh: Optional[Callable[[str], bool]] = None,
+        intervals: tuple[tuple[int, float], ...] = DEFAULT_INTERVALS,
+        far_interval: float = DEFAULT_FAR_INTERVAL,
+        min_interval: float = DEFAULT_MIN_INTERVAL,
+        policies: Optional[dict[str, RetryPolicy]] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        today: Callable[[], date_cls] = date_cls.today,
+        seed: Optional[int] = None,
+    ):
+        self.clients = clients
+        self.bucket = TokenBucket(requests_per_minute, clock=clock)
+        self.on_opening = on_opening
+        self.refresh = refresh
+        self.intervals = intervals
+        self.far_interval = far_interval
+        self.min_interval = min_interval
+        self.policies = policies or {}
+        self.clock = clock
+        self.sleep = sleep
+        self.today = today
+        self.random = random.Random(seed)
+        self.stats = WatchStats()
+
+        self._queries: dict[tuple, _Query] = {}
+        self._heap: list[tuple[float, int, tuple]] = []
+        self._seq = 0
+        self._volatility: dict[tuple, float] = {}
+        self._paused_until: dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return sum(len(q.targets) for q in self._queries.values())
+
+    def add(self, target: WatchTarget) -> None:
+        """Start watching a target; its first poll is due immediately."""
+        query = self._queries.get(target.query_key)
+        if query is None:
+            query = _Query(target.query_key, [], next_due=self.clock())
+            self._queries[target.query_key] = query
+            self._push(query)
+        query.targets.append(target)
+
+    def remove(self, target: WatchTarget) -> None:
+        """Stop watching a target (its query stops once no targets are left)."""
+        query = self._queries.get(target.query_key)
+        if query and target in query.targets:
+            query.targets.remove(target)
+            if not query.targets:
+                del self._queries[target.query_key]
+
+    def _push(self, query: _Query) -> None:
+        self._seq += 1
+        heapq.heappush(self._heap, (query.next_due, self._seq, query.key))
+
+    def interval_for(self, query: _Query) -> float:
+        """Seconds until the query's next poll."""
+        days_out = (datetime.strptime(query.key[2], "%Y-%m-%d").date() - self.today()).days
+        base = self.far_interval
+        for max_days, seconds in self.intervals:
+            if days_out <= max_days:
+                base = seconds
+                break
+
+        volatility = self._volatility.get(query.venue_key, 0.0)
+        interval = base * (1 - VOLATILITY_WEIGHT * volatility)
+        if query.errors:
+            interval *= 2 ** min(query.errors, 5)
+        # ±10% jitter keeps queries added together from polling in lockstep
+        interval *= self.random.uniform(0.9, 1.1)
+        return max(self.min_interval, interval)
+
+    def _is_expired(self, query: _Query) -> bool:
+        return datetime.strptime(query.key[2], "%Y-%m-%d").date() < self.today()
+
+    def _next_query(self) -> Optional[_Query]:
+        """Pop heap entries until one is for a live query (stale entries are skipped)."""
+        while self._heap:
+            due, _, key = self._heap[0]
+            query = self._queries.get(key)
+            if query is None or due != query.next_due:
+                heapq.heappop(self._heap)
+                continue
+            return query
+        return None
+
+    def next_wait(self) -> Optional[float]:
+        """Seconds until the next poll can go out, or None if nothing is being watched."""
+        query = self._next_query()
+        if query is None:
+            return None
+        return max(query.next_due - self.clock(), self.bucket.wait_time(), 0.0)
+
+    def step(self) -> list[Opening]:
+        """
+        Poll the most overdue query if it's due and the budget allows.
+
+        Returns:
+            Openings found by this poll
+        """
+        query = self._next_query()
+        if query is None:
+            return []
+
+        now = self.clock()
+        if query.next_due > now or self.bucket.wait_time() > 0:
+            return []
+        heapq.heappop(self._heap)
+
+        paused_until = self._paused_until.get(query.platform, 0.0)
+        if paused_until > now:
+            # Platform is rate limiting us; let other platforms' queries go first
+            query.next_due = paused_until
+            self._push(query)
+            return []
+
+        if self._is_expired(query):
+            del self._queries[query.key]
+            return []
+
+        self.bucket.take()
+        openings = self._poll(query)
+
+        if query.key in self._queries:
+            query.next_due = self.clock() + self.interval_for(query)
+            self._push(query)
+        return openings
+
+    def _poll(self, query: _Query) -> list[Opening]:
+        platform, venue_id, date, party_size = query.key
+        client = self.clients[platform]
+        self.stats.polls += 1
+        query.polls += 1
+
+        try:
+            slots = client.find_slots(venue_id, date, party_size)
+        except BookingClientError as e:
+            self._on_error(query, e)
+            return []
+        query.errors = 0
+
+        current = {(s.time, s.table_type): s for s in slots}
+        previous = query.last_slots
+        query.last_slots = current
+        if previous is None:
+            return []  # first poll is the baseline
+
+        changed = current.keys() != previous.keys()
+        volatility = self._volatility.get(query.venue_key, 0.0)
+        self._volatility[query.venue_key] = VOLATILITY_DECAY * volatility + (1 - VOLATILITY_DECAY) * changed
+
+        # A slot whose booking failed for a reason worth retrying is offered
+        # again to the target that failed, for as long as it stays listed
+        retry = query.retry_slots
+        query.retry_slots = set()
+        new_slots = [slot for key, slot in current.items() if key not in previous]
+        if not new_slots and not retry:
+            return []
+
+        openings = []
+        for target in list(query.targets):
+            candidates = new_slots + [
+                current[key] for name, key in retry if name == target.name and key in current and key in previous
+            ]
+            slot = select_best_slot(candidates, target.preferences, target.table_types)
+            if slot is None:
+                continue
+            opening = Opening(target, slot, found_at=self.clock())
+            self.stats.openings += 1
+            if target.book:
+                if not self._book(client, opening):
+                    query.retry_slots.add((target.name, (slot.time, slot.table_type)))
+                if opening.confirmation:
+                    # Another target can't have the same table
+                    new_slots = [s for s in new_slots if s is not slot]
+            openings.append(opening)
+            if self.on_opening:
+                self.on_opening(opening)
+        return openings
+
+    def _book(self, client: BookingClient, opening: Opening) -> bool:
+        """
+        Book an opening; False if it failed in a way worth retrying (transient,
+        rate limit, or an expired token that's since been refreshed).
+        """
+        target = opening.target
+        try:
+            opening.confirmation = client.book_slot(opening.slot, target.date, target.party_size)
+        except BookingClientError as e:
+            opening.error = str(e)
+            if e.outcome_unknown:
+                # It may have gone through; booking again could hold a second table
+                opening.outcome_unknown = True
+                self.remove(target)
+                return True
+            policy = self.policies.get(target.platform) or policy_for(target.platform)
+            category = policy.classify(e)
+            if category == AUTH_EXPIRED:
+                # The same token would only be refused again
+                return not (self.refresh and self.refresh(target.platform))
+            return category not in (TRANSIENT, RATE_LIMITED)
+        self.stats.bookings += 1
+        self.remove(target)
+        return True
+
+    def _on_error(self, query: _Query, error: BookingClientError) -> None:
+        self.stats.errors += 1
+        query.errors += 1
+        policy = self.policies.get(query.platform) or policy_for(query.platform)
+        category = policy.classify(error)
+        if category == RATE_LIMITED:
+            pause = policy.backoff(category, query.errors, error.retry_after)
+            self._paused_until[query.platform] = self.clock() + max(pause, self.min_interval)
+        elif category == AUTH_EXPIRED and self.refresh and self.refresh(query.platform):
+            query.errors = 0
+
+    def run(self, duration: Optional[float] = None, max_polls: Optional[int] = None) -> WatchStats:
+        """
+        Poll until nothing is left to watch, `duration` seconds pass or
+        `max_polls` polls have been made.
+        """
+        deadline = self.clock() + duration if duration is not None else None
+        polls_at_start = self.stats.polls
+        while True:
+            if max_polls is not None and self.stats.polls - polls_at_start >= max_polls:
+                break
+            wait = self.next_wait()
+            if wait is None:
+                break
+            if deadline is not None and self.clock() + wait > deadline:
+                break
+            if wait > 0:
+                if self.bucket.wait_time() >= wait:
+                    self.stats.budget_wait_s += wait
+                self.sleep(wait)
+            self.step()
+        return self.stats
+
+
+def load_targets(entries: list[dict]) -> list[WatchTarget]:
+    """
+    Build targets from dicts in the Lambda event shape
+    (venue_id, date, party_size, best, earliest, latest, platform,
+    table_types, tolerance, plus optional book and name).
+    """
+    fields = ("venue_id", "date", "party_size", "best", "earliest", "latest",
+              "platform", "table_types", "book", "name", "tolerance")
+    return [WatchTarget(**{k: entry[k] for k in fields if k in entry}) for entry in entries]
@@ -0,0 +1,243 @@
+"""
+Worker pool that books jobs from a queue.
+
+For steady volume, starting a process (or a Lambda) per booking wastes most
+of its time on start-up and credentials. WorkerPool keeps N workers busy
+with jobs from a JobQueue (see api/job_queue.py). Jobs are booking events in
+the Lambda event shape, and every worker shares one set of clients,
+credentials and connection pools (api.jobs.BookingResources).
+
+The workers are threads: the platform clients are blocking, and the
+bookings spend nearly all their time waiting on the network.
+
+A job's outcome decides what happens to its message:
+
+    booked (200)            ack
+    invalid job (400)       dead-letter straight away; retrying can't help
+    outcome unknown (502)   dead-letter straight away; the booking may have
+                            gone through, and retrying could book twice
+    anything else           release for a retry after an exponential
+                            backoff, or dead-letter after the queue's
+                            max_receives attempts
+
+While a job runs, its message's visibility is extended periodically, so a
+long fire_at wait or retry loop isn't redelivered to another worker.
+"""
+
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from .job_queue import DEFAULT_MAX_RECEIVES, JobQueue, QueueMessage
+from .logs import get_logger
+
+
+logger = get_logger("worker")
+
+
+DEFAULT_WORKERS = 8
+DEFAULT_JOB_VISIBILITY = 120.0
+RETRY_BASE_DELAY = 5.0
+MAX_RETRY_DELAY = 300.0
+
+
+@dataclass
+class WorkerMetrics:
+    """Throughput and outcomes of a worker pool run."""
+    received: int = 0
+    succeeded: int = 0
+    retried: int = 0
+    dead_lettered: int = 0
+    # Acks/releases refused because the message had already timed out and gone to someone else
+    lost: int = 0
+    in_flight: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    durations: list[float] = field(default_factory=list, repr=False)
+
+    @property
+    def completed(self) -> int:
+        return self.succeeded + self.retried + self.dead_lettered
+
+    def to_dict(self) -> dict:
+        elapsed = max(1e-9, time.monotonic() - self.started_at)
+        durations = sorted(self.durations)
+
+        def pct(q):
+            return round(durations[min(len(durations) - 1, int(q * len(durations)))] * 1000, 1) if durations else None
+
+        return {
+            "received": self.received,
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered,
+            "lost": self.lost,
+            "in_flight": self.in_flight,
+            "elapsed_s": round(elapsed, 1),
+            "jobs_per_minute": round(self.completed / elapsed * 60, 1),
+            "mean_job_ms": round(statistics.fmean(durations) * 1000, 1) if durations else None,
+            "p50_job_ms": pct(0.5),
+            "p95_job_ms": pct(0.95),
+        }
+
+
+class WorkerPool:
+    """
+    Runs queued jobs on a pool of worker threads.
+
+    Args:
+        queue: Where jobs come from
+        run_job: Runs one job body, returning a Lambda-style response
+            ({"statusCode": ..., "body": "<json>"}), e.g. api.jobs.run_booking_job
+        workers: Jobs run at once
+        visibility_timeout: Seconds a received job stays hidden; extended
+            every third of it while the job runs
+        retry_base_delay, max_retry_delay: Backoff before a failed job is
+            visible again, doubling with each receive
+        log: Progress output
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        run_job: Callable[[dict], dict],
+        workers: int = DEFAULT_WORKERS,
+        visibility_timeout: float = DEFAULT_JOB_VISIBILITY,
+        retry_base_delay: float = RETRY_BASE_DELAY,
+        max_retry_delay: float = MAX_RETRY_DELAY,
+        log: Callable[[str], None] = logger.info,
+    ):
+        self.queue = queue
+        self.run_job = run_job
+        self.workers = workers
+        self.visibility_timeout = visibility_timeout
+        self.retry_base_delay = retry_base_delay
+        self.max_retry_delay = max_retry_delay
+        self.log = log
+        self.metrics = WorkerMetrics()
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, QueueMessage] = {}
+        self._free = threading.Semaphore(workers)
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """Stop taking new jobs; run() returns once the running ones finish."""
+        self._stop.set()
+
+    def _heartbeat(self) -> None:
+        interval = self.visibility_timeout / 3
+        while not self._stop.wait(interval):
+            with self._lock:
+                messages = list(self._in_flight.values())
+            for message in messages:
+                try:
+                    self.queue.extend(message, self.visibility_timeout)
+                except Exception as e:
+                    self.log(f"Could not extend {message.message_id}: {e}")
+
+    def _settle(self, message: QueueMessage, response: dict) -> None:
+        """Ack, retry or dead-letter a finished job's message."""
+        status = response.get("statusCode", 500)
+        try:
+            error = json.loads(response.get("body") or "{}").get("error", "")
+        except (TypeError, ValueError):
+            error = ""
+        max_receives = getattr(self.queue, "max_receives", DEFAULT_MAX_RECEIVES)
+
+        if status == 200:
+            done, outcome = self.queue.ack(message), "succeeded"
+        elif status in (400, 502) or message.receive_count >= max_receives:
+            done, outcome = self.queue.dead_letter(message, f"{status}: {error}"), "dead_lettered"
+        else:
+            delay = min(self.max_retry_delay, self.retry_base_delay * 2 ** (message.receive_count - 1))
+            done, outcome = self.queue.release(message, delay), "retried"
+
+        with self._lock:
+            if done:
+                setattr(self.metrics, outcome, getattr(self.metrics, outcome) + 1)
+            else:
+                self.metrics.lost += 1
+        self.log(f"[{message.message_id}] {status} -> {outcome if done else 'lost (visibility expired)'}"
+                 + (f": {error}" if error and status != 200 else ""))
+
+    def _work(self, message: QueueMessage) -> None:
+        started = time.monotonic()
+        try:
+            try:
+                response = self.run_job(message.body)
+            except Exception as e:
+                response = {"statusCode": 500, "body": json.dumps({"error": f"{type(e).__name__}: {e}"})}
+            self._settle(message, response)
+        except Exception as e:
+            # The queue itself failed; the message will time out and be redelivered
+            self.log(f"[{message.message_id}] could not settle: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.pop(message.message_id, None)
+                self.metrics.in_flight = len(self._in_flight)
+                self.metrics.durations.append(time.monotonic() - started)
+            self._free.release()
+
+    def run(self, duration: Optional[float] = None, drain: bool = False,
+            report_every: Optional[float] = None) -> WorkerMetrics:
+        """
+        Take and run jobs until stopped.
+
+        Args:
+            duration: Stop taking jobs after this many seconds
+            drain: Stop once the queue is empty and no job is running
+            report_every: Log the metrics every this many seconds
+
+        Returns:
+            The run's metrics
+        """
+        self.metrics = WorkerMetrics()
+        self._stop.clear()
+        ends_at = time.monotonic() + duration if duration is not None else None
+        next_report = time.monotonic() + report_every if report_every else None
+        heartbeat = threading.Thread(target=self._heartbeat, daemon=True)
+        heartbeat.start()
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="oddjob-worker") as executor:
+            try:
+                while not self._stop.is_set():
+                    if ends_at is not None and time.monotonic() >= ends_at:
+                        break
+                    if next_report is not None and time.monotonic() >= next_report:
+                        self.log(f"Metrics: {json.dumps(self.metrics.to_dict())}")
+                        next_report += report_every
+
+                    # Wait for a free worker, then take as many jobs as there are free workers
+                    if not self._free.acquire(timeout=1.0):
+                        continue
+                    free = 1
+                    while free < self.workers and self._free.acquire(blocking=False):
+                        free += 1
+
+                    try:
+                        messages = self.queue.receive(free, self.visibility_timeout, wait=1.0)
+                    except Exception as e:
+                        self.log(f"Receive failed: {e}")
+                        messages = []
+                        self._stop.wait(1.0)
+
+                    for _ in range(free - len(messages)):
+                        self._free.release()
+                    with self._lock:
+                        for message in messages:
+                            self._in_flight[message.message_id] = message
+                        self.metrics.received += len(messages)
+                        self.metrics.in_flight = len(self._in_flight)
+                        idle = not self._in_flight
+                    for message in messages:
+                        executor.submit(self._work, message)
+
+                    if drain and not messages and idle:
+                        break
+            finally:
+                self._stop.set()
+        heartbeat.join(timeout=1.0)
+        return self.metrics
@@ -0,0 +1,80 @@
+"""
+Size and query speed of the availability archive.
+
+Writes a synthetic venue history (one series per day, polled every second
+around a release where every slot appears at once and then gets booked
+away) into a temporary archive, then compares its size with storing each
+poll as JSON and times an openings() query over the whole history.
+
+Usage (from src/):
+    python -m bench.archive_size
+    python -m bench.archive_size --days 180 --polls 3600
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import date, timedelta
+
+from api.archive import AvailabilityArchive
+from api.base import Slot
+
+
+SLOT_TIMES = [f"{h:02d}:{m:02d}:00" for h in range(17, 23) for m in (0, 15, 30, 45)]
+TABLE_TYPES = ("Dining Room", "Bar", "Patio")
+
+
+def build(archive: AvailabilityArchive, days: int, polls: int, seed: int) -> tuple[int, int]:
+    """Write the synthetic history. Returns (polls written, bytes the same polls take as JSON)."""
+    rng = random.Random(seed)
+    start = time.time() - days * 86400
+    written = json_bytes = 0
+    for day in range(days):
+        res_date = (date.today() + timedelta(days=day)).isoformat()
+        listed: set[tuple[str, str]] = set()
+        observed_at = start + day * 86400
+        for poll in range(polls):
+            observed_at += 1.0
+            if poll == polls // 10:
+                listed = {(t, rng.choice(TABLE_TYPES)) for t in SLOT_TIMES}
+            elif listed and rng.random() < 0.05:
+                listed.discard(rng.choice(sorted(listed)))
+            elif rng.random() < 0.002:
+                listed.add((rng.choice(SLOT_TIMES), rng.choice(TABLE_TYPES)))
+            slots = [Slot("resy", "1", t, table_type) for t, table_type in sorted(listed)]
+            archive.record("resy", "1", res_date, 2, slots, observed_at)
+            written += 1
+            json_bytes += len(json.dumps([asdict(s) for s in slots]))
+    return written, json_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the availability archive's size and query speed")
+    parser.add_argument("--days", type=int, default=90, help="Series (reservation dates) to write (default: 90)")
+    parser.add_argument("--polls", type=int, default=2000, help="Polls per series (default: 2000)")
+    parser.add_argument("--time", default="19:00", help="Slot time to query openings for (default: 19:00)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        with AvailabilityArchive(directory) as archive:
+            started = time.perf_counter()
+            polls, json_bytes = build(archive, args.days, args.polls, args.seed)
+            write_s = time.perf_counter() - started
+        size = archive.path("resy", "1").stat().st_size
+
+        started = time.perf_counter()
+        windows = archive.openings("resy", "1", time=args.time)
+        query_ms = (time.perf_counter() - started) * 1000
+
+    print(f"Polls:      {polls} ({polls / write_s:,.0f}/s written)")
+    print(f"Archive:    {size:,} bytes ({size / polls:.2f} bytes/poll)")
+    print(f"As JSON:    {json_bytes:,} bytes ({json_bytes / size:,.0f}x larger)")
+    print(f"Query:      {len(windows)} {args.time} windows in {query_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
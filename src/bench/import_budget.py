@@ -0,0 +1,120 @@
+"""
+Cold-start import budget for the Lambda handler.
+
+Imports lambda_handler in fresh interpreters under `python -X importtime`,
+reports the median self-reported import time and the heaviest modules, and
+exits 1 if the median exceeds the budget or a module that must stay lazy
+(boto3, the CLI, the HTTP stack, the profiler) was imported at module level.
+
+Usage (from src/, or pass --path build to check the packaged artifact):
+    python -m bench.import_budget
+    python -m bench.import_budget --max-ms 60 --runs 7 --path ../build
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+
+DEFAULT_MODULE = "lambda_handler"
+DEFAULT_BUDGET_MS = 80.0
+
+# Top-level packages that must not be imported just by loading the handler
+LAZY_MODULES = ("boto3", "botocore", "cli", "argparse", "requests", "urllib3", "cProfile")
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def measure_once(module: str, path: str) -> dict[str, int]:
+    """
+    Import `module` in a fresh interpreter.
+
+    Returns:
+        Cumulative microseconds for `module` and each module it pulled in
+        (interpreter startup imports such as site are left out)
+    """
+    env = dict(os.environ, PYTHONPATH=path)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, cwd=path,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    # importtime prints children before their parent, nested by indentation;
+    # the target's subtree is everything since the previous top-level import
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        name, depth = match.group(4), len(match.group(3))
+        cumulative[name] = int(match.group(2))
+        if depth == 1 and name != module:
+            cumulative = {}
+        if depth == 1 and name == module:
+            break
+    return cumulative
+
+
+def measure(module: str = DEFAULT_MODULE, path: str = ".", runs: int = 5) -> dict:
+    """
+    Measure import cost over several fresh interpreters.
+
+    The first run also warms the bytecode cache, so it's discarded.
+
+    Returns:
+        {"median_ms", "runs_ms", "heaviest": [(module, ms)], "lazy_violations": [module]}
+    """
+    measure_once(module, path)
+    samples = [measure_once(module, path) for _ in range(runs)]
+    totals = [s.get(module, 0) / 1000 for s in samples]
+
+    last = samples[-1]
+    own_modules = {name: us for name, us in last.items() if name != module}
+    heaviest = sorted(own_modules.items(), key=lambda item: -item[1])[:10]
+    loaded = {name.split(".")[0] for name in last}
+
+    return {
+        "median_ms": statistics.median(totals),
+        "runs_ms": totals,
+        "heaviest": [(name, us / 1000) for name, us in heaviest],
+        "lazy_violations": sorted(m for m in LAZY_MODULES if m in loaded),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the Lambda handler's cold-start import budget")
+    parser.add_argument("--module", default=DEFAULT_MODULE)
+    parser.add_argument("--path", default=str(Path(__file__).resolve().parent.parent),
+                        help="Directory to import from (default: src/)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"Median import budget in ms (default: {DEFAULT_BUDGET_MS:g})")
+    args = parser.parse_args()
+
+    result = measure(args.module, args.path, args.runs)
+
+    print(f"import {args.module}: median {result['median_ms']:.1f} ms "
+          f"over {args.runs} runs (budget {args.max_ms:g} ms)")
+    print("Heaviest imports (cumulative):")
+    for name, ms in result["heaviest"]:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    failed = False
+    if result["lazy_violations"]:
+        print(f"Imported at module level but should be lazy: {', '.join(result['lazy_violations'])}")
+        failed = True
+    if result["median_ms"] > args.max_ms:
+        print(f"Over budget by {result['median_ms'] - args.max_ms:.1f} ms")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Per-attempt cost of progress logging on the booking path.
+
+Runs attempt_booking against an in-memory client (no network, a slot that's
+always gone, so every attempt logs its banner, the selection and the
+error) and times the attempts with progress written two ways:
+
+    print   synchronous print() to the output, as the booking path used to
+    queued  the "oddjob" loggers through api.logs (queue + background writer)
+
+The output is the null device, and each write also sleeps --sink-ms to
+stand in for a slow terminal, a pipe to a log agent or CloudWatch.
+
+Usage (from src/):
+    python -m bench.log_overhead
+    python -m bench.log_overhead --attempts 2000 --sink-ms 0.5 --format json
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import time
+
+from api.base import BookingClient, BookingClientError, BookingConfirmation, Slot
+from api.booking_loop import attempt_booking
+from api.logs import LOG_FORMATS, configure_logging, flush_logging, get_logger
+from api.retry_policy import policy_for
+from api.time_preferences import compile_preferences
+
+
+class SlowSink(io.TextIOBase):
+    """Writes to the null device, each write taking at least `delay` seconds."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.devnull = open(os.devnull, "w")
+
+    def write(self, text: str) -> int:
+        self.devnull.write(text)
+        self.devnull.flush()
+        if self.delay:
+            time.sleep(self.delay)
+        return len(text)
+
+
+class GoneClient(BookingClient):
+    """Always finds one slot and always loses it."""
+
+    platform_name = "resy"
+
+    def find_slots(self, venue_id, date, party_size):
+        return [Slot("resy", venue_id, "19:00:00", "Dining Room")]
+
+    def book_slot(self, slot, date, party_size) -> BookingConfirmation:
+        raise BookingClientError("Booking failed: 412 slot gone", status_code=412, platform="resy")
+
+    def cancel_booking(self, confirmation: BookingConfirmation) -> None:
+        raise BookingClientError("Cancellation failed: 404 no such reservation", status_code=404, platform="resy")
+
+    def update_credentials(self, credentials: dict) -> None:
+        pass
+
+
+def run(attempts: int, log) -> float:
+    """Microseconds per attempt."""
+    preferences = compile_preferences("19:00", "18:00", "21:00")
+    policy = policy_for("resy", {"actions": {"slot_gone": "backoff"}})
+    started = time.perf_counter()
+    attempt_booking(
+        GoneClient(), "1", "2030-01-01", 2, preferences,
+        retry_count=attempts, policy=policy, sleep=lambda seconds: None, log=log,
+    )
+    return (time.perf_counter() - started) / attempts * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure progress logging overhead per booking attempt")
+    parser.add_argument("--attempts", type=int, default=500, help="Attempts per run (default: 500)")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per mode; the median is reported (default: 5)")
+    parser.add_argument("--sink-ms", type=float, default=0.2,
+                        help="Milliseconds each write to the output takes (default: 0.2)")
+    parser.add_argument("--format", choices=LOG_FORMATS, default="text", help="Queued log format (default: text)")
+    args = parser.parse_args()
+
+    baseline = statistics.median(run(args.attempts, lambda message: None) for _ in range(args.runs))
+
+    sink = SlowSink(args.sink_ms / 1000)
+    with contextlib.redirect_stdout(sink):
+        printed = statistics.median(run(args.attempts, print) for _ in range(args.runs))
+
+    configure_logging(fmt=args.format, stream=sink)
+    logger = get_logger("bench")
+    queued = []
+    for _ in range(args.runs):
+        queued.append(run(args.attempts, logger.info))
+        flush_logging()  # don't let one run's backlog slow the next
+    queued = statistics.median(queued)
+
+    print(f"Attempts: {args.attempts} x {args.runs} runs, output write {args.sink_ms:g} ms")
+    print(f"{'mode':<10}{'us/attempt':>12}{'logging us':>12}")
+    print(f"{'none':<10}{baseline:>12.1f}{'-':>12}")
+    print(f"{'print':<10}{printed:>12.1f}{printed - baseline:>12.1f}")
+    print(f"{'queued':<10}{queued:>12.1f}{queued - baseline:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+Local stand-in for the Resy and OpenTable endpoints the booking clients use.
+
+Serves recorded (or built-in) responses for:
+    Resy:      GET /4/find, GET /3/details, POST /3/book, POST /3/cancel, GET /2/user,
+               POST /3/auth/password
+    OpenTable: POST /dapi/fe/gql (RestaurantsAvailability, BookDetailsStandardSlotLock),
+               POST /dapi/booking/make-reservation, POST /dapi/booking/cancel-reservation,
+               GET /user/profile
+
+with configurable per-endpoint latency and failure injection, so the booking
+path can be measured without touching the real services.
+
+Point clients at it with "base_url" (Resy) / "site_url" (OpenTable) in their
+credentials — see MockBookingServer.credentials().
+
+Run standalone:
+    python -m bench.mock_server --port 8765 --latency-ms 40 --failure-rate 0.05
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+
+DEFAULT_TIMES = ["17:30", "18:00", "18:30", "19:00", "19:15", "19:30", "20:00", "20:45", "21:30"]
+
+# Endpoint keys used for latency, failure injection, fixtures and request counts
+ENDPOINTS = (
+    "resy_find", "resy_details", "resy_book", "resy_cancel", "resy_user", "resy_login",
+    "opentable_availability", "opentable_lock", "opentable_make_reservation", "opentable_cancel",
+    "opentable_profile",
+)
+
+
+@dataclass
+class FailureRule:
+    """Inject an error response with the given probability."""
+    rate: float
+    status: int = 500
+    body: dict = field(default_factory=lambda: {"message": "Injected failure"})
+
+
+def resy_find_fixture(venue_id: str, date: str, times: list[str]) -> dict:
+    """A /4/find response in Resy's shape with one slot per time."""
+    slots = []
+    for i, t in enumerate(times):
+        slots.append({
+            "config": {"id": 1000 + i, "type": "Dining Room", "token": f"rgs://resy/{venue_id}/{date}/{t}"},
+            "date": {"start": f"{date} {t}:00", "end": f"{date} {t}:00"},
+        })
+    return {"results": {"venues": [{"venue": {"id": {"resy": int(venue_id)}}, "slots": slots}]}}
+
+
+def opentable_availability_fixture(times: list[str]) -> dict:
+    """A RestaurantsAvailability response with offsets from the client's 19:00 request time."""
+    slots = []
+    for i, t in enumerate(times):
+        h, m = map(int, t.split(":"))
+        slots.append({
+            "isAvailable": True,
+            "timeOffsetMinutes": (h * 60 + m) - 19 * 60,
+            "slotHash": f"hash-{t}",
+            "slotAvailabilityToken": f"token-{t}",
+            "type": "Standard",
+            "diningAreasBySeating": [{"id": 1, "inventoryAccessRuleMap": {}}],
+        })
+    return {"data": {"availability": [{"availabilityDays": [{"slots": slots}]}]}}
+
+
+class MockBookingServer:
+    """
+    Threaded HTTP server imitating both platforms.
+
+    Args:
+        host, port: Bind address (port 0 picks a free one)
+        latency_ms: Base latency added to every response, or a dict per endpoint key
+        jitter_ms: Uniform random extra latency, 0..jitter_ms
+        failures: Per-endpoint FailureRule
+        times: Slot times (HH:MM) offered by the built-in fixtures
+        fixtures_dir: Directory of recorded responses named <endpoint key>.json,
+                      used instead of the built-in fixtures where present
+        seed: Random seed for jitter and failure injection
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float | dict = 0.0,
+        jitter_ms: float = 0.0,
+        failures: Optional[dict[str, FailureRule]] = None,
+        times: Optional[list[str]] = None,
+        fixtures_dir: Optional[str] = None,
+        seed: Optional[int] = None,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failures = failures or {}
+        self.times = times or list(DEFAULT_TIMES)
+        self.fixtures = self._load_fixtures(fixtures_dir)
+        self.random = random.Random(seed)
+        self.counts = {key: 0 for key in ENDPOINTS}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _load_fixtures(fixtures_dir: Optional[str]) -> dict:
+        if not fixtures_dir:
+            return {}
+        fixtures = {}
+        for key in ENDPOINTS:
+            path = Path(fixtures_dir) / f"{key}.json"
+            if path.exists():
+                fixtures[key] = json.loads(path.read_text())
+        return fixtures
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def credentials(self, platform: str) -> dict:
+        """Credential dict that points a client created by create_client at this server."""
+        if platform == "resy":
+            return {"api_key": "mock-key", "auth_token": "mock-token", "base_url": self.url}
+        return {
+            "csrf_token": "mock-csrf",
+            "cookies": "mock=1",
+            "first_name": "Mock",
+            "last_name": "Diner",
+            "email": "mock@example.com",
+            "phone_number": "5555550100",
+            "gpid": "1",
+            "site_url": self.url,
+        }
+
+    def start(self) -> "MockBookingServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-booking-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve on the calling thread until interrupted."""
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockBookingServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _delay(self, key: str) -> None:
+        base = self.latency_ms.get(key, 0.0) if isinstance(self.latency_ms, dict) else self.latency_ms
+        with self._lock:
+            jitter = self.random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+        if base + jitter > 0:
+            time.sleep((base + jitter) / 1000)
+
+    def _injected_failure(self, key: str) -> Optional[FailureRule]:
+        rule = self.failures.get(key)
+        if rule is None:
+            return None
+        with self._lock:
+            return rule if self.random.random() < rule.rate else None
+
+    def respond(self, key: str, query: dict, body: dict) -> tuple[int, dict]:
+        """Status and JSON body for an endpoint key. Override to script custom behaviour."""
+        with self._lock:
+            self.counts[key] += 1
+
+        self._delay(key)
+        failure = self._injected_failure(key)
+        if failure:
+            return failure.status, failure.body
+        if key in self.fixtures:
+            return 200, self.fixtures[key]
+
+        if key == "resy_find":
+            return 200, resy_find_fixture(query.get("venue_id", "1"), query.get("day", "2030-01-01"), self.times)
+        if key == "resy_details":
+            return 200, {
+                "book_token": {"value": f"book-{query.get('config_id', '')}"},
+                "user": {"payment_methods": [{"id": 42}]},
+            }
+        if key == "resy_book":
+            return 201, {"resy_token": f"resy-{self.random.getrandbits(48):x}", "reservation_id": 987654}
+        if key == "resy_cancel":
+            return 200, {"payment": {"transaction": {"refund": 1}}}
+        if key == "resy_user":
+            return 200, {"id": 1}
+        if key == "resy_login":
+            return 200, {"token": "mock-token-refreshed"}
+        if key == "opentable_availability":
+            return 200, opentable_availability_fixture(self.times)
+        if key == "opentable_lock":
+            return 200, {"data": {"lockSlot": {"success": True, "slotLock": {"slotLockId": 555}}}}
+        if key == "opentable_make_reservation":
+            return 200, {
+                "success": True,
+                "confirmationNumber": self.random.randint(100000, 999999),
+                "reservationId": self.random.randint(1, 10 ** 9),
+                "securityToken": "mock-security-token",
+            }
+        if key == "opentable_cancel":
+            return 200, {"success": True, "confirmationNumber": body.get("confirmationNumber")}
+        if key == "opentable_profile":
+            return 200, {}
+        return 404, {"message": "Unknown endpoint"}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1 keep-alive so client connection pooling behaves as it would in production
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this, delayed ACKs add ~40ms per response
+            disable_nagle_algorithm = True
+
+            def _route(self, method: str) -> None:
+                parts = urlsplit(self.path)
+                query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                body = parse_body(raw, self.headers.get("Content-Type"))
+
+                key = endpoint_key(method, parts.path, query)
+                status, payload = server.respond(key, query, body) if key else (404, {"message": "Not found"})
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._route("GET")
+
+            def do_POST(self):
+                self._route("POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def parse_body(raw: bytes | str | None, content_type: Optional[str]) -> dict:
+    """Decode a JSON or form-encoded request body."""
+    if not raw:
+        return {}
+    if isinstance(raw, bytes):
+        raw = raw.decode()
+    if "json" in (content_type or ""):
+        return json.loads(raw)
+    return {k: v[0] for k, v in parse_qs(raw).items()}
+
+
+def endpoint_key(method: str, path: str, query: dict) -> Optional[str]:
+    """Map a request to one of ENDPOINTS, or None if the clients never call it."""
+    routes = {
+        ("GET", "/4/find"): "resy_find",
+        ("GET", "/3/details"): "resy_details",
+        ("POST", "/3/book"): "resy_book",
+        ("POST", "/3/cancel"): "resy_cancel",
+        ("GET", "/2/user"): "resy_user",
+        ("POST", "/3/auth/password"): "resy_login",
+        ("POST", "/dapi/booking/make-reservation"): "opentable_make_reservation",
+        ("POST", "/dapi/booking/cancel-reservation"): "opentable_cancel",
+        ("GET", "/user/profile"): "opentable_profile",
+    }
+    if (method, path) in routes:
+        return routes[(method, path)]
+    if method == "POST" and path == "/dapi/fe/gql":
+        return {
+            "RestaurantsAvailability": "opentable_availability",
+            "BookDetailsStandardSlotLock": "opentable_lock",
+        }.get(query.get("opname"))
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the Resy/OpenTable booking endpoints")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latency added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Extra uniform random latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="Probability of a 500 on the find endpoints")
+    parser.add_argument("--fixtures", help="Directory of recorded <endpoint>.json responses")
+    args = parser.parse_args()
+
+    failures = {}
+    if args.failure_rate:
+        failures = {key: FailureRule(args.failure_rate) for key in ("resy_find", "opentable_availability")}
+
+    server = MockBookingServer(
+        port=args.port,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        failures=failures,
+        fixtures_dir=args.fixtures,
+    )
+    print(f"Mock booking server listening on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
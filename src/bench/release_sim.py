@@ -0,0 +1,360 @@
+"""
+Competitive release-day simulator.
+
+Releases a venue's inventory at t=0 to a crowd of simulated competing
+bookers, each reacting after a delay drawn from a configurable distribution,
+and races our real booking code against them: the shared retry loop
+(api.booking_loop.attempt_booking), select_best_slot, and the platform
+client's own find_slots/book_slot. The client's HTTP session is mounted with
+an in-process adapter that answers from the simulated market, and every
+request and sleep advances a virtual clock — so thousands of trials run in
+seconds, entirely locally.
+
+Reports, per strategy: win rate, preference rank of the slot we got (0 = the
+best time), and requests spent.
+
+Usage (from src/):
+    python -m bench.release_sim --trials 2000
+    python -m bench.release_sim --strategy on-time:0:3:0 --strategy early-poll:-300:12:50 \\
+        --competitors 60 --reaction lognormal:400:0.5 --platform opentable
+"""
+
+import argparse
+import json
+import math
+import random
+import statistics
+from datetime import timedelta
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from requests import Response
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from api.booking_loop import attempt_booking
+from api.client_factory import create_client
+from api.time_preferences import compile_preferences
+
+from .mock_server import endpoint_key, opentable_availability_fixture, parse_body, resy_find_fixture
+
+
+# A distribution samples a non-negative duration in seconds
+Distribution = Callable[[random.Random], float]
+
+
+def parse_distribution(spec: str) -> Distribution:
+    """
+    Parse a distribution spec (all durations in milliseconds):
+
+        fixed:MS
+        uniform:LOW:HIGH
+        normal:MEAN:STDDEV
+        lognormal:MEDIAN:SIGMA
+        exponential:MEAN
+    """
+    kind, *params = spec.split(":")
+    values = [float(p) for p in params]
+    if kind == "fixed":
+        return lambda rng: values[0] / 1000
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1])) / 1000
+    if kind == "lognormal":
+        mu = math.log(values[0])
+        return lambda rng: rng.lognormvariate(mu, values[1]) / 1000
+    if kind == "exponential":
+        return lambda rng: rng.expovariate(1 / values[0]) / 1000
+    raise ValueError(f"Unknown distribution '{kind}' in '{spec}'")
+
+
+@dataclass
+class Strategy:
+    """How we fire: offset from the release instant, and the retry loop's settings."""
+    name: str
+    fire_offset_ms: float = 0.0
+    retry_count: int = 3
+    retry_delay_ms: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "Strategy":
+        """NAME:FIRE_OFFSET_MS:RETRIES:RETRY_DELAY_MS"""
+        name, offset, retries, delay = spec.split(":")
+        return cls(name, float(offset), int(retries), float(delay))
+
+
+@dataclass
+class MarketConfig:
+    """The contested release."""
+    platform: str = "resy"
+    times: list[str] = field(default_factory=lambda: [
+        f"{h:02d}:{m:02d}" for h in range(17, 23) for m in (0, 15, 30, 45)
+    ])
+    tables_per_time: int = 1
+    competitors: int = 40
+    reaction: Distribution = field(default_factory=lambda: parse_distribution("lognormal:450:0.6"))
+    latency: Distribution = field(default_factory=lambda: parse_distribution("lognormal:60:0.3"))
+    popular_time: str = "19:30"
+    popularity_spread_minutes: float = 45.0
+    competitor_window_minutes: float = 90.0
+    best: str = "19:00"
+    earliest: str = "18:00"
+    latest: str = "21:00"
+
+
+def _minutes(hhmm: str) -> int:
+    h, m = hhmm.split(":")[:2]
+    return int(h) * 60 + int(m)
+
+
+class Market:
+    """Inventory, competitors and the virtual clock for one trial."""
+
+    def __init__(self, config: MarketConfig, rng: random.Random):
+        self.config = config
+        self.rng = rng
+        self.minutes = {t: _minutes(t) for t in config.times}
+        self.reset(0.0)
+
+    def reset(self, start: float) -> None:
+        self.now = start
+        self.inventory = {t: self.config.tables_per_time for t in self.config.times}
+        self.held: Optional[str] = None
+        self.won: Optional[str] = None
+        self.requests = 0
+        self.competitor_events = sorted(
+            ((self.config.reaction(self.rng), self._competitor_preferences())
+             for _ in range(self.config.competitors)),
+            key=lambda event: event[0],
+        )
+
+    def _competitor_preferences(self) -> list[str]:
+        center = self.rng.gauss(_minutes(self.config.popular_time), self.config.popularity_spread_minutes)
+        window = self.config.competitor_window_minutes
+        distance = {t: abs(m - center) for t, m in self.minutes.items()}
+        return sorted((t for t in self.config.times if distance[t] <= window), key=distance.__getitem__)
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+    def advance(self, to: float) -> None:
+        """Let every competitor whose reaction time has passed grab their best available slot."""
+        while self.competitor_events and self.competitor_events[0][0] <= to:
+            _, preferences = self.competitor_events.pop(0)
+            for t in preferences:
+                if self.inventory.get(t, 0) > 0:
+                    self.inventory[t] -= 1
+                    break
+
+    def available(self, server_time: float) -> list[str]:
+        if server_time < 0:
+            return []
+        return [t for t in self.config.times if self.inventory[t] > 0]
+
+    def handle(self, key: str, query: dict, body: dict) -> tuple[int, dict]:
+        """Serve one client request at the current virtual time."""
+        self.requests += 1
+        latency = self.config.latency(self.rng)
+        server_time = self.now + latency / 2
+        self.advance(server_time)
+        response = self._respond(key, query, body, server_time)
+        self.now += latency
+        return response
+
+    def _take(self, t: str, server_time: float) -> bool:
+        if server_time >= 0 and self.inventory.get(t, 0) > 0:
+            self.inventory[t] -= 1
+            return True
+        return False
+
+    def _respond(self, key: str, query: dict, body: dict, server_time: float) -> tuple[int, dict]:
+        gone = {"message": "Slot no longer available"}
+
+        if key == "resy_find":
+            return 200, resy_find_fixture(query["venue_id"], query["day"], self.available(server_time))
+        if key == "opentable_availability":
+            return 200, opentable_availability_fixture(self.available(server_time))
+
+        if key == "resy_details":
+            t = query["config_id"].rsplit("/", 1)[-1]
+            if t not in self.available(server_time):
+                return 412, gone
+            return 200, {"book_token": {"value": f"book-{query['config_id']}"},
+                         "user": {"payment_methods": [{"id": 1}]}}
+        if key == "resy_book":
+            t = body["book_token"].rsplit("/", 1)[-1]
+            if not self._take(t, server_time):
+                return 412, gone
+            self.won = t
+            return 201, {"resy_token": f"sim-{t}", "reservation_id": 1}
+
+        if key == "opentable_lock":
+            t = body["variables"]["input"]["slotHash"].split("-", 1)[1]
+            if not self._take(t, server_time):
+                return 200, {"data": {"lockSlot": {"success": False, "slotLockErrors": ["SLOT_UNAVAILABLE"]}}}
+            self.held = t
+            return 200, {"data": {"lockSlot": {"success": True, "slotLock": {"slotLockId": 1}}}}
+        if key == "opentable_make_reservation":
+            t = body["slotHash"].split("-", 1)[1]
+            if self.held != t:
+                return 409, gone
+            self.won = t
+            return 200, {"success": True, "confirmationNumber": 1, "reservationId": 1}
+
+        return 404, {"message": "Not simulated"}
+
+
+class SimulatedAdapter(BaseAdapter):
+    """requests transport adapter that answers from a Market instead of the network."""
+
+    def __init__(self, market: Market):
+        super().__init__()
+        self.market = market
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        parts = urlsplit(request.url)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        body = parse_body(request.body, request.headers.get("Content-Type"))
+        key = endpoint_key(request.method, parts.path, query)
+        status, payload = self.market.handle(key, query, body) if key else (404, {})
+
+        response = Response()
+        response.status_code = status
+        response._content = json.dumps(payload).encode()
+        response.headers = CaseInsensitiveDict({"Content-Type": "application/json"})
+        response.encoding = "utf-8"
+        response.elapsed = timedelta(0)
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+@dataclass
+class TrialResult:
+    won: bool
+    rank: Optional[int]
+    requests: int
+    finished_at: float
+
+
+SIM_CREDENTIALS = {
+    "resy": {"api_key": "sim", "auth_token": "sim"},
+    "opentable": {
+        "csrf_token": "sim", "cookies": "sim", "first_name": "Sim", "last_name": "Diner",
+        "email": "sim@example.com", "phone_number": "5555550100", "gpid": "1",
+    },
+}
+
+
+class ReleaseSimulator:
+    """Runs strategies against repeated simulated releases."""
+
+    def __init__(self, config: MarketConfig, seed: Optional[int] = None):
+        self.config = config
+        self.rng = random.Random(seed)
+        self.market = Market(config, self.rng)
+        self.client = create_client(config.platform, SIM_CREDENTIALS[config.platform])
+        adapter = SimulatedAdapter(self.market)
+        self.client.session.mount("https://", adapter)
+        self.client.session.mount("http://", adapter)
+        # No proxies to resolve; skipping the environment scan keeps per-request overhead down
+        self.client.session.trust_env = False
+        self.preferences = compile_preferences(config.best, config.earliest, config.latest)
+        self.venue_id = "1"
+        self.date = "2030-01-01"
+
+    def run_trial(self, strategy: Strategy) -> TrialResult:
+        self.market.reset(strategy.fire_offset_ms / 1000)
+        attempt_booking(
+            self.client,
+            self.venue_id,
+            self.date,
+            2,
+            self.preferences,
+            retry_count=strategy.retry_count,
+            retry_delay=strategy.retry_delay_ms / 1000,
+            sleep=self.market.sleep,
+            log=lambda message: None,
+        )
+        won = self.market.won
+        rank = self.preferences.rank(won) if won else None
+        return TrialResult(won is not None, rank, self.market.requests, self.market.now)
+
+    def run(self, strategies: list[Strategy], trials: int) -> dict:
+        """Run each strategy for `trials` independent releases and summarise."""
+        results = {}
+        for strategy in strategies:
+            outcomes = [self.run_trial(strategy) for _ in range(trials)]
+            wins = [o for o in outcomes if o.won]
+            ranks = [o.rank for o in wins]
+            results[strategy.name] = {
+                "trials": trials,
+                "win_rate": len(wins) / trials,
+                "mean_rank": statistics.fmean(ranks) if ranks else None,
+                "best_slot_rate": sum(1 for r in ranks if r == 0) / trials,
+                "mean_requests": statistics.fmean(o.requests for o in outcomes),
+                "median_finish_ms": statistics.median(o.finished_at for o in outcomes) * 1000,
+            }
+        return results
+
+
+DEFAULT_STRATEGIES = [
+    Strategy("on-time", fire_offset_ms=0, retry_count=3, retry_delay_ms=0),
+    Strategy("late-200ms", fire_offset_ms=200, retry_count=3, retry_delay_ms=0),
+    Strategy("early-poll", fire_offset_ms=-300, retry_count=12, retry_delay_ms=50),
+    Strategy("cli-default", fire_offset_ms=0, retry_count=3, retry_delay_ms=500),
+]
+
+
+def print_report(results: dict) -> None:
+    print(f"{'strategy':<16} {'win rate':>9} {'best slot':>10} {'mean rank':>10} {'requests':>9} {'finish ms':>10}")
+    for name, r in results.items():
+        mean_rank = f"{r['mean_rank']:10.2f}" if r["mean_rank"] is not None else f"{'-':>10}"
+        print(f"{name:<16} {r['win_rate']:9.1%} {r['best_slot_rate']:10.1%} {mean_rank} "
+              f"{r['mean_requests']:9.1f} {r['median_finish_ms']:10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a contested release and compare booking strategies")
+    parser.add_argument("--trials", type=int, default=1000, help="Releases per strategy (default: 1000)")
+    parser.add_argument("--strategy", action="append", type=Strategy.parse,
+                        help="NAME:FIRE_OFFSET_MS:RETRIES:RETRY_DELAY_MS (repeatable)")
+    parser.add_argument("--platform", choices=["resy", "opentable"], default="resy")
+    parser.add_argument("--competitors", type=int, default=40)
+    parser.add_argument("--tables-per-time", type=int, default=1)
+    parser.add_argument("--reaction", default="lognormal:450:0.6",
+                        help="Competitor reaction-time distribution (ms), e.g. lognormal:450:0.6")
+    parser.add_argument("--latency", default="lognormal:60:0.3",
+                        help="Our request latency distribution (ms)")
+    parser.add_argument("--best", default="19:00")
+    parser.add_argument("--earliest", default="18:00")
+    parser.add_argument("--latest", default="21:00")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    config = MarketConfig(
+        platform=args.platform,
+        tables_per_time=args.tables_per_time,
+        competitors=args.competitors,
+        reaction=parse_distribution(args.reaction),
+        latency=parse_distribution(args.latency),
+        best=args.best,
+        earliest=args.earliest,
+        latest=args.latest,
+    )
+    results = ReleaseSimulator(config, seed=args.seed).run(args.strategy or DEFAULT_STRATEGIES, args.trials)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+End-to-end time-to-book benchmark against the local mock server.
+
+Runs the real CLI (cli.run_booking) and Lambda (lambda_handler.lambda_handler)
+entry points against MockBookingServer and reports p50/p95/p99
+fire-to-confirmation latency per entry point and platform.
+
+Usage (from src/):
+    python -m bench.time_to_book --runs 200 --latency-ms 30 --jitter-ms 20
+    python -m bench.time_to_book --max-p95-ms 250   # exit 1 if any p95 exceeds the budget
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+from typing import Callable, Optional
+
+from .mock_server import FailureRule, MockBookingServer
+
+
+PLATFORMS = ("resy", "opentable")
+ENTRY_POINTS = ("cli", "lambda")
+
+
+def percentile(values: list[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile; None for an empty list."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def booking_params(platform: str) -> dict:
+    return {
+        "venue_id": "25973" if platform == "resy" else "1234",
+        "date": (date.today() + timedelta(days=14)).isoformat(),
+        "party_size": 2,
+        "best": "19:00",
+        "earliest": "18:00",
+        "latest": "21:00",
+    }
+
+
+def run_cli_once(platform: str, config_path: str) -> Optional[float]:
+    """One cli.run_booking call; returns fire-to-confirmation ms, or None on failure."""
+    import cli
+    from api.instrumentation import Instrumentation
+
+    params = booking_params(platform)
+    instrumentation = Instrumentation(platform)
+    success = cli.run_booking(
+        venue_id=params["venue_id"],
+        res_date=params["date"],
+        party_size=params["party_size"],
+        best=params["best"],
+        earliest=params["earliest"],
+        latest=params["latest"],
+        platform=platform,
+        retry_delay=0.0,
+        config_path=config_path,
+        instrumentation=instrumentation,
+    )
+    return instrumentation.fire_to_confirmation_ms if success else None
+
+
+def run_lambda_once(platform: str, server: MockBookingServer) -> Optional[float]:
+    """One lambda_handler invocation with secrets served from the mock; returns fire-to-confirmation ms."""
+    import lambda_handler
+
+    lambda_handler.get_secrets = lambda p="resy": server.credentials(p)
+    event = {"platform": platform, **booking_params(platform)}
+    response = lambda_handler.lambda_handler(event, None)
+    body = json.loads(response["body"])
+    if not body.get("success"):
+        return None
+    return body["timings"]["fire_to_confirmation_ms"]
+
+
+def run_benchmark(
+    runs: int = 100,
+    latency_ms: float = 20.0,
+    jitter_ms: float = 10.0,
+    failure_rate: float = 0.0,
+    entry_points: tuple[str, ...] = ENTRY_POINTS,
+    platforms: tuple[str, ...] = PLATFORMS,
+    seed: Optional[int] = 0,
+) -> dict:
+    """
+    Run every entry point/platform combination `runs` times.
+
+    Returns:
+        {"<entry>/<platform>": {"runs", "successes", "p50_ms", "p95_ms", "p99_ms", "requests"}}
+    """
+    failures = {}
+    if failure_rate:
+        failures = {key: FailureRule(failure_rate) for key in ("resy_find", "opentable_availability")}
+
+    # Importing lambda_handler configures logging to the stdout of the time;
+    # import both entry points first, then send their progress nowhere
+    import cli  # noqa: F401
+    import lambda_handler  # noqa: F401
+    from api.logs import configure_logging, flush_logging
+
+    devnull = open(os.devnull, "w")
+    configure_logging(stream=devnull)
+
+    results = {}
+    with (
+        MockBookingServer(latency_ms=latency_ms, jitter_ms=jitter_ms, failures=failures, seed=seed) as server,
+        tempfile.TemporaryDirectory(prefix="oddjob-bench-") as config_dir,
+    ):
+        # The CLI reads a config file; it holds (mock) credentials, so it goes with the directory
+        config_path = os.path.join(config_dir, "config.json")
+        with open(config_path, "w") as f:
+            json.dump({p: server.credentials(p) for p in PLATFORMS}, f)
+
+        runners: dict[str, Callable[[str], Optional[float]]] = {
+            "cli": lambda p: run_cli_once(p, config_path),
+            "lambda": lambda p: run_lambda_once(p, server),
+        }
+
+        for entry in entry_points:
+            for platform in platforms:
+                before = sum(server.counts.values())
+                samples = []
+                for _ in range(runs):
+                    # Logging goes to devnull; this catches anything still printed
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        elapsed = runners[entry](platform)
+                    if elapsed is not None:
+                        samples.append(elapsed)
+
+                results[f"{entry}/{platform}"] = {
+                    "runs": runs,
+                    "successes": len(samples),
+                    "p50_ms": percentile(samples, 50),
+                    "p95_ms": percentile(samples, 95),
+                    "p99_ms": percentile(samples, 99),
+                    "requests": sum(server.counts.values()) - before,
+                }
+
+    flush_logging(restart=False)
+    devnull.close()
+    return results
+
+
+def print_report(results: dict) -> None:
+    print(f"{'scenario':<20} {'ok':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'requests':>9}")
+    for name, r in results.items():
+        fmt = lambda v: f"{v:9.1f}" if v is not None else f"{'-':>9}"
+        ok = f"{r['successes']}/{r['runs']}"
+        print(f"{name:<20} {ok:>9} {fmt(r['p50_ms'])} {fmt(r['p95_ms'])} {fmt(r['p99_ms'])} {r['requests']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fire-to-confirmation benchmark against the local mock server")
+    parser.add_argument("--runs", type=int, default=100, help="Bookings per scenario (default: 100)")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Mock server latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Extra uniform random latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probability of a 500 on find calls")
+    parser.add_argument("--entry", choices=ENTRY_POINTS, action="append", help="Entry point(s) to run")
+    parser.add_argument("--platform", choices=PLATFORMS, action="append", help="Platform(s) to run")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--max-p95-ms", type=float, help="Exit 1 if any scenario's p95 exceeds this")
+    args = parser.parse_args()
+
+    results = run_benchmark(
+        runs=args.runs,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        failure_rate=args.failure_rate,
+        entry_points=tuple(args.entry or ENTRY_POINTS),
+        platforms=tuple(args.platform or PLATFORMS),
+    )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+    if args.max_p95_ms is not None:
+        over = [name for name, r in results.items() if r["p95_ms"] is None or r["p95_ms"] > args.max_p95_ms]
+        if over:
+            print(f"p95 over budget ({args.max_p95_ms} ms): {', '.join(over)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
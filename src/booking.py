@@ -3,8 +3,10 @@ import os
 import sys
 from datetime import date, datetime
 
-import ResyTimeFunctions as rtf
 import ResyDaemon as rd
+from api.logs import get_logger
+
+logger = get_logger("web.booking")
 
 
 def validate_config():
@@ -41,24 +43,14 @@ def validate_date(date_str):
 
 
 def validate_times(best, earliest, latest):
-    n_best = rtf.timeToFloat(best)
-    n_earliest = rtf.timeToFloat(earliest)
-    n_latest = rtf.timeToFloat(latest)
-
-    if n_earliest > n_best:
-        print(f"Error: Earliest time ({earliest}) is after best time ({best}).")
-        sys.exit(1)
-
-    if n_best > n_latest:
-        print(f"Error: Best time ({best}) is after latest time ({latest}).")
-        sys.exit(1)
-
-    if n_earliest > n_latest:
-        print(f"Error: Earliest time ({earliest}) is after latest time ({latest}).")
+    try:
+        rd.getPreferredTimes(best, earliest, latest)
+    except ValueError as e:
+        print(f"Error: {e}")
         sys.exit(1)
 
 
-def run_booking(restaurant, res_date, guests, best, earliest, latest, city="new-york-ny"):
+def run_booking(restaurant, res_date, guests, best, earliest, latest, city="new-york-ny", pool=None):
     """Execute a Resy reservation booking. This function is the core entry point
     that can be called from the CLI, a cloud function handler, or any other context."""
 
@@ -72,11 +64,12 @@ def run_booking(restaurant, res_date, guests, best, earliest, latest, city="new-
         city, restaurant, guests, res_date
     )
 
-    print(f"Booking: {restaurant}")
-    print(f"  Date:   {res_date}")
-    print(f"  Guests: {guests}")
-    print(f"  Time:   {earliest} - {latest} (ideal: {best})")
-    print(f"  URL:    {url}")
-    print()
+    logger.info(
+        f"Booking: {restaurant}\n"
+        f"  Date:   {res_date}\n"
+        f"  Guests: {guests}\n"
+        f"  Time:   {earliest} - {latest} (ideal: {best})\n"
+        f"  URL:    {url}\n"
+    )
 
-    rd.getPage(url, preferred_times)
+    return rd.getPage(url, preferred_times, pool=pool)
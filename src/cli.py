@@ -9,84 +9,51 @@ Example usage:
 
 With scheduling:
     python cli.py --venue-id 25973 --date 2026-02-19 --guests 2 --best 19:00 --earliest 18:00 --latest 21:00 --run-at "2026-02-05 09:00:00"
+
+Racing a venue that's on both platforms (books the best slot on either):
+    python cli.py --venue resy=25973 --venue opentable=1234 --date 2026-02-19 --guests 2 --best 19:00 --earliest 18:00 --latest 21:00
 """
 
 import argparse
 import json
 import os
+import logging
 import sys
 import time
-from datetime import datetime, date, timezone
+from datetime import datetime, date, timedelta, timezone
 from pathlib import Path
 
 from api.base import BookingClientError
-from api.client_factory import load_client_from_config
-from api.slot_selection import select_best_slot
+from api.booking_loop import attempt_booking
+from api.client_factory import create_client, load_credentials_from_config
+from api.credentials import CredentialManager
+from api.instrumentation import Instrumentation
+from api.logs import LOG_FORMATS, LOG_LEVELS, OUTCOME, configure_logging, flush_logging, get_logger, job_logger
+from api.notifications import BOOKED, FAILED, OPENING, Notifier, notify_booking, open_transport
+from api.race import race_booking
+from api.retry_policy import RetryPolicy, policy_for
+from api.time_preferences import TimePreferenceSpec, compile_preferences
+from api.tracing import Tracer, new_trace_id, open_exporter
+
 
+logger = get_logger("cli")
 
 # Default config path is in project root (parent of src/)
 DEFAULT_CONFIG_PATH = Path(__file__).parent.parent / "config.json"
+# Local job queue for --enqueue/--worker, next to config.json
+DEFAULT_QUEUE_URL = f"sqlite:///{Path(__file__).resolve().parent.parent / 'jobs.db'}"
 
 
-def parse_time_to_seconds(time_str: str) -> float:
-    """Convert time string (e.g., '19:00' or '7:30') to hours as float."""
-    parts = time_str.replace(" ", "").split(":")
-    hours = int(parts[0])
-    minutes = int(parts[1]) if len(parts) > 1 else 0
-    return hours + minutes / 60
-
-
-def seconds_to_time_str(hours: float) -> str:
-    """Convert hours as float to HH:MM:SS format for API."""
-    h = int(hours)
-    m = int((hours - h) * 60)
-    # Round to nearest 15 minutes
-    m = round(m / 15) * 15
-    if m == 60:
-        h += 1
-        m = 0
-    return f"{h:02d}:{m:02d}:00"
-
-
-def generate_preferred_times(best: str, earliest: str, latest: str) -> list[str]:
-    """
-    Generate a priority-ordered list of times starting from best time,
-    alternating outward until reaching earliest/latest boundaries.
-
-    E.g., best=19:00, earliest=18:00, latest=20:00 produces:
-    [19:00, 19:15, 18:45, 19:30, 18:30, 19:45, 18:15, 20:00, 18:00]
-    """
-    best_h = parse_time_to_seconds(best)
-    earliest_h = parse_time_to_seconds(earliest)
-    latest_h = parse_time_to_seconds(latest)
-
-    preferred = [seconds_to_time_str(best_h)]
-
-    offset = 0.25  # 15 minutes
-    while True:
-        upper = best_h + offset
-        lower = best_h - offset
-
-        added = False
-        if upper <= latest_h:
-            preferred.append(seconds_to_time_str(upper))
-            added = True
-        if lower >= earliest_h:
-            preferred.append(seconds_to_time_str(lower))
-            added = True
-
-        if not added:
-            break
-
-        offset += 0.25
-
-    return preferred
+def parse_run_at(run_at_str: str) -> datetime:
+    """Parse a local 'YYYY-MM-DD HH:MM:SS[.fff]' time."""
+    fmt = "%Y-%m-%d %H:%M:%S.%f" if "." in run_at_str else "%Y-%m-%d %H:%M:%S"
+    return datetime.strptime(run_at_str, fmt)
 
 
 def wait_until(run_at_str: str) -> None:
     """Wait until the specified time before executing."""
     try:
-        run_at = datetime.strptime(run_at_str, "%Y-%m-%d %H:%M:%S")
+        run_at = parse_run_at(run_at_str)
     except ValueError:
         print(f"Error: Invalid --run-at format '{run_at_str}'. Use 'YYYY-MM-DD HH:MM:SS'.")
         sys.exit(1)
@@ -135,23 +102,17 @@ def validate_date(date_str: str) -> str:
     return date_str
 
 
-def validate_times(best: str, earliest: str, latest: str) -> None:
+def validate_times(best: str, earliest: str, latest: str, tolerance: TimePreferenceSpec = None) -> None:
     """Validate time inputs."""
-    best_h = parse_time_to_seconds(best)
-    earliest_h = parse_time_to_seconds(earliest)
-    latest_h = parse_time_to_seconds(latest)
-
-    if earliest_h > best_h:
-        print(f"Error: Earliest time ({earliest}) is after best time ({best}).")
-        sys.exit(1)
-
-    if best_h > latest_h:
-        print(f"Error: Best time ({best}) is after latest time ({latest}).")
+    try:
+        compile_preferences(best, earliest, latest, tolerance)
+    except ValueError as e:
+        print(f"Error: {e}")
         sys.exit(1)
 
 
 def run_booking(
-    venue_id: str,
+    venue_id: str | None,
     res_date: str,
     party_size: int,
     best: str,
@@ -163,95 +124,455 @@ def run_booking(
     retry_delay: float = 0.5,
     config_path: str | None = None,
     dry_run: bool = False,
+    credential_manager: CredentialManager | None = None,
+    instrumentation: Instrumentation | None = None,
+    retry_policy: RetryPolicy | None = None,
+    tolerance: TimePreferenceSpec = None,
+    venues: dict[str, str] | None = None,
+    notifier: Notifier | None = None,
 ) -> bool:
     """
     Execute a booking attempt with retries.
 
+    Failures are handled by retry_policy, by default the platform's policy
+    with any overrides from the config file's "retry_policy" section.
+
+    If a credential_manager is given (e.g. one already refreshing ahead of
+    --run-at) its credentials are used; otherwise they're loaded from config.
+    If instrumentation is given, per-phase timings and the fire/confirmed
+    marks are recorded into it. tolerance shapes how times away from best
+    rank (see api.time_preferences).
+
+    With venues (platform -> venue ID) for more than one platform, every
+    platform is searched at once and the best slot on any of them is booked
+    (see api.race); venue_id and platform are ignored.
+
+    The outcome is queued on the notifier, if there is one, once the
+    attempt is over.
+
     Returns True if successful, False otherwise.
     """
     validate_date(res_date)
-    validate_times(best, earliest, latest)
-
-    preferred_times = generate_preferred_times(best, earliest, latest)
-
-    print(f"Booking attempt:")
-    print(f"  Platform:    {platform}")
-    print(f"  Venue ID:    {venue_id}")
-    print(f"  Date:        {res_date}")
-    print(f"  Party size:  {party_size}")
-    print(f"  Time range:  {earliest} - {latest} (ideal: {best})")
-    print(f"  Preferences: {len(preferred_times)} time slots")
+    validate_times(best, earliest, latest, tolerance)
+
+    preferences = compile_preferences(best, earliest, latest, tolerance)
+    venues = venues or {platform: venue_id}
+    platforms = list(venues)
+
+    lines = ["Booking attempt:"]
+    if len(venues) > 1:
+        lines += [f"  {venue_platform + ':':<12} {venue}" for venue_platform, venue in venues.items()]
+    else:
+        lines += [f"  Platform:    {platform}", f"  Venue ID:    {venue_id}"]
+    lines += [
+        f"  Date:        {res_date}",
+        f"  Party size:  {party_size}",
+        f"  Time range:  {earliest} - {latest} (ideal: {best})",
+        f"  Preferences: {len(preferences)} minutes, best first: {', '.join(t[:5] for t in preferences.times()[:5])}",
+    ]
     if table_types:
-        print(f"  Table types: {', '.join(table_types)}")
-    print()
+        lines.append(f"  Table types: {', '.join(table_types)}")
+    logger.info("\n".join(lines) + "\n")
 
     config_file = config_path or str(DEFAULT_CONFIG_PATH)
+    clients = {}
+    policies = {}
     try:
-        client = load_client_from_config(platform, config_file)
-    except BookingClientError as e:
-        print(f"Error: {e}")
+        manager = credential_manager or load_credential_manager(platforms, config_file)
+        for venue_platform in platforms:
+            # Expiry check only — no network round trip on the booking path
+            credentials = manager.ensure_fresh(venue_platform, validate=False)
+            clients[venue_platform] = create_client(venue_platform, credentials)
+            manager.attach(clients[venue_platform])
+            if retry_policy and len(platforms) == 1:
+                policies[venue_platform] = retry_policy
+            else:
+                policies[venue_platform] = load_retry_policy(venue_platform, config_file)
+    except (BookingClientError, ValueError) as e:
+        logger.log(OUTCOME, f"Error: {e}")
         return False
 
-    for attempt in range(1, retry_count + 1):
+    instrumentation = instrumentation or Instrumentation("+".join(platforms))
+    for client in clients.values():
+        client.instrument(instrumentation)
+    instrumentation.mark("fire")
+
+    def refresh_credentials(refresh_platform: str) -> bool:
         try:
-            print(f"Attempt {attempt}/{retry_count}...")
+            manager.refresh(refresh_platform)
+        except BookingClientError as refresh_error:
+            logger.warning(f"  Could not refresh credentials: {refresh_error}")
+            return False
+        logger.info("  Credentials refreshed, retrying immediately.")
+        return True
+
+    if len(platforms) > 1:
+        outcome = race_booking(
+            clients,
+            venues,
+            res_date,
+            party_size,
+            preferences,
+            table_types=table_types,
+            retry_count=retry_count,
+            retry_delay=retry_delay,
+            dry_run=dry_run,
+            instrumentation=instrumentation,
+            policies=policies,
+            refresh=refresh_credentials,
+            log=logger.info,
+        )
+    else:
+        outcome = attempt_booking(
+            clients[platform],
+            venue_id,
+            res_date,
+            party_size,
+            preferences,
+            table_types=table_types,
+            retry_count=retry_count,
+            retry_delay=retry_delay,
+            dry_run=dry_run,
+            instrumentation=instrumentation,
+            policy=policies[platform],
+            refresh=lambda: refresh_credentials(platform),
+            log=logger.info,
+        )
+    notify_booking(notifier, outcome, venues, res_date, party_size)
+
+    if outcome.dry_run:
+        lines = ["", "=" * 50, "DRY RUN - Would book this slot (no reservation made)"]
+        if len(platforms) > 1:
+            lines.append(f"  Platform:   {outcome.slot.platform}")
+        lines += [f"  Time:       {outcome.slot.time}", f"  Table type: {outcome.slot.table_type}", "=" * 50]
+        logger.log(OUTCOME, "\n".join(lines), extra={"dry_run": True, "time": outcome.slot.time})
+        return True
+
+    if outcome.success:
+        result = outcome.confirmation
+        lines = ["", "=" * 50, "SUCCESS! Reservation confirmed."]
+        if len(platforms) > 1:
+            lines.append(f"  Platform: {outcome.slot.platform}")
+        lines.append(f"  Confirmation: {result.confirmation_id[:40]}...")
+        if result.reservation_id:
+            lines.append(f"  Reservation ID: {result.reservation_id}")
+        lines += [f"  Fire to confirmation: {instrumentation.fire_to_confirmation_ms:.0f} ms", "=" * 50]
+        logger.log(OUTCOME, "\n".join(lines), extra={
+            "success": True, "platform": outcome.slot.platform, "time": outcome.slot.time,
+            "confirmation_id": result.confirmation_id, "attempts": outcome.attempts,
+            "fire_to_confirmation_ms": instrumentation.fire_to_confirmation_ms,
+        })
+        return True
+
+    if outcome.outcome_unknown:
+        message = (f"\nThe {outcome.slot.platform} booking of {outcome.slot.time[:5]} may have gone through "
+                   "(no response); check the account before booking again.")
+    else:
+        message = "\nFailed to book reservation after all attempts."
+    logger.log(OUTCOME, message, extra={
+        "success": False, "attempts": outcome.attempts, "error": outcome.error,
+        "error_category": outcome.error_category, "outcome_unknown": outcome.outcome_unknown,
+    })
+    return False
 
-            # Find available slots
-            slots = client.find_slots(venue_id, res_date, party_size)
 
-            if not slots:
-                print("  No slots available.")
-                if attempt < retry_count:
-                    time.sleep(retry_delay)
-                continue
+def load_credential_manager(platforms: str | list[str], config_path: str) -> CredentialManager:
+    """Create a CredentialManager tracking the platforms' credentials from config."""
+    manager = CredentialManager()
+    for platform in [platforms] if isinstance(platforms, str) else platforms:
+        manager.register(platform, load_credentials_from_config(platform, config_path))
+    return manager
 
-            print(f"  Found {len(slots)} available slots")
 
-            selected_slot = select_best_slot(slots, preferred_times, table_types)
+def run_watch(
+    targets_path: str,
+    config_path: str,
+    requests_per_minute: float = 60.0,
+    duration: float | None = None,
+    archive_dir: str | None = None,
+    notifier: Notifier | None = None,
+) -> None:
+    """
+    Watch the targets in a JSON file for openings until interrupted.
 
-            if not selected_slot:
-                print("  No slots match preferred times.")
-                if attempt < retry_count:
-                    time.sleep(retry_delay)
-                continue
+    The file holds a list of targets (or {"targets": [...]}) in the Lambda
+    event shape, each optionally with "book": true to book the first
+    matching opening instead of just reporting it. With archive_dir, every
+    poll result is also stored in the availability archive. Openings (and
+    bookings) are also sent to the notifier, if there is one.
+    """
+    from api.watch import WatchEngine, load_targets
 
-            print(f"  Selected: {selected_slot.time} - {selected_slot.table_type}")
+    with open(targets_path) as f:
+        entries = json.load(f)
+    targets = load_targets(entries["targets"] if isinstance(entries, dict) else entries)
 
-            if dry_run:
-                print()
-                print("=" * 50)
-                print("DRY RUN - Would book this slot (no reservation made)")
-                print(f"  Time:       {selected_slot.time}")
-                print(f"  Table type: {selected_slot.table_type}")
-                print("=" * 50)
-                return True
+    managers = {}
+    clients = {}
+    for platform in sorted({t.platform for t in targets}):
+        managers[platform] = load_credential_manager(platform, config_path)
+        clients[platform] = create_client(platform, managers[platform].ensure_fresh(platform, validate=False))
+        managers[platform].attach(clients[platform])
+
+    archive = open_archive(archive_dir)
+    if archive:
+        from api.archive import ArchivingClient
+        clients = {platform: ArchivingClient(client, archive) for platform, client in clients.items()}
+
+    def refresh(platform: str) -> bool:
+        try:
+            managers[platform].refresh(platform)
+        except BookingClientError as e:
+            print(f"Could not refresh {platform} credentials: {e}")
+            return False
+        return True
+
+    def report(opening) -> None:
+        stamp = datetime.now().strftime("%H:%M:%S")
+        line = f"[{stamp}] {opening.target.name}: {opening.slot.time} {opening.slot.table_type}"
+        if opening.confirmation:
+            line += f" BOOKED ({opening.confirmation.confirmation_id[:40]})"
+        elif opening.outcome_unknown:
+            line += f" booking may have gone through, no longer watched; check the account: {opening.error}"
+        elif opening.error:
+            line += f" booking failed: {opening.error}"
+        logger.log(OUTCOME if opening.confirmation or opening.outcome_unknown else logging.INFO, line)
+        if notifier:
+            target, slot = opening.target, opening.slot
+            if opening.outcome_unknown:
+                notifier.notify(
+                    FAILED,
+                    f"{target.name}: booking {slot.time[:5]} {slot.table_type} on {target.date} for "
+                    f"{target.party_size} may have gone through (no response); check the account",
+                    platform=slot.platform, venue_id=target.venue_id, date=target.date, time=slot.time,
+                    error=opening.error, outcome_unknown=True,
+                )
+                return
+            notifier.notify(
+                BOOKED if opening.confirmation else OPENING,
+                f"{target.name}: {'booked' if opening.confirmation else 'opening at'} {slot.time[:5]} "
+                f"{slot.table_type} on {target.date} for {target.party_size}",
+                platform=slot.platform, venue_id=target.venue_id, date=target.date, time=slot.time,
+            )
+
+    engine = WatchEngine(clients, requests_per_minute, on_opening=report, refresh=refresh)
+    for target in targets:
+        engine.add(target)
+
+    print(f"Watching {len(targets)} targets within {requests_per_minute:g} requests/minute. Ctrl-C to stop.")
+    try:
+        stats = engine.run(duration)
+    except KeyboardInterrupt:
+        stats = engine.stats
+    flush_logging()
+    print()
+    print(f"Polls: {stats.polls}  Errors: {stats.errors}  Openings: {stats.openings}  Bookings: {stats.bookings}")
+    if archive:
+        archive.close()
+        print(f"Archived to {archive.directory}")
 
-            result = client.book_slot(selected_slot, res_date, party_size)
 
-            print()
-            print("=" * 50)
-            print("SUCCESS! Reservation confirmed.")
-            print(f"  Confirmation: {result.confirmation_id[:40]}...")
-            if result.reservation_id:
-                print(f"  Reservation ID: {result.reservation_id}")
-            print("=" * 50)
+def run_monitor(
+    venue_id: str,
+    res_date: str,
+    party_size: int,
+    release_at: str,
+    platform: str,
+    config_path: str,
+    before: float,
+    after: float,
+    interval: float,
+    archive_dir: str | None = None,
+) -> None:
+    """Watch a venue around its release, store the observation and print the updated recommendation."""
+    from api.release_monitor import load_recommendation, monitor_release, record_observation
 
-            return True
+    validate_date(res_date)
+    try:
+        expected = parse_run_at(release_at).timestamp()
+    except ValueError:
+        print(f"Error: Invalid --monitor-release format '{release_at}'. Use 'YYYY-MM-DD HH:MM:SS'.")
+        sys.exit(1)
 
-        except BookingClientError as e:
-            print(f"  Error: {e}")
-            if attempt < retry_count:
-                time.sleep(retry_delay)
+    manager = load_credential_manager(platform, config_path)
+    client = create_client(platform, manager.ensure_fresh(platform, validate=False))
+    manager.attach(client)
+    archive = open_archive(archive_dir)
+    if archive:
+        from api.archive import ArchivingClient
+        client = ArchivingClient(client, archive)
+
+    print(f"Monitoring {platform} venue {venue_id} for {res_date} ({party_size} guests)")
+    print(f"  Release expected at {release_at}, polling every {interval:g}s from -{before:g}s to +{after:g}s")
+    observation = monitor_release(client, venue_id, res_date, party_size, expected, before, after, interval)
+    path = record_observation(observation)
+    if archive:
+        archive.close()
 
     print()
-    print("Failed to book reservation after all attempts.")
-    return False
+    if observation.first_seen_offset is None:
+        print(f"No slots appeared ({observation.polls} polls, {observation.errors} errors).")
+    else:
+        print(f"First slots at {observation.first_seen_offset:+.2f}s; {len(observation.slot_lifetimes)} slot times seen.")
+    print(f"Saved to {path}")
+
+    recommendation = load_recommendation(platform, venue_id)
+    if recommendation:
+        print_recommendation(recommendation)
+
+
+def enqueue_jobs(jobs_path: str, queue_url: str) -> None:
+    """Send the booking jobs in a JSON file (a list of Lambda events, or {"bookings": [...]}) to a queue."""
+    from api.job_queue import open_queue
+
+    with open(jobs_path) as f:
+        entries = json.load(f)
+    jobs = entries["bookings"] if isinstance(entries, dict) else entries
+    queue = open_queue(queue_url)
+    try:
+        for job in jobs:
+            message_id = queue.send(job)
+            print(f"  {message_id}  {job.get('platform', 'resy')}:{job.get('venue_id')} {job.get('date')}")
+    finally:
+        queue.close()
+    print(f"Enqueued {len(jobs)} jobs on {queue_url}")
+
+
+def run_worker(
+    queue_url: str,
+    config_path: str,
+    workers: int,
+    max_receives: int,
+    duration: float | None = None,
+    drain: bool = False,
+    notifier: Notifier | None = None,
+) -> None:
+    """
+    Book jobs from a queue with a pool of workers until interrupted.
+
+    Jobs are Lambda booking events. All workers share one set of clients and
+    credentials from config, and identical concurrent searches are coalesced.
+    """
+    from api.job_queue import open_queue
+    from api.jobs import BookingResources, run_booking_job
+    from api.worker_pool import WorkerPool
+
+    queue = open_queue(queue_url, max_receives)
+    resources = BookingResources(
+        lambda platform: load_credentials_from_config(platform, config_path),
+        pool_size=workers,
+        coalesce=True,
+    )
+
+    def run_job(job: dict) -> dict:
+        label = job.get("id") or f"{job.get('platform', 'resy')}:{job.get('venue_id')}:{job.get('date')}"
+        job_log = job_logger(logger, label)
+        return run_booking_job(job, resources, log=job_log.info, notifier=notifier, outcome=job_log.outcome)
+
+    pool = WorkerPool(queue, run_job, workers=workers, log=logger.info)
+    print(f"Working {queue_url} with {workers} workers. Ctrl-C to stop.")
+    try:
+        metrics = pool.run(duration, drain=drain, report_every=60.0)
+    except KeyboardInterrupt:
+        pool.stop()
+        metrics = pool.metrics
+    finally:
+        queue.close()
+    flush_logging()
+    print()
+    print(f"Worker metrics: {json.dumps(metrics.to_dict())}")
+
+
+def open_archive(archive_dir: str | None):
+    """The availability archive for --archive ("" means the default directory), or None without it."""
+    if archive_dir is None:
+        return None
+    from api.archive import AvailabilityArchive
+    return AvailabilityArchive(archive_dir or None)
+
+
+def print_openings(venue_id: str, slot_time: str, platform: str, res_date: str | None, party_size: int | None,
+                   archive_dir: str | None) -> None:
+    """Print when a slot time opened and closed at a venue, from the availability archive."""
+    archive = open_archive(archive_dir or "")
+    windows = archive.openings(platform, venue_id, time=slot_time, date=res_date, party_size=party_size)
+    if not windows:
+        print(f"No {slot_time} openings archived for {platform} venue {venue_id}.")
+        return
+
+    def stamp(ts):
+        return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3] if ts is not None else "-"
+
+    print(f"{slot_time} openings at {platform} venue {venue_id} ({len(windows)}):\n")
+    print(f"  {'date':<10}  {'guests':>6}  {'table type':<16}  {'opened':<23}  {'closed':<23}  lifetime")
+    for w in windows:
+        lifetime = f"{w.lifetime:.1f}s" if w.lifetime is not None else "open"
+        print(f"  {w.date:<10}  {w.party_size:>6}  {w.table_type[:16]:<16}  {stamp(w.opened_at):<23}  "
+              f"{stamp(w.closed_at):<23}  {lifetime}")
+
+
+def print_recommendation(recommendation) -> None:
+    print(f"Release recommendation ({recommendation.samples} observed releases):")
+    print(f"  Fire offset:   {recommendation.fire_offset:+.2f}s")
+    print(f"  Poll interval: {recommendation.poll_interval:g}s x {recommendation.retries} attempts "
+          f"({recommendation.window:.1f}s window)")
+
+
+def open_notifier(target: str | None, config_path: str) -> Notifier | None:
+    """The notifier for --notify, or for the config's optional "notify" target; None without either."""
+    if target is None:
+        try:
+            with open(config_path) as f:
+                target = json.load(f).get("notify")
+        except (OSError, json.JSONDecodeError):
+            target = None
+    return Notifier(open_transport(target)) if target else None
+
+
+def load_retry_policy(platform: str, config_path: str) -> RetryPolicy:
+    """The platform's retry policy with overrides from the config's optional "retry_policy" section."""
+    try:
+        with open(config_path) as f:
+            overrides = json.load(f).get("retry_policy")
+    except (OSError, json.JSONDecodeError):
+        overrides = None
+    return policy_for(platform, overrides)
+
+
+def load_venue_recommendation(platform: str, venue_id: str | None, venues: dict[str, str] | None):
+    """The release recommendation for --venue-id, or for racing --venue across platforms."""
+    from api.release_monitor import load_race_recommendation, load_recommendation
+    if venues:
+        return load_race_recommendation(venues)
+    return load_recommendation(platform, venue_id)
+
+
+def write_timings(instrumentation: Instrumentation, path: str) -> None:
+    """Write recorded timings as JSON lines to a file, or stdout for '-'."""
+    if path == "-":
+        instrumentation.write(sys.stdout)
+        return
+    with open(path, "a") as f:
+        instrumentation.write(f)
+
+
+def parse_venues(values: list[str] | None, parser) -> dict[str, str] | None:
+    """Platform -> venue ID from repeated --venue PLATFORM=ID arguments."""
+    if not values:
+        return None
+    venues = {}
+    for value in values:
+        platform, sep, venue_id = value.partition("=")
+        if not sep or not venue_id or platform not in ("resy", "opentable"):
+            parser.error(f"invalid --venue '{value}': use resy=ID or opentable=ID")
+        venues[platform] = venue_id
+    return venues
 
 
 def require_booking_args(args, parser):
     """Validate that all booking-related arguments are present."""
     required = {
-        "--venue-id": args.venue_id,
+        "--venue-id or --venue": args.venue_id or args.venues,
         "--date": args.date,
         "--guests": args.guests,
         "--best": args.best,
@@ -276,6 +597,9 @@ def main():
                         help="Booking platform (default: resy)")
     parser.add_argument("--venue-id", type=str,
                         help="Venue ID (platform-specific)")
+    parser.add_argument("--venue", action="append", dest="venues", metavar="PLATFORM=ID",
+                        help="Venue ID on one platform (e.g. --venue resy=25973 --venue opentable=1234); "
+                             "with more than one, all are searched at once and the best slot on any is booked")
     parser.add_argument("--date",
                         help="Reservation date in YYYY-MM-DD format")
     parser.add_argument("--guests", type=int,
@@ -288,6 +612,9 @@ def main():
                         help="Latest acceptable time (e.g., '21:00')")
     parser.add_argument("--table-type", action="append", dest="table_types",
                         help="Preferred table type (can specify multiple, e.g., --table-type 'Indoor Dining' --table-type 'Patio')")
+    parser.add_argument("--tolerance", metavar="EARLIER:LATER",
+                        help="Relative cost of each minute earlier vs later than --best, e.g. 2:1 to prefer "
+                             "later times (default: 1:1)")
     parser.add_argument("--run-at",
                         help="Schedule booking locally at a specific time (format: 'YYYY-MM-DD HH:MM:SS')")
     parser.add_argument("--retries", type=int, default=3,
@@ -296,6 +623,67 @@ def main():
                         help=f"Path to config.json (default: {DEFAULT_CONFIG_PATH})")
     parser.add_argument("--dry-run", action="store_true",
                         help="Find and select a slot but don't actually book")
+    parser.add_argument("--notify", metavar="TARGET",
+                        help="Send booking outcomes and watch openings to TARGET: '-' (stdout), a file of JSON "
+                             "lines, or an SNS topic ARN (default: the config's \"notify\" entry, if any)")
+    parser.add_argument("--log-level", default="INFO", type=str.upper, choices=LOG_LEVELS,
+                        help="Lowest level of progress output (default: INFO)")
+    parser.add_argument("--log-format", default="text", choices=LOG_FORMATS,
+                        help="Progress output as plain text or JSON lines (default: text)")
+    parser.add_argument("--quiet", action="store_true",
+                        help="Only print how the booking ended")
+    parser.add_argument("--timings", metavar="PATH",
+                        help="Write per-phase request timings as JSON lines to PATH ('-' for stdout)")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="Write the booking's trace spans as JSON lines to PATH ('-' for the log)")
+    parser.add_argument("--profile", nargs="?", const="cprofile", choices=["cprofile", "sample"],
+                        help="Profile the booking attempt (after any --run-at wait): 'cprofile' "
+                             "(deterministic, default) or 'sample' (statistical)")
+    parser.add_argument("--profile-out", default="oddjob-profile", metavar="PREFIX",
+                        help="Profile output prefix: writes PREFIX.txt report and PREFIX.folded "
+                             "flamegraph stacks (plus PREFIX.prof for cprofile) (default: oddjob-profile)")
+
+    # Watch mode
+    parser.add_argument("--watch", metavar="FILE",
+                        help="Watch the targets in a JSON file for openings (no other booking args needed)")
+    parser.add_argument("--watch-budget", type=float, default=60.0, metavar="RPM",
+                        help="Global request budget for --watch, in requests per minute (default: 60)")
+    parser.add_argument("--watch-duration", type=float, metavar="SECONDS",
+                        help="Stop watching after this many seconds (default: until interrupted)")
+
+    # Release monitoring
+    parser.add_argument("--monitor-release", metavar="TIME",
+                        help="Poll around a release (local 'YYYY-MM-DD HH:MM:SS') and record when slots appear; "
+                             "needs --venue-id, --date and --guests")
+    parser.add_argument("--monitor-before", type=float, default=30.0,
+                        help="Seconds before the release to start polling (default: 30)")
+    parser.add_argument("--monitor-after", type=float, default=120.0,
+                        help="Seconds after the release to keep polling (default: 120)")
+    parser.add_argument("--monitor-interval", type=float, default=0.25,
+                        help="Seconds between polls while monitoring (default: 0.25)")
+    parser.add_argument("--archive", nargs="?", const="", metavar="DIR",
+                        help="Store every poll of --watch/--monitor-release in the availability archive "
+                             "(default directory: archive/)")
+    parser.add_argument("--openings", metavar="TIME",
+                        help="Show when slots at TIME (HH:MM) opened and closed at --venue-id, from the archive; "
+                             "--date and --guests narrow it down")
+    parser.add_argument("--no-auto-offset", action="store_true",
+                        help="Fire exactly at --run-at/--schedule even if the venue has release history")
+
+    # Queue worker mode
+    parser.add_argument("--queue", default=DEFAULT_QUEUE_URL, metavar="URL",
+                        help="Job queue for --enqueue/--worker: sqlite:///path.db?queue=NAME or an SQS queue URL "
+                             "(default: jobs.db next to config.json)")
+    parser.add_argument("--enqueue", metavar="FILE",
+                        help="Send the booking jobs (Lambda events) in a JSON file to --queue")
+    parser.add_argument("--worker", action="store_true",
+                        help="Book jobs from --queue with a pool of workers until interrupted")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="Jobs booked at once by --worker (default: 8)")
+    parser.add_argument("--max-receives", type=int, default=3,
+                        help="Attempts at a job before it's dead-lettered (default: 3)")
+    parser.add_argument("--drain", action="store_true",
+                        help="With --worker, exit once the queue is empty")
 
     # Cloud scheduling arguments
     parser.add_argument("--schedule",
@@ -306,6 +694,7 @@ def main():
                         help="Cancel a cloud-scheduled job by name")
 
     args = parser.parse_args()
+    configure_logging(args.log_level, args.log_format, quiet=args.quiet)
 
     # Handle cloud scheduling commands (no booking args required)
     if args.list_jobs:
@@ -326,6 +715,8 @@ def main():
                     print(f"    Date:     {p.get('date', '?')}")
                     print(f"    Guests:   {p.get('party_size', '?')}")
                     print(f"    Time:     {p.get('earliest', '?')}-{p.get('latest', '?')} (best: {p.get('best', '?')})")
+                    if p.get("trace_id"):
+                        print(f"    Trace:    {p['trace_id']}")
                 print()
         sys.exit(0)
 
@@ -339,8 +730,63 @@ def main():
             sys.exit(1)
         sys.exit(0)
 
+    if args.enqueue or args.worker:
+        notifier = open_notifier(args.notify, args.config) if args.worker else None
+        try:
+            if args.enqueue:
+                enqueue_jobs(args.enqueue, args.queue)
+            if args.worker:
+                run_worker(args.queue, args.config, args.workers, args.max_receives, drain=args.drain,
+                           notifier=notifier)
+        except (ValueError, KeyError, OSError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        finally:
+            if notifier:
+                notifier.close()
+        sys.exit(0)
+
+    if args.watch:
+        notifier = open_notifier(args.notify, args.config)
+        try:
+            run_watch(args.watch, args.config, args.watch_budget, args.watch_duration, args.archive, notifier)
+        except (BookingClientError, ValueError, KeyError, OSError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        finally:
+            if notifier:
+                notifier.close()
+        sys.exit(0)
+
+    if args.monitor_release:
+        missing = [name for name, val in (("--venue-id", args.venue_id), ("--date", args.date),
+                                          ("--guests", args.guests)) if val is None]
+        if missing:
+            parser.error(f"--monitor-release requires: {', '.join(missing)}")
+        try:
+            run_monitor(args.venue_id, args.date, args.guests, args.monitor_release, args.platform, args.config,
+                        args.monitor_before, args.monitor_after, args.monitor_interval, args.archive)
+        except (BookingClientError, OSError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        sys.exit(0)
+
+    if args.openings:
+        if not args.venue_id:
+            parser.error("--openings requires --venue-id")
+        try:
+            print_openings(args.venue_id, args.openings, args.platform, args.date, args.guests, args.archive)
+        except (ValueError, OSError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        sys.exit(0)
+
     # For booking and scheduling, all booking args are required
     require_booking_args(args, parser)
+    venues = parse_venues(args.venues, parser)
+    if venues and len(venues) == 1:
+        # A single --venue is just --platform/--venue-id
+        (args.platform, args.venue_id), venues = next(iter(venues.items())), None
 
     if args.schedule:
         from scheduler import schedule_booking
@@ -359,6 +805,7 @@ def main():
             print(f"Error: --schedule time '{args.schedule}' is in the past.")
             sys.exit(1)
 
+        trace_id = new_trace_id()
         schedule_name = schedule_booking(
             venue_id=args.venue_id,
             date=args.date,
@@ -370,37 +817,111 @@ def main():
             table_types=args.table_types,
             retries=args.retries,
             platform=args.platform,
+            auto_offset=not args.no_auto_offset,
+            tolerance=args.tolerance,
+            venues=venues,
+            trace_id=trace_id,
         )
 
         print(f"Cloud job scheduled!")
         print(f"  Name:      {schedule_name}")
-        print(f"  Platform:  {args.platform}")
         print(f"  Fires at:  {args.schedule} local ({run_at_utc} UTC)")
-        print(f"  Venue:     {args.venue_id}")
+        if venues:
+            for platform, venue_id in venues.items():
+                print(f"  {platform + ':':<10} {venue_id}")
+        else:
+            print(f"  Platform:  {args.platform}")
+            print(f"  Venue:     {args.venue_id}")
         print(f"  Date:      {args.date}")
         print(f"  Guests:    {args.guests}")
         print(f"  Time:      {args.earliest}-{args.latest} (best: {args.best})")
+        print(f"  Trace:     {trace_id}")
+        if not args.no_auto_offset:
+            recommendation = load_venue_recommendation(args.platform, args.venue_id, venues)
+            if recommendation:
+                print_recommendation(recommendation)
         print()
         print("The schedule will auto-delete after firing.")
         print("To cancel: python cli.py --cancel-job " + schedule_name)
         sys.exit(0)
 
+    platforms = list(venues) if venues else [args.platform]
+    tracer = Tracer(exporter=open_exporter(args.trace)) if args.trace else None
+    instrumentation = Instrumentation("+".join(platforms), tracer=tracer)
+
+    credential_manager = None
+    retry_count = args.retries
+    retry_delay = 0.5
     if args.run_at:
-        wait_until(args.run_at)
-
-    success = run_booking(
-        venue_id=args.venue_id,
-        res_date=args.date,
-        party_size=args.guests,
-        best=args.best,
-        earliest=args.earliest,
-        latest=args.latest,
-        platform=args.platform,
-        table_types=args.table_types,
-        retry_count=args.retries,
-        config_path=args.config,
-        dry_run=args.dry_run,
-    )
+        run_at = args.run_at
+        if not args.no_auto_offset:
+            recommendation = load_venue_recommendation(args.platform, args.venue_id, venues)
+            if recommendation:
+                try:
+                    fire_at = parse_run_at(args.run_at) + timedelta(seconds=recommendation.fire_offset)
+                except ValueError:
+                    fire_at = None  # wait_until reports the bad format
+                if fire_at:
+                    run_at = fire_at.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+                    retry_count = max(retry_count, recommendation.retries)
+                    retry_delay = recommendation.poll_interval
+                    print_recommendation(recommendation)
+
+        # Validate (and refresh) credentials in the background while waiting, not at the release instant
+        try:
+            credential_manager = load_credential_manager(platforms, args.config)
+            for platform in platforms:
+                credential_manager.prepare_for_fire(platform, parse_run_at(run_at).timestamp())
+        except (BookingClientError, ValueError, OSError) as e:
+            print(f"Warning: could not start credential checks: {e}")
+            credential_manager = None
+        wait_until(run_at)
+
+    notifier = open_notifier(args.notify, args.config)
+
+    # Started after wait_until so only the attempt itself is profiled
+    profiler = None
+    if args.profile:
+        from api.profiling import create_profiler
+        profiler = create_profiler(args.profile)
+        profiler.start()
+
+    with instrumentation.span("run", platforms=platforms, date=args.date, party_size=args.guests) as span:
+        success = run_booking(
+            venue_id=args.venue_id,
+            res_date=args.date,
+            party_size=args.guests,
+            best=args.best,
+            earliest=args.earliest,
+            latest=args.latest,
+            platform=args.platform,
+            table_types=args.table_types,
+            retry_count=retry_count,
+            retry_delay=retry_delay,
+            config_path=args.config,
+            dry_run=args.dry_run,
+            credential_manager=credential_manager,
+            instrumentation=instrumentation,
+            tolerance=args.tolerance,
+            venues=venues,
+            notifier=notifier,
+        )
+        if span:
+            span.attributes["success"] = success
+    flush_logging()
+
+    if profiler:
+        profiler.stop()
+        paths = profiler.write(args.profile_out)
+        print(f"Profile ({profiler.mode}, {profiler.duration_ms:.0f} ms): {', '.join(paths.values())}")
+
+    if notifier:
+        notifier.close()
+
+    if args.timings:
+        write_timings(instrumentation, args.timings)
+    if tracer:
+        tracer.flush()
 
     sys.exit(0 if success else 1)
 
@@ -1,42 +1,24 @@
-from bs4 import BeautifulSoup
-import pandas as pd, requests, io, re, csv, datetime, sys, json, html
-
-import time 
-from datetime import date
- 
-import pandas as pd 
-from selenium import webdriver 
-from selenium.webdriver import Chrome 
-from selenium.webdriver.chrome.service import Service 
-from selenium.webdriver.common.by import By 
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.webdriver import Chrome
+from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-import json, sys, math
-
-import ResyTimeFunctions as rtf
+import BrowserPool as bp
 
 ## Group of functions to take in a string of a restuarant name, lookup restaurant and navigate to restaurant reservation page, and then save the String name and the url code in a file.
 
-def venuePageLookup(name) :
-
-	with open('config.json') as f:
-   		auth = json.load(f)
-
-	## Options for webdriver ##
-
-	options = webdriver.ChromeOptions()
-	options.add_argument('--disable-blink-features=AutomationControlled')
+def venuePageLookup(name, fast=True) :
 
-	chrome_path = ChromeDriverManager().install()
-	chrome_service = Service(chrome_path)
+	## Options for webdriver. Fast mode runs headless with images, fonts and analytics blocked ##
 
-	driver = Chrome(options=options, service=chrome_service)
+	driver = Chrome(options=bp.buildOptions(fast=fast))
+	if fast :
+		bp.blockResources(driver)
 
 	driver.get("https://resy.com/cities/new-york-ny/search?query={0}".format(name))
 
-	results = WebDriverWait(driver, 30).until(EC.element_to_be_clickable((By.CLASS_NAME, "SearchResultsContainer")))
+	results = WebDriverWait(driver, 30, poll_frequency=.05).until(EC.element_to_be_clickable((By.CLASS_NAME, "SearchResultsContainer")))
+	bp.reportPageMetrics(driver, "Search page")
 
 	## CASE: No Results
 	try :
@@ -1,9 +1,12 @@
 import argparse
 import sys
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from booking import run_booking
+import BrowserPool as bp
+import ResyDaemon as rd
+from api.logs import configure_logging, flush_logging
 
 
 def parse_args():
@@ -27,16 +30,31 @@ def parse_args():
                         help="Resy city slug (default: 'new-york-ny')")
     parser.add_argument("--run-at",
                         help="Schedule booking at a specific time (format: 'YYYY-MM-DD HH:MM:SS')")
+    parser.add_argument("--headless", action="store_true",
+                        help="Run the pooled browsers without a visible window")
+    parser.add_argument("--fast", action="store_true",
+                        help="Fast-browser mode: headless, with images, fonts, media and analytics blocked")
+    parser.add_argument("--pool-size", type=int, default=1,
+                        help="Number of pre-launched browser sessions (default: 1)")
+    parser.add_argument("--profile-dir",
+                        help="Directory for persistent, logged-in browser profiles (enables skipping login at booking time)")
+    parser.add_argument("--session-lead", type=int, default=120,
+                        help="Seconds before --run-at to refresh the logged-in session (default: 120)")
+    parser.add_argument("--quiet", action="store_true",
+                        help="Only print how the booking ended")
 
     args = parser.parse_args()
 
     if args.guests < 1:
         parser.error("Guest count must be at least 1.")
 
+    if args.pool_size < 1:
+        parser.error("Pool size must be at least 1.")
+
     return args
 
 
-def wait_until(run_at_str):
+def wait_until(run_at_str, done_message="Executing booking now."):
     try:
         run_at = datetime.strptime(run_at_str, "%Y-%m-%d %H:%M:%S")
     except ValueError:
@@ -68,24 +86,47 @@ def wait_until(run_at_str):
             time.sleep(remaining)
             break
 
-    print("Executing booking now.                ")
+    print(f"{done_message:<38}")
 
 
 def main():
     args = parse_args()
+    configure_logging(quiet=args.quiet)
 
-    if args.run_at:
-        wait_until(args.run_at)
-
-    run_booking(
-        restaurant=args.restaurant,
-        res_date=args.date,
-        guests=args.guests,
-        best=args.best,
-        earliest=args.earliest,
-        latest=args.latest,
-        city=args.city,
-    )
+    # Launch browsers before waiting so startup cost is paid ahead of the release
+    pool = bp.getDefaultPool(size=args.pool_size, headless=args.headless, profile_dir=args.profile_dir, fast=args.fast)
+    try:
+        pool.prelaunch()
+
+        if args.profile_dir:
+            rd.refreshSessions(pool)
+
+        if args.run_at:
+            # Re-check the login shortly before firing so a session that lapsed while waiting is renewed off the hot path
+            if args.profile_dir:
+                try:
+                    refresh_at = datetime.strptime(args.run_at, "%Y-%m-%d %H:%M:%S") - timedelta(seconds=args.session_lead)
+                except ValueError:
+                    refresh_at = None
+                if refresh_at and refresh_at > datetime.now():
+                    wait_until(refresh_at.strftime("%Y-%m-%d %H:%M:%S"), "Refreshing browser sessions.")
+                    rd.refreshSessions(pool)
+            wait_until(args.run_at)
+
+        run_booking(
+            restaurant=args.restaurant,
+            res_date=args.date,
+            guests=args.guests,
+            best=args.best,
+            earliest=args.earliest,
+            latest=args.latest,
+            city=args.city,
+            pool=pool,
+        )
+    finally:
+        # Never leave pre-launched Chrome processes behind, whatever went wrong
+        pool.close()
+        flush_logging()
 
 
 main()
@@ -14,26 +14,160 @@ Expected event format:
     "earliest": "18:00",
     "latest": "21:00",
     "table_types": ["Indoor Dining"],  // optional
-    "retries": 5  // optional, default 3
+    "tolerance": {"earlier": 2, "later": 1},  // optional, see api/time_preferences.py
+    "retries": 5,  // optional, default 3
+    "retry_delay": 0.25,  // optional, seconds between empty searches (default 0)
+    "fire_at": "2026-02-05T14:00:00.850",  // optional, UTC; wait until this instant before firing
+    "metrics_format": "emf",  // optional: "json" (default) or "emf"
+    "profile": "sample",  // optional: "cprofile" or "sample" (true means "cprofile")
+    "retry_policy": {"max_delay": 5},  // optional: overrides, see api/retry_policy.py
+    "trace_id": "9f1c...",  // optional, set by scheduler.py; the booking's spans are traced under it
+    "trigger_at": "2026-02-05T13:59:57",  // optional, UTC, set by scheduler.py: when the schedule fired
+    "max_duration": 120,  // optional, seconds; stop sooner than the invocation's timeout
+    "keep_polling": true,  // optional: keep searching past "retries" until out of time (default true)
+    "poll_interval": 0.5,  // optional: least seconds between searches past "retries"
+    "booking_reserve": 2.0  // optional: least seconds kept back to finish a booking
 }
+
+The attempt loop is driven by the invocation's remaining time
+(context.get_remaining_time_in_millis(), less TIME_RESERVE for reporting):
+it keeps polling past "retries" while there's time for a search and a
+booking after it, never starts a booking it couldn't finish, and times
+requests out before the invocation would be killed. Every response says
+how many attempts were made, how long they took and how much time was
+left; a booking stopped by the deadline is a 504 with "out_of_time". A
+booking request that timed out or lost its response after it was sent may
+have gone through: that's a 502 with "outcome_unknown", never retried (nor
+redelivered from SQS), so check the account for it.
+
+A venue that takes reservations on both platforms can be raced across them
+by giving "venues" in place of "platform" and "venue_id":
+"venues": {"resy": "25973", "opentable": "1234"}. Both are searched at once
+and the best slot on either is booked (see api/race.py); the response's
+"platform" says which.
+
+Per-phase request timings are logged as JSON lines (or CloudWatch embedded
+metric format documents) and included in the response body under "timings".
+
+With "profile" set, the booking attempt runs under the profiler; the report
+is logged and the flamegraph-compatible folded stacks are returned in the
+response body under "profile" (files in /tmp don't outlive the invocation).
+
+Batch events book many reservations in one invocation, concurrently, with
+shared secrets and connection pools (see api/jobs.py and handle_batch):
+[{...}, {...}], {"bookings": [{...}, ...], "max_workers": 8, "coalesce": true},
+or an SQS event whose message bodies are booking events. The response lists
+each booking's result, plus batchItemFailures for SQS.
+
+Each booking's outcome (booked, failed, or a deduplicated "no slots") is
+sent as a notification once the attempt is over, to the SNS topic in
+ODDJOB_NOTIFY, or to the log without one (see api/notifications.py).
+
+Each booking is traced (see api/tracing.py): the fire delay, cold-start
+init, warm-up, every search, request, selection and booking, and the
+retry waits, as spans under the event's trace_id (a new one without it).
+Spans go to ODDJOB_TRACE: "-" for the log (default), a file, or "off".
+The trace ID is returned under "timings".
+
+A big release can be fanned out across parallel invocations of this
+function (see api/fanout.py and handle_fan_out): {"action": "fan_out",
+"booking": {...}, "vary": {"date": [...]}, "shards": 4}. Each worker books
+its share of the candidates as a batch; the first confirmation sets a
+cancellation flag in a shared store (ODDJOB_CANCEL_STORE, e.g.
+dynamodb://TABLE) and the other workers stop. Should several confirm
+anyway, the best booking is kept and the rest are cancelled, with an audit
+record in ODDJOB_AUDIT ("-" for the log, or a file).
+
+Credential check event (scheduled ahead of a booking by scheduler.py):
+{
+    "action": "refresh_credentials",
+    "platform": "resy",
+    "fire_at": "2026-02-05T14:00:00"  // UTC, when the booking will run
+}
+
+The first invocation in a fresh environment logs the module init time as a
+{"metric": "init", ...} line, so cold-start cost can be tracked over deploys.
 """
 
+import time
+
+_INIT_STARTED = time.perf_counter()
+
+import contextlib
 import json
-import boto3
-from botocore.exceptions import ClientError
+import os
+import sys
+import threading
+from typing import TYPE_CHECKING, Callable, Optional
 
-from api.base import BookingClientError
-from api.client_factory import create_client
-from api.slot_selection import select_best_slot
-from cli import generate_preferred_times, validate_times
+from api.credentials import CredentialManager
+from api.instrumentation import Instrumentation
+from api.jobs import (
+    BatchItem,
+    BookingResources,
+    batch_options,
+    is_batch,
+    is_sqs_batch,
+    parse_batch,
+    parse_utc,
+    run_booking_job,
+)
+from api.logs import OUTCOME, configure_logging, flush_logging, get_logger, job_logger
+
+if TYPE_CHECKING:
+    from api.fanout import Invoker
+    from api.notifications import Notifier
+    from api.reconcile import AuditLog
+    from api.tracing import SpanExporter, Tracer
+
+# Progress goes through a queue to a background writer, so a slow log pipe
+# never stalls an attempt; ODDJOB_LOG_LEVEL=OUTCOME logs only how each
+# booking ended (see api/logs.py)
+configure_logging(os.environ.get("ODDJOB_LOG_LEVEL", "INFO"), os.environ.get("ODDJOB_LOG_FORMAT", "text"))
+logger = get_logger("lambda")
+
+# boto3 costs more to import than everything above combined, so it's loaded
+# on first use (see _secrets_client) rather than at module level. So are
+# notifications, tracing, fan-out and reconciliation: they're imported by
+# the functions that use them, once the invocation is under way, to keep
+# the cold start within bench/import_budget.py's budget.
+INIT_MS = (time.perf_counter() - _INIT_STARTED) * 1000
+INIT_AT = time.time() - INIT_MS / 1000
+_cold_start = True
+_output_lock = threading.Lock()
+
+# Concurrent bookings per batch invocation, unless the event sets max_workers
+DEFAULT_BATCH_WORKERS = 8
+# Seconds of the invocation kept back so a booking (or batch) can report,
+# flush notifications and export its trace before it times out
+TIME_RESERVE = 3.0
+# Further seconds a fan-out's coordinator keeps back for its workers'
+# invocations to return their results and surplus bookings to be cancelled
+FANOUT_RESERVE = 3.0
+_secrets_manager = None
+# Seconds a handler waits for queued notifications before returning (the
+# environment is frozen once it returns, background thread and all)
+NOTIFY_FLUSH_TIMEOUT = 2.0
+_notifier = None
+_span_exporter: Optional["SpanExporter"] = None
+_audit_log: Optional["AuditLog"] = None
+
+
+def _secrets_client():
+    """Secrets Manager client, created on first use and reused across warm invocations."""
+    global _secrets_manager
+    if _secrets_manager is None:
+        import boto3
+        _secrets_manager = boto3.client("secretsmanager", region_name="us-east-1")
+    return _secrets_manager
 
 
 def get_secrets(platform: str = "resy"):
     """Retrieve booking credentials from AWS Secrets Manager."""
-    secret_name = f"oddjob/{platform}-credentials"
-    region_name = "us-east-1"
+    from botocore.exceptions import ClientError
 
-    client = boto3.client("secretsmanager", region_name=region_name)
+    secret_name = f"oddjob/{platform}-credentials"
+    client = _secrets_client()
 
     try:
         response = client.get_secret_value(SecretId=secret_name)
@@ -42,104 +176,458 @@ def get_secrets(platform: str = "resy"):
         raise Exception(f"Failed to retrieve secrets for {platform}: {e}")
 
 
-def lambda_handler(event, context):
+def put_secrets(platform: str, credentials: dict) -> None:
+    """Persist refreshed credentials back to AWS Secrets Manager."""
+    client = _secrets_client()
+    client.put_secret_value(
+        SecretId=f"oddjob/{platform}-credentials",
+        SecretString=json.dumps(credentials),
+    )
+
+
+def get_notifier() -> "Notifier":
     """
-    Main Lambda entry point.
+    The booking notifier, created on first use and kept across warm invocations.
 
-    Returns:
-        dict with statusCode and body
+    Delivers to ODDJOB_NOTIFY (an SNS topic ARN), or to the log without it.
+    Keeping it warm means repeated "no slots" notifications are deduplicated
+    across invocations as well as within one.
     """
-    print(f"Received event: {json.dumps(event)}")
+    global _notifier
+    if _notifier is None:
+        from api.notifications import Notifier, open_transport
+        _notifier = Notifier(open_transport(os.environ.get("ODDJOB_NOTIFY", "-")))
+    return _notifier
+
+
+def get_span_exporter() -> Optional["SpanExporter"]:
+    """Where booking traces go, from ODDJOB_TRACE (the log by default; None when tracing is off)."""
+    global _span_exporter
+    if _span_exporter is None:
+        from api.tracing import open_exporter
+        _span_exporter = open_exporter(os.environ.get("ODDJOB_TRACE", "-"))
+    return _span_exporter
+
 
-    # Parse event
+def get_audit_log() -> "AuditLog":
+    """Where reconciliations of surplus bookings are recorded, from ODDJOB_AUDIT (the log by default)."""
+    global _audit_log
+    if _audit_log is None:
+        from api.reconcile import open_audit_log
+        _audit_log = open_audit_log(os.environ.get("ODDJOB_AUDIT", "-"))
+    return _audit_log
+
+
+def refresh_credentials(event) -> dict:
+    """Validate credentials ahead of a scheduled booking, refreshing and persisting them if needed."""
     platform = event.get("platform", "resy")
-    venue_id = str(event["venue_id"])
-    date = event["date"]
-    party_size = event["party_size"]
-    best = event["best"]
-    earliest = event["earliest"]
-    latest = event["latest"]
-    table_types = event.get("table_types")
-    retries = event.get("retries", 3)
-
-    # Validate times
-    try:
-        validate_times(best, earliest, latest)
-    except SystemExit:
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"error": "Invalid time parameters"})
-        }
+    fire_at = event.get("fire_at")
+    needed_at = None
+    if fire_at:
+        needed_at = parse_utc(fire_at)
 
-    # Get credentials from Secrets Manager
     try:
-        credentials = get_secrets(platform)
+        manager = CredentialManager(on_refresh=put_secrets)
+        manager.register(platform, get_secrets(platform))
+        manager.ensure_fresh(platform, needed_at=needed_at)
     except Exception as e:
-        print(f"Failed to get secrets: {e}")
+        logger.log(OUTCOME, f"Credential check failed: {e}")
         return {
             "statusCode": 500,
-            "body": json.dumps({"error": str(e)})
+            "body": json.dumps({"success": False, "platform": platform, "error": str(e)})
         }
 
-    # Generate preferred times
-    preferred_times = generate_preferred_times(best, earliest, latest)
-    print(f"Preferred times: {preferred_times}")
+    state = manager.state(platform)
+    logger.log(OUTCOME, f"Credentials OK for {platform} (refreshed: {state.refreshed_at is not None})")
+    return {
+        "statusCode": 200,
+        "body": json.dumps({
+            "success": True,
+            "platform": platform,
+            "refreshed": state.refreshed_at is not None,
+            "expires_at": state.expires_at,
+        })
+    }
+
+
+def emit_metrics(instrumentation: Instrumentation, event: dict) -> None:
+    """Log timings to CloudWatch as JSON lines or embedded-metric documents."""
+    fmt = event.get("metrics_format") or os.environ.get("ODDJOB_METRICS_FORMAT", "json")
+    # A batch's bookings finish concurrently; keep each one's lines together
+    with _output_lock:
+        instrumentation.write(sys.stdout, fmt=fmt)
+
+
+def lambda_handler(event, context):
+    """
+    Main Lambda entry point.
+
+    Returns:
+        dict with statusCode and body
+    """
+    global _cold_start
+    received_at = time.time()
+    cold_start = _cold_start
+    if _cold_start:
+        _cold_start = False
+        init = {"metric": "init", "init_ms": round(INIT_MS, 1), "cold_start": True}
+        logger.info(json.dumps(init), extra=init)
+
+    logger.info(f"Received event: {json.dumps(event)}")
 
-    # Create client and attempt booking
     try:
-        client = create_client(platform, credentials)
-    except BookingClientError as e:
-        print(f"Failed to create client: {e}")
+        if isinstance(event, dict) and event.get("action") == "fan_out":
+            return handle_fan_out(event, context)
+
+        if is_batch(event):
+            return handle_batch(event, context, received_at)
+
+        if event.get("action") == "refresh_credentials":
+            return refresh_credentials(event)
+
+        if event.get("profile"):
+            return profile_booking(event, received_at, cold_start, invocation_deadline(context))
+
+        return handle_booking(event, deadline=invocation_deadline(context), received_at=received_at,
+                              cold_start=cold_start)
+    finally:
+        # Notifications and log records were queued off the booking path; deliver
+        # them before the environment freezes
+        if _notifier is not None and not _notifier.flush(NOTIFY_FLUSH_TIMEOUT):
+            logger.warning("Some notifications were not delivered before returning")
+        flush_logging()
+
+
+def profile_booking(
+    event, received_at: Optional[float] = None, cold_start: bool = False, deadline: Optional[float] = None
+) -> dict:
+    """Run handle_booking under the profiler, log the report and return the folded stacks."""
+    from api.profiling import create_profiler
+
+    mode = event["profile"] if isinstance(event["profile"], str) else "cprofile"
+    try:
+        profiler = create_profiler(mode)
+    except ValueError as e:
         return {
             "statusCode": 400,
             "body": json.dumps({"error": str(e)})
         }
 
-    for attempt in range(1, retries + 1):
+    with profiler:
+        response = handle_booking(event, deadline=deadline, received_at=received_at, cold_start=cold_start)
+
+    logger.info(profiler.report())
+    body = json.loads(response["body"])
+    body["profile"] = {
+        "mode": profiler.mode,
+        "duration_ms": profiler.duration_ms,
+        "folded": profiler.folded(),
+    }
+    response["body"] = json.dumps(body)
+    return response
+
+
+def handle_booking(
+    event,
+    resources: Optional[BookingResources] = None,
+    deadline: Optional[float] = None,
+    log=logger.info,
+    outcome=None,
+    received_at: Optional[float] = None,
+    cold_start: bool = False,
+    cancelled: Optional[Callable[[], bool]] = None,
+    notify: bool = True,
+) -> dict:
+    """
+    Book the reservation described by the event, tracing it (see start_trace).
+
+    Args:
+        event: A single-booking event
+        resources: Shared credentials and connection pools (a batch's);
+            a private set by default
+        deadline: time.monotonic() by which the attempt must have stopped; it
+            polls until then (see api.jobs.run_booking_job)
+        log: Progress output
+        outcome: Where the line saying how it ended goes (OUTCOME level by default)
+        received_at: When the invocation started (epoch seconds), for the fire delay
+        cold_start: Whether this invocation imported the module, for the init span
+        cancelled: Stops the booking once it returns True (a fan-out's flag)
+        notify: Send the outcome notification (a fan-out's coordinator sends one for all its workers)
+    """
+    # The credential check already validated the token over the network; see
+    # refresh_credentials
+    resources = resources or BookingResources(lambda platform: get_secrets(platform), put_secrets)
+    notifier = get_notifier() if notify else None
+    tracer = start_trace(event)
+    if tracer is None:
+        return run_booking_job(event, resources, deadline, log, emit=lambda inst: emit_metrics(inst, event),
+                               notifier=notifier, outcome=outcome, cancelled=cancelled)
+
+    try:
+        booking = {key: event[key] for key in ("platform", "venue_id", "venues", "date", "party_size") if key in event}
+        with tracer.span("invocation", cold_start=cold_start, **booking) as span:
+            record_invocation_start(tracer, event, received_at, cold_start)
+            response = run_booking_job(event, resources, deadline, log, emit=lambda inst: emit_metrics(inst, event),
+                                       notifier=notifier, outcome=outcome, tracer=tracer, cancelled=cancelled)
+            span.attributes["status_code"] = response["statusCode"]
+        return response
+    finally:
+        # Spans are exported in one go once the booking is over, never during it
+        tracer.flush()
+
+
+def start_trace(event) -> Optional["Tracer"]:
+    """A tracer for the event's trace (set by scheduler.py), or a new trace; None when tracing is off."""
+    exporter = get_span_exporter()
+    if exporter is None:
+        return None
+    from api.tracing import TRACE_ID_FIELD, Tracer
+    return Tracer(event.get(TRACE_ID_FIELD), exporter)
+
+
+def record_invocation_start(
+    tracer: "Tracer", event: dict, received_at: Optional[float], cold_start: bool = False
+) -> None:
+    """Record the spans from before the handler ran: the schedule's fire delay and a cold start's init."""
+    from api.tracing import TRIGGER_AT_FIELD
+
+    trigger_at = event.get(TRIGGER_AT_FIELD)
+    if trigger_at and received_at is not None:
         try:
-            print(f"Attempt {attempt}/{retries}")
+            tracer.record("fire_delay", parse_utc(trigger_at), received_at, trigger_at=trigger_at)
+        except ValueError:
+            logger.warning(f"Ignoring bad {TRIGGER_AT_FIELD} '{trigger_at}'")
+    if cold_start:
+        tracer.record("init", INIT_AT, INIT_AT + INIT_MS / 1000)
+
 
-            # Find available slots
-            slots = client.find_slots(venue_id, date, party_size)
+def _remaining_seconds(context) -> Optional[float]:
+    if context is None or not hasattr(context, "get_remaining_time_in_millis"):
+        return None
+    return context.get_remaining_time_in_millis() / 1000
 
-            if not slots:
-                print("No slots available")
-                continue
 
-            print(f"Found {len(slots)} slots")
+def invocation_deadline(context) -> Optional[float]:
+    """time.monotonic() by which bookings must have stopped: TIME_RESERVE before the invocation times out."""
+    remaining = _remaining_seconds(context)
+    if remaining is None:
+        return None
+    return time.monotonic() + remaining - TIME_RESERVE
 
-            selected_slot = select_best_slot(slots, preferred_times, table_types)
 
-            if not selected_slot:
-                print("No slots match preferred times")
-                continue
+def handle_batch(event, context, received_at: Optional[float] = None) -> dict:
+    """
+    Book every reservation in a batch event concurrently (see api/jobs.py).
 
-            print(f"Selected: {selected_slot.time} - {selected_slot.table_type}")
+    The bookings share secrets, credential refreshes and connection pools.
+    Bookings still waiting to start when the invocation is TIME_RESERVE
+    seconds from timing out are skipped, and running ones stop before a
+    search or booking that couldn't finish in time; both are reported as
+    failed. For SQS events the response
+    carries batchItemFailures, so only the failed messages are redelivered
+    (except bookings whose outcome is unknown, which could book twice).
+    Each booking is traced under its own trace_id.
 
-            result = client.book_slot(selected_slot, date, party_size)
+    A fan-out's shard (see handle_fan_out) carries a "fanout" option with the
+    fan-out's id and cancellation store. Its first confirmed booking sets the
+    fan-out's flag; once the flag is set, by this shard or another, running
+    bookings stop (409, "cancelled") and waiting ones don't start. Shards
+    send no notifications; the coordinator does.
+    """
+    items = parse_batch(event)
+    options = batch_options(event)
+    max_workers = max(1, min(len(items) or 1, int(options.get("max_workers", DEFAULT_BATCH_WORKERS))))
+    resources = BookingResources(
+        lambda platform: get_secrets(platform), put_secrets,
+        pool_size=max_workers, coalesce=bool(options.get("coalesce")),
+    )
 
-            print(f"SUCCESS! Confirmation: {result.confirmation_id}")
+    deadline = invocation_deadline(context)
+    fanout = options.get("fanout")
+    watcher = None
+    if fanout:
+        from api.fanout import CancellationWatcher, open_cancellation_store
 
-            return {
-                "statusCode": 200,
-                "body": json.dumps({
-                    "success": True,
-                    "platform": platform,
-                    "confirmation_id": result.confirmation_id,
-                    "reservation_id": result.reservation_id,
-                    "time": selected_slot.time,
-                    "table_type": selected_slot.table_type,
-                })
-            }
+        try:
+            store = open_cancellation_store(fanout["store"])
+        except (KeyError, TypeError, ValueError) as e:
+            return {"statusCode": 400, "body": json.dumps({"error": f"Bad fanout option: {e}"})}
+        watcher = CancellationWatcher(store, fanout["id"])
 
-        except BookingClientError as e:
-            print(f"API Error: {e}")
+    def run(item: BatchItem) -> dict:
+        if item.error:
+            return {"statusCode": 400, "body": json.dumps({"error": item.error})}
+        if deadline is not None and time.monotonic() >= deadline:
+            return {"statusCode": 504, "body": json.dumps({"success": False, "error": "Not started: out of time"})}
+        if watcher is not None and watcher.cancelled():
+            return {"statusCode": 409, "body": json.dumps({"success": False, "error": "Cancelled", "cancelled": True})}
+        booking = dict(item.event)
+        if "metrics_format" in options:
+            booking.setdefault("metrics_format", options["metrics_format"])
+        item_logger = job_logger(logger, item.item_id)
 
-    # All retries failed
-    return {
-        "statusCode": 500,
+        try:
+            if watcher is None:
+                return handle_booking(booking, resources, deadline, log=item_logger.info,
+                                      outcome=item_logger.outcome, received_at=received_at)
+            response = handle_booking(booking, resources, deadline, log=item_logger.info,
+                                      outcome=item_logger.outcome, received_at=received_at,
+                                      cancelled=watcher.cancelled, notify=False)
+            if response["statusCode"] == 200:
+                # Stamp the confirmation so the coordinator can tell which came first
+                response["body"] = json.dumps({**json.loads(response["body"]), "confirmed_at": time.time()})
+                watcher.cancel(f"booked {item.item_id} on shard {fanout.get('shard')}")
+            return response
+        except Exception as e:
+            # One bad booking mustn't take the rest of the batch down with it
+            item_logger.exception(f"Failed: {type(e).__name__}: {e}")
+            return {"statusCode": 500, "body": json.dumps({"success": False, "error": str(e)})}
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    logger.info(f"Batch of {len(items)} bookings, {max_workers} at a time")
+    with contextlib.ExitStack() as stack:
+        if watcher is not None:
+            stack.enter_context(watcher)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            responses = list(executor.map(run, items))
+
+    results = []
+    failures = []
+    redeliver = []
+    for item, response in zip(items, responses):
+        body = json.loads(response["body"])
+        results.append({"id": item.item_id, "statusCode": response["statusCode"], **body})
+        if response["statusCode"] != 200:
+            failures.append({"itemIdentifier": item.item_id})
+            # Not if the booking may have gone through (outcome unknown)
+            if response["statusCode"] != 502:
+                redeliver.append({"itemIdentifier": item.item_id})
+
+    logger.log(OUTCOME, f"Batch done: {len(items) - len(failures)} booked, {len(failures)} failed",
+               extra={"succeeded": len(items) - len(failures), "failed": len(failures)})
+    response = {
+        "statusCode": 200 if not failures else 207,
         "body": json.dumps({
-            "success": False,
-            "error": "Failed to book after all retries"
+            "succeeded": len(items) - len(failures),
+            "failed": len(failures),
+            "results": results,
         })
     }
+    if is_sqs_batch(event):
+        response["batchItemFailures"] = redeliver
+    return response
+
+
+def fan_out_invoker(event) -> "Invoker":
+    """
+    How a fan-out's shards run: the event's "invoker", else ODDJOB_FANOUT_INVOKER,
+    else this function (lambda://$AWS_LAMBDA_FUNCTION_NAME). "local" runs
+    them in this process.
+    """
+    target = event.get("invoker") or os.environ.get("ODDJOB_FANOUT_INVOKER")
+    if not target:
+        function_name = os.environ.get("AWS_LAMBDA_FUNCTION_NAME")
+        if not function_name:
+            raise ValueError("No invoker: set ODDJOB_FANOUT_INVOKER outside Lambda")
+        target = f"lambda://{function_name}?region={os.environ.get('AWS_REGION', 'us-east-1')}"
+    from api.fanout import open_invoker
+    return open_invoker(target, handler=lambda_handler)
+
+
+def handle_fan_out(event, context) -> dict:
+    """
+    Spread a job's candidates over parallel worker invocations (see api/fanout.py).
+
+    Event:
+    {
+        "action": "fan_out",
+        "booking": {...},  // a booking event, with "vary": {"date": [...], ...}
+        "bookings": [{...}, ...],  // or the candidates themselves
+        "shards": 4,  // optional: workers invoked (default 4)
+        "max_workers": 8,  // optional: concurrent bookings per worker (its candidates by default)
+        "cancel_store": "dynamodb://oddjob-fanout",  // optional, default ODDJOB_CANCEL_STORE
+        "invoker": "local",  // optional, default ODDJOB_FANOUT_INVOKER or this function
+        "trace_id": "9f1c..."  // optional: every candidate is traced under it
+    }
+
+    Each worker's bookings stop FANOUT_RESERVE seconds before this
+    invocation's own deadline, so their results come back in time. If more
+    than one candidate was confirmed, the best is kept and the others are
+    cancelled (see api/reconcile.py), with the audit record written to
+    ODDJOB_AUDIT and returned under "reconciliation". The response is 200
+    with the kept booking, or 500 if no candidate was booked. The
+    coordinator sends the one notification.
+    """
+    from api.fanout import DEFAULT_SHARDS, InProcessInvoker, expand_candidates, fan_out, open_cancellation_store
+    from api.notifications import BOOKED, FAILED, describe_venues
+    from api.tracing import TRACE_ID_FIELD, new_trace_id
+
+    try:
+        candidates = expand_candidates(event)
+        invoker = fan_out_invoker(event)
+        store_target = event.get("cancel_store") or os.environ.get("ODDJOB_CANCEL_STORE")
+        if not store_target:
+            if not isinstance(invoker, InProcessInvoker):
+                raise ValueError("No cancellation store: set cancel_store or ODDJOB_CANCEL_STORE")
+            store_target = "memory://fanout"
+        store = open_cancellation_store(store_target)
+        if store.url.startswith("memory://") and not isinstance(invoker, InProcessInvoker):
+            raise ValueError("A memory:// cancellation store only works with the local invoker")
+        shards = int(event.get("shards", DEFAULT_SHARDS))
+        max_workers = event.get("max_workers")
+        max_workers = int(max_workers) if max_workers is not None else None
+    except (TypeError, ValueError) as e:
+        return {"statusCode": 400, "body": json.dumps({"success": False, "error": str(e)})}
+
+    trace_id = event.get(TRACE_ID_FIELD) or new_trace_id()
+    remaining = _remaining_seconds(context)
+    for candidate in candidates:
+        candidate.setdefault(TRACE_ID_FIELD, trace_id)
+        if remaining is not None:
+            budget = max(0.0, remaining - TIME_RESERVE - FANOUT_RESERVE)
+            candidate["max_duration"] = min(float(candidate.get("max_duration", budget)), budget)
+
+    resources = BookingResources(lambda platform: get_secrets(platform), put_secrets)
+    deadline = invocation_deadline(context)
+
+    clients = []
+
+    def client_for(platform: str):
+        client = resources.client(platform)
+        client.set_deadline(deadline)
+        clients.append(client)
+        return client
+
+    try:
+        result = fan_out(candidates, invoker, store, shards=shards, max_workers=max_workers,
+                         client_for=client_for, audit=get_audit_log(), log=logger.info)
+    finally:
+        # The reconciliation's clients; refreshes needn't reach them any more
+        resources.release(*clients)
+    body = result.body()
+    body[TRACE_ID_FIELD] = trace_id
+
+    notifier = get_notifier()
+    booking = result.booking
+    if booking is not None:
+        where = f"{booking.get('platform')} {booking.get('venue_id') or describe_venues(booking.get('venues') or {})}"
+        message = (f"Booked {where} on {booking.get('date')} at {str(booking.get('time'))[:5]} "
+                   f"for {booking.get('party_size')}. Confirmation {str(booking.get('confirmation_id'))[:40]}")
+        left_standing = (result.reconciliation or {}).get("left_standing", result.extra_confirmations)
+        if result.reconciliation and result.reconciliation["cancelled"]:
+            message += f" ({result.reconciliation['cancelled']} surplus bookings cancelled)"
+        if left_standing:
+            message += ". Still held, cancel by hand: " + ", ".join(
+                f"{b.get('platform')} {b.get('confirmation_id')}" for b in left_standing)
+        notifier.notify(BOOKED, message, fanout_id=result.fanout_id, confirmation_id=booking.get("confirmation_id"),
+                        extra_confirmations=len(result.extra_confirmations), left_standing=len(left_standing))
+        logger.log(OUTCOME, f"Fan-out {result.fanout_id} booked {booking.get('id')} "
+                            f"({len(result.extra_confirmations)} extra confirmations, {len(left_standing)} still held)")
+    else:
+        errors = sorted({r.get("last_error") or r.get("error") for r in result.results} - {None})
+        notifier.notify(FAILED, f"Couldn't book any of {len(candidates)} candidates: {'; '.join(errors)[:200]}",
+                        fanout_id=result.fanout_id)
+        logger.log(OUTCOME, f"Fan-out {result.fanout_id} failed: no candidate booked")
+
+    return {"statusCode": 200 if result.success else 500, "body": json.dumps(body)}
@@ -3,19 +3,34 @@ EventBridge Scheduler wrapper for OddJob cloud-scheduled bookings.
 
 Creates one-time schedules that invoke the Lambda function at exact times
 (e.g., 9:00 AM when reservations are released). Schedules auto-delete after firing.
+
+Each booking schedule carries a trace ID, under which the Lambda traces
+what happened when it fired (see api/tracing.py).
 """
 
 import json
+from datetime import datetime, timedelta
 
 import boto3
 from botocore.exceptions import ClientError
 
+from api.tracing import TRACE_ID_FIELD, TRIGGER_AT_FIELD, new_trace_id
+
 # AWS resource constants
 LAMBDA_ARN = "arn:aws:lambda:us-east-1:145713876007:function:oddjob-resy-booker"
 SCHEDULER_ROLE_ARN = "arn:aws:iam::145713876007:role/oddjob-scheduler-role"
 SCHEDULE_GROUP = "oddjob"
 REGION = "us-east-1"
 
+# With a release recommendation, trigger this long before the precise fire
+# time (EventBridge fires to the second, plus Lambda start-up); the Lambda
+# then waits for "fire_at" itself
+FIRE_LEAD_SECONDS = 3
+
+# Companion schedule that validates/refreshes credentials ahead of each booking
+CREDENTIAL_CHECK_SUFFIX = "-creds"
+DEFAULT_CREDENTIAL_CHECK_LEAD_MINUTES = 10
+
 
 def _get_client():
     """Get an EventBridge Scheduler client."""
@@ -57,10 +72,19 @@ def schedule_booking(
     table_types: list[str] | None = None,
     retries: int = 3,
     platform: str = "resy",
+    credential_check_lead_minutes: int | None = DEFAULT_CREDENTIAL_CHECK_LEAD_MINUTES,
+    auto_offset: bool = True,
+    tolerance: str | dict | list | None = None,
+    venues: dict[str, str] | None = None,
+    trace_id: str | None = None,
 ) -> str:
     """
     Create a one-time EventBridge schedule that invokes the Lambda at run_at_utc.
 
+    Also creates a companion schedule that fires credential_check_lead_minutes
+    earlier to validate (and refresh) the platform credentials, so an expired
+    token is caught before the release rather than at it.
+
     Args:
         venue_id: Platform-specific venue ID
         date: Reservation date (YYYY-MM-DD)
@@ -72,6 +96,17 @@ def schedule_booking(
         table_types: Optional preferred table types
         retries: Number of booking retry attempts
         platform: Booking platform (default: "resy")
+        credential_check_lead_minutes: Minutes before run_at_utc to check credentials (None to skip)
+        auto_offset: Apply the venue's release recommendation, if it has
+            monitoring history (see api.release_monitor): fire at the
+            recommended offset from run_at_utc, with its retry count and
+            poll interval
+        tolerance: Optional tolerance curve for times away from best
+            (see api.time_preferences)
+        venues: Platform -> venue ID, to race the booking across platforms
+            (see api.race); replaces venue_id and platform
+        trace_id: Trace the booking's spans are recorded under when it
+            fires (a new one by default; read it back from list_schedules)
 
     Returns:
         The schedule name.
@@ -79,12 +114,13 @@ def schedule_booking(
     client = _get_client()
     _ensure_schedule_group(client)
 
-    schedule_name = _make_schedule_name(venue_id, date, run_at_utc, platform)
+    if venues:
+        schedule_name = _make_schedule_name("-".join(venues.values()), date, run_at_utc, "race")
+    else:
+        schedule_name = _make_schedule_name(venue_id, date, run_at_utc, platform)
 
     # Build the Lambda payload (matches lambda_handler.py event format)
     payload = {
-        "platform": platform,
-        "venue_id": venue_id,
         "date": date,
         "party_size": party_size,
         "best": best,
@@ -92,13 +128,39 @@ def schedule_booking(
         "latest": latest,
         "retries": retries,
     }
+    if venues:
+        payload["venues"] = venues
+    else:
+        payload["platform"] = platform
+        payload["venue_id"] = venue_id
     if table_types:
         payload["table_types"] = table_types
+    if tolerance:
+        payload["tolerance"] = tolerance
+
+    trigger_at_utc = run_at_utc
+    recommendation = None
+    if auto_offset and venues:
+        from api.release_monitor import load_race_recommendation
+        recommendation = load_race_recommendation(venues)
+    elif auto_offset:
+        from api.release_monitor import load_recommendation
+        recommendation = load_recommendation(platform, venue_id)
+    if recommendation:
+        fire_at = datetime.strptime(run_at_utc, "%Y-%m-%dT%H:%M:%S") + timedelta(seconds=recommendation.fire_offset)
+        trigger_at = fire_at - timedelta(seconds=FIRE_LEAD_SECONDS)
+        trigger_at_utc = trigger_at.replace(microsecond=0).strftime("%Y-%m-%dT%H:%M:%S")
+        payload["fire_at"] = fire_at.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3]
+        payload["retries"] = max(retries, recommendation.retries)
+        payload["retry_delay"] = recommendation.poll_interval
+
+    payload[TRACE_ID_FIELD] = trace_id or new_trace_id()
+    payload[TRIGGER_AT_FIELD] = trigger_at_utc
 
     client.create_schedule(
         Name=schedule_name,
         GroupName=SCHEDULE_GROUP,
-        ScheduleExpression=f"at({run_at_utc})",
+        ScheduleExpression=f"at({trigger_at_utc})",
         ScheduleExpressionTimezone="UTC",
         FlexibleTimeWindow={"Mode": "OFF"},
         Target={
@@ -109,9 +171,46 @@ def schedule_booking(
         ActionAfterCompletion="DELETE",
     )
 
+    if credential_check_lead_minutes:
+        for check_platform in venues or [platform]:
+            _schedule_credential_check(
+                client, schedule_name, check_platform, run_at_utc, credential_check_lead_minutes,
+                suffix=f"-{check_platform}" if venues else "",
+            )
+
     return schedule_name
 
 
+def _schedule_credential_check(
+    client, schedule_name: str, platform: str, run_at_utc: str, lead_minutes: int, suffix: str = ""
+) -> None:
+    """Create the companion credential check for a booking schedule, if there's still time."""
+    run_at = datetime.strptime(run_at_utc, "%Y-%m-%dT%H:%M:%S")
+    check_at = run_at - timedelta(minutes=lead_minutes)
+    if check_at <= datetime.utcnow():
+        return
+
+    payload = {
+        "action": "refresh_credentials",
+        "platform": platform,
+        "fire_at": run_at_utc,
+    }
+
+    client.create_schedule(
+        Name=schedule_name + CREDENTIAL_CHECK_SUFFIX + suffix,
+        GroupName=SCHEDULE_GROUP,
+        ScheduleExpression=f"at({check_at.strftime('%Y-%m-%dT%H:%M:%S')})",
+        ScheduleExpressionTimezone="UTC",
+        FlexibleTimeWindow={"Mode": "OFF"},
+        Target={
+            "Arn": LAMBDA_ARN,
+            "RoleArn": SCHEDULER_ROLE_ARN,
+            "Input": json.dumps(payload),
+        },
+        ActionAfterCompletion="DELETE",
+    )
+
+
 def list_schedules() -> list[dict]:
     """
     List all schedules in the oddjob group.
@@ -160,3 +259,13 @@ def cancel_schedule(name: str) -> None:
     """
     client = _get_client()
     client.delete_schedule(Name=name, GroupName=SCHEDULE_GROUP)
+
+    # Remove the companion credential checks too (one per platform for a race), if they haven't fired yet
+    if CREDENTIAL_CHECK_SUFFIX not in name:
+        companions = client.list_schedules(GroupName=SCHEDULE_GROUP, NamePrefix=name + CREDENTIAL_CHECK_SUFFIX)
+        for companion in companions.get("Schedules", []):
+            try:
+                client.delete_schedule(Name=companion["Name"], GroupName=SCHEDULE_GROUP)
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ResourceNotFoundException":
+                    raise
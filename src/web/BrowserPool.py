@@ -0,0 +1,231 @@
+import os, resource, sys, threading, time
+from queue import Queue, Empty
+
+from selenium import webdriver
+from selenium.webdriver import Chrome
+
+from api.logs import get_logger
+
+logger = get_logger("web.pool")
+
+## Pool of pre-launched Chrome sessions for the Selenium booking path. Starting a browser takes several seconds, which used to be
+## paid on every attempt. Sessions are launched ahead of time, health-checked whenever they are handed out, recycled after a fixed
+## number of uses, and the number of live sessions never exceeds the pool size. ##
+
+
+## Requests the booking flow never needs. Blocked in fast mode so page-ready time isn't spent on images, fonts, media and analytics ##
+BLOCKED_URL_PATTERNS = [
+	"*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+	"*.woff", "*.woff2", "*.ttf", "*.otf",
+	"*.mp4", "*.webm",
+	"*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*facebook.net*",
+	"*segment.io*", "*segment.com*", "*hotjar.com*", "*newrelic.com*", "*nr-data.net*", "*sentry.io*",
+]
+
+
+def buildOptions(headless=False, user_data_dir=None, fast=False) :
+	options = webdriver.ChromeOptions()
+	options.add_argument('--disable-blink-features=AutomationControlled')
+	if user_data_dir :
+		## Persistent profile keeps the Resy login cookies between runs ##
+		options.add_argument('--user-data-dir={0}'.format(user_data_dir))
+	## Expose DevTools network events so availability can be read from the page's own API traffic ##
+	options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+	if headless or fast :
+		options.add_argument('--headless=new')
+		options.add_argument('--window-size=1400,1000')
+	if fast :
+		## Return from driver.get() at DOMContentLoaded and skip image decoding entirely ##
+		options.page_load_strategy = 'eager'
+		options.add_argument('--blink-settings=imagesEnabled=false')
+		options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+	return options
+
+
+def blockResources(driver) :
+	driver.execute_cdp_cmd("Network.enable", {})
+	driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+
+
+def reportPageMetrics(driver, label="page") :
+	## Page-ready time from the Navigation Timing API, plus this process's peak RSS ##
+	timing = driver.execute_script(
+		"var t = performance.timing;"
+		"return {dom: t.domContentLoadedEventEnd - t.navigationStart, load: t.loadEventEnd - t.navigationStart};"
+	)
+	rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	if sys.platform == "darwin" :
+		rss = rss / 1024
+	logger.info("{0} ready: DOMContentLoaded {1}ms, load {2}ms; python RSS {3:.1f} MB".format(label, timing["dom"], max(timing["load"], 0), rss / 1024))
+	return {"dom_ms": timing["dom"], "load_ms": max(timing["load"], 0), "rss_mb": rss / 1024}
+
+
+class PooledBrowser :
+	def __init__(self, driver, profile_slot=None) :
+		self.driver = driver
+		self.profile_slot = profile_slot
+		self.uses = 0
+		self.created_at = time.time()
+
+
+class BrowserPool :
+	def __init__(self, size=2, headless=False, max_uses=25, profile_dir=None, fast=False) :
+		if size < 1 :
+			raise ValueError("Browser pool size must be at least 1.")
+		self.size = size
+		self.headless = headless
+		self.max_uses = max_uses
+		self.profile_dir = profile_dir
+		self.fast = fast
+		## Chrome refuses to share a user-data-dir between running instances, so each live session owns one profile slot ##
+		self._free_profile_slots = list(range(size))
+		self._idle = Queue(maxsize=size)
+		self._lock = threading.Lock()
+		self._live = 0
+		self._closed = False
+
+	def _launch(self) :
+		## Caller must already hold a slot (self._live was incremented) ##
+		profile_slot = None
+		user_data_dir = None
+		if self.profile_dir :
+			with self._lock :
+				profile_slot = self._free_profile_slots.pop()
+			user_data_dir = os.path.join(self.profile_dir, "session-{0}".format(profile_slot))
+		driver = None
+		try :
+			driver = Chrome(options=buildOptions(self.headless, user_data_dir, self.fast))
+			if self.fast :
+				blockResources(driver)
+		except Exception :
+			if driver is not None :
+				driver.quit()
+			with self._lock :
+				self._live -= 1
+				if profile_slot is not None :
+					self._free_profile_slots.append(profile_slot)
+			raise
+		return PooledBrowser(driver, profile_slot)
+
+	def _reserveSlot(self) :
+		with self._lock :
+			if self._closed or self._live >= self.size :
+				return False
+			self._live += 1
+			return True
+
+	def _retire(self, browser) :
+		try :
+			browser.driver.quit()
+		except Exception :
+			pass
+		with self._lock :
+			self._live -= 1
+			if browser.profile_slot is not None :
+				self._free_profile_slots.append(browser.profile_slot)
+
+	def isHealthy(self, browser) :
+		try :
+			browser.driver.execute_script("return 1")
+			return len(browser.driver.window_handles) > 0
+		except Exception :
+			return False
+
+	def prelaunch(self) :
+		## Fill the pool up to its size so the first attempt doesn't pay for browser startup ##
+		while self._reserveSlot() :
+			self._idle.put(self._launch())
+
+	def warm(self, fn) :
+		## Run fn(driver) on every idle session, e.g. to refresh logins shortly before a release ##
+		browsers = []
+		while True :
+			try :
+				browsers.append(self._idle.get_nowait())
+			except Empty :
+				break
+		try :
+			for browser in browsers :
+				if self.isHealthy(browser) :
+					fn(browser.driver)
+		finally :
+			for browser in browsers :
+				self._idle.put(browser)
+
+	def acquire(self, timeout=60) :
+		deadline = time.monotonic() + timeout
+		while True :
+			try :
+				browser = self._idle.get_nowait()
+			except Empty :
+				browser = None
+
+			if browser is not None :
+				if self.isHealthy(browser) :
+					return browser
+				logger.warning("Discarding unhealthy browser session.")
+				self._retire(browser)
+				continue
+
+			if self._reserveSlot() :
+				return self._launch()
+
+			remaining = deadline - time.monotonic()
+			if remaining <= 0 :
+				raise TimeoutError("No browser session became available within {0}s.".format(timeout))
+			try :
+				browser = self._idle.get(timeout=remaining)
+			except Empty :
+				continue
+			if self.isHealthy(browser) :
+				return browser
+			self._retire(browser)
+
+	def release(self, browser) :
+		browser.uses += 1
+		if self._closed or browser.uses >= self.max_uses or not self.isHealthy(browser) :
+			self._retire(browser)
+			## Keep the pool warm by launching the replacement now rather than on the next acquire ##
+			if not self._closed and self._reserveSlot() :
+				self._idle.put(self._launch())
+			return
+		self._idle.put(browser)
+
+	def session(self) :
+		return _PoolSession(self)
+
+	def close(self) :
+		self._closed = True
+		while True :
+			try :
+				browser = self._idle.get_nowait()
+			except Empty :
+				break
+			self._retire(browser)
+
+
+class _PoolSession :
+	def __init__(self, pool) :
+		self.pool = pool
+		self.browser = None
+
+	def __enter__(self) :
+		self.browser = self.pool.acquire()
+		return self.browser.driver
+
+	def __exit__(self, exc_type, exc, tb) :
+		self.pool.release(self.browser)
+		return False
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def getDefaultPool(size=2, headless=False, max_uses=25, profile_dir=None, fast=False) :
+	## Process-wide pool shared by every job run from this interpreter ##
+	global _default_pool
+	with _default_pool_lock :
+		if _default_pool is None :
+			_default_pool = BrowserPool(size=size, headless=headless, max_uses=max_uses, profile_dir=profile_dir, fast=fast)
+		return _default_pool
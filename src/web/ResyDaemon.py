@@ -1,52 +1,60 @@
-from bs4 import BeautifulSoup
-import pandas as pd, requests, io, re, csv, datetime, sys, json, html
+import base64, json, time
+from urllib.parse import urlparse, parse_qs
 
-import time 
-from datetime import date
-
-from selenium import webdriver 
-from selenium.webdriver import Chrome 
-from selenium.webdriver.chrome.service import Service 
-from selenium.webdriver.common.by import By 
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import json, sys, math
 
-import ResyTimeFunctions as rtf
+import BrowserPool as bp
+from api.logs import OUTCOME, get_logger
+from api.resy_client import parse_find_response
+from api.slot_selection import select_best_slot
+from api.time_preferences import compile_preferences
+
+FIND_URL = "api.resy.com/4/find"
+
+## Progress goes through the queued "oddjob" loggers (api/logs.py) so a slow terminal never holds up a click ##
+logger = get_logger("web")
+
+## Poll interval for every condition wait; the default (.5s) adds up to seconds across the booking flow ##
+POLL = .05
 
 
 ## TODO: Look into Scrapy for polite Spider to potentially circumvent bot detection: https://docs.scrapy.org/en/latest/intro/overview.html
 
 def getPreferredTimes(best, earliest, latest) :
-	## Creating array of every time within defined range, and ordering array from most preferred to least preferred (starting from "best time" and moving outward both earlier and later in increments of 15 mins until upper and lower boundaries are reached). ##
-	preferred_times = []
+	## Rank every minute between earliest and latest by distance from the best time (later first on ties), so slots off the 15 minute grid match too.
+	## Times without AM/PM are read as evening, as the booking form always has. Raises ValueError on a bad time. ##
+	return compile_preferences(best, earliest, latest, assume_pm=True)
 
-	n_best = rtf.timeToFloat(best)
-	n_earliest = rtf.timeToFloat(earliest)
-	n_latest = rtf.timeToFloat(latest)
 
-	preferred_times.append(rtf.floatToTime(n_best))
+def captureAvailability(driver, timeout=15) :
+	## Poll the performance log for the page's own /4/find call and build Slots from its JSON body ##
+	deadline = time.monotonic() + timeout
+	pending = {}
+	while time.monotonic() < deadline :
+		for entry in driver.get_log("performance") :
+			message = json.loads(entry["message"])["message"]
+			method = message.get("method")
+			params = message.get("params", {})
 
-	i = .25
-	while True :
-		upper_i = n_best + i
-		lower_i = n_best - i
-
-		if upper_i <= n_latest :
-			preferred_times.append(rtf.floatToTime(upper_i))
-		if lower_i >= n_earliest :
-			preferred_times.append(rtf.floatToTime(lower_i))
+			if method == "Network.responseReceived" and FIND_URL in params["response"]["url"] :
+				pending[params["requestId"]] = params["response"]["url"]
 
-		if upper_i >= n_latest and lower_i <= n_earliest :
-			break
+			elif method == "Network.loadingFinished" and params.get("requestId") in pending :
+				body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": params["requestId"]})
+				raw = base64.b64decode(body["body"]) if body.get("base64Encoded") else body["body"]
+				data = json.loads(raw)
+				query = parse_qs(urlparse(pending[params["requestId"]]).query)
+				return parse_find_response(data, query.get("venue_id", [""])[0])
 
-		i += 0.25
+		time.sleep(POLL)
 
-	return preferred_times
+	return []
 
 
-def getPage(url, preferred_times, attempt=0) :
+def getPage(url, preferred_times, pool=None, max_attempts=5) :
 
 	## Get Resy credentials from config file ##
 
@@ -54,91 +62,96 @@ def getPage(url, preferred_times, attempt=0) :
    		auth = json.load(f)
 
 
-	## Options for webdriver ##
+	## Borrow a pre-launched browser from the pool. The same session is reused for every attempt and handed back afterwards ##
 
-	options = webdriver.ChromeOptions()
-	options.add_argument('--disable-blink-features=AutomationControlled')
+	pool = pool or bp.getDefaultPool()
+	browser = pool.acquire()
+	try :
+		return _bookWithDriver(browser.driver, url, preferred_times, auth, max_attempts)
+	finally :
+		pool.release(browser)
 
-	chrome_path = ChromeDriverManager().install()
-	chrome_service = Service(chrome_path)
 
-	## NOTE: below driver config worked initially but started to throw errors. Swapped for standard Chrome driver and that seemed to work
-	#driver = Chrome(options=options, service=chrome_service)
-	driver = Chrome()
-	driver.get(url)
-	selector = ""
+def _bookWithDriver(driver, url, preferred_times, auth, max_attempts) :
 
-	## Find best Reservation and click time button ##
+	## Read availability from the /4/find response the page fetches for itself (via Chrome's DevTools network log) instead of waiting for
+	## the ShiftInventory markup to render. This sees every shift on the page, not just the last (dinner) one. The time buttons are only
+	## used to click the slot that was picked. ##
 
-	## NOTE: There are multiple "ShiftInventory" elements on the page for each service window (Brunch, Lunch, Dinner, etc.). Currently the "container" variable should always grab the element with "Dinner"
-	## since the element being grabbed is explicitly the last "ShiftInventory" on the page ("ShiftInventory__shift--last"). Need to make this dynamic if we want to add functionality to enable user to
-	## reserve other service windows.
+	slots = []
+	for attempt in range(max_attempts) :
+		driver.switch_to.default_content()
+		driver.get_log("performance")  ## drain entries left over from the previous page
+		driver.get(url)
+		if attempt == 0 :
+			bp.reportPageMetrics(driver, "Venue page")
+		slots = captureAvailability(driver)
 
-	container = WebDriverWait(driver, 30).until(EC.element_to_be_clickable((By.CLASS_NAME, "ShiftInventory__shift--last")))
-
-	buttons = container.find_elements(By.CSS_SELECTOR, ".ReservationButton")
+		if len(slots) > 0 :
+			logger.info("times found")
+			break
 
-	if len(buttons) <= 0 :
-		print("no times available on page.")
-		attempt += 1
-		if attempt >= 5 :
-			print("Could not find any available times. Exiting function.")
-			driver.close()
-			return None
-		elif attempt < 5 :
-			driver.close()
-			content = getPage(url, preferred_times, attempt)
-	else :
-		print("times found")
+		logger.info("no times available on page.")
 
-	button_keys = []
-	for b in buttons :
-		button_keys.append(b.text)
+	if len(slots) <= 0 :
+		logger.log(OUTCOME, "Could not find any available times. Exiting function.")
+		return None
 
-	done = False
-	i = 0
-	while not done :
-		t = preferred_times[i]
-		for b in button_keys :
-			if t in b :
-				mt = rtf.toMilitaryTime(t)
-				button = driver.find_element(By.CSS_SELECTOR, ".ReservationButton[id*='{0}']".format(mt))
-				button.click()
+	slot = select_best_slot(slots, preferred_times)
+	if slot is None :
+		logger.log(OUTCOME, "No available times match preferred times. Exiting function.")
+		return None
 
-				done = True
-				break
-		i += 1
+	t = slot.time
+	button = WebDriverWait(driver, 10, poll_frequency=POLL).until(EC.element_to_be_clickable((By.CSS_SELECTOR, ".ReservationButton[id*='{0}']".format(t))))
+	button.click()
+	clicked_at = time.perf_counter()
 
-	iframe = WebDriverWait(driver, 30).until(EC.element_to_be_clickable((By.CSS_SELECTOR, "iframe[title='Resy - Book Now']")))
+	iframe = WebDriverWait(driver, 30, poll_frequency=POLL).until(EC.element_to_be_clickable((By.CSS_SELECTOR, "iframe[title='Resy - Book Now']")))
 	driver.switch_to.frame(iframe)
-	reserve_now = WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.CSS_SELECTOR, "Button.Button--primary.Button--lg")))
+	reserve_now = WebDriverWait(driver, 10, poll_frequency=POLL).until(EC.element_to_be_clickable((By.CSS_SELECTOR, "Button.Button--primary.Button--lg")))
 	reserve_now.click()
 
-	## Found issue where UI asks clarifying questions (e.g. 'confirm you want to sit outside'), so need to click button repeatedly until menu advances ##
-	try:
-		reserve_now = driver.find_element(By.CSS_SELECTOR, "Button.Button--primary.Button--lg")
-
-	except:
-			reserve_now = None
-
-	while reserve_now :
+	## Found issue where UI asks clarifying questions (e.g. 'confirm you want to sit outside'), so need to click button repeatedly until menu advances.
+	## Rather than sleeping between clicks, wait (with short polling) for the clicked button to be replaced or removed ##
+	while True :
+		buttons = driver.find_elements(By.CSS_SELECTOR, "Button.Button--primary.Button--lg")
+		if not buttons :
+			break
+		reserve_now = buttons[0]
 		try :
 			reserve_now.click()
-			time.sleep(.5)
-		except :
+		except Exception :
 			break
+		try :
+			WebDriverWait(driver, 2, poll_frequency=POLL).until(EC.staleness_of(reserve_now))
+		except TimeoutException :
+			## Same button still showing after the click, the menu has not advanced ##
+			break
+
+	## With a persistent, already-authenticated profile the flow ends at "Reserve Now". Only fall back to logging in when Resy asks for it ##
+
+	logged_in_profile = len(driver.find_elements(By.CLASS_NAME, "AuthContainer")) == 0
+	if not logged_in_profile :
+		_submitLoginForm(driver, auth)
+		WebDriverWait(driver, 30, poll_frequency=POLL).until(EC.invisibility_of_element_located((By.CLASS_NAME, "AuthContainer")))
+
+	click_to_confirm = time.perf_counter() - clicked_at
+	logger.log(OUTCOME, "Click-to-confirm: {0:.2f}s ({1})".format(click_to_confirm, "authenticated profile" if logged_in_profile else "logged in during booking"))
+
+	return {"time": t, "click_to_confirm": click_to_confirm, "authenticated_profile": logged_in_profile}
+
+
+def _submitLoginForm(driver, auth) :
 
 	## Logging into Resy account with username and password ##
 
-	#login = WebDriverWait(driver, 30).until(EC.element_to_be_clickable((By.CLASS_NAME, "Button--login")))
-	#login.click()
-	cont = driver.find_element(By.CLASS_NAME, "AuthContainer")
-	auth_container = WebDriverWait(driver, 30).until(EC.element_to_be_clickable((By.CLASS_NAME, "AuthContainer")))
-	un_pw_container = WebDriverWait(driver, 30).until(EC.element_to_be_clickable((By.CLASS_NAME, "AuthView__Footer")))
+	auth_container = WebDriverWait(driver, 30, poll_frequency=POLL).until(EC.element_to_be_clickable((By.CLASS_NAME, "AuthContainer")))
+	un_pw_container = WebDriverWait(driver, 30, poll_frequency=POLL).until(EC.element_to_be_clickable((By.CLASS_NAME, "AuthView__Footer")))
 	un_pw_button = un_pw_container.find_element(By.CSS_SELECTOR, "button")
 	un_pw_button.click()
 
-	login_form = WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.CLASS_NAME, "LoginForm")))
+	login_form = WebDriverWait(driver, 5, poll_frequency=POLL).until(EC.element_to_be_clickable((By.CLASS_NAME, "LoginForm")))
 
 	email = login_form.find_element(By.ID, "email")
 	email.clear()
@@ -151,5 +164,34 @@ def getPage(url, preferred_times, attempt=0) :
 	login_button = login_form.find_element(By.CLASS_NAME, "Button--lg")
 	login_button.click()
 
-	time.sleep(5)
 
+def isLoggedIn(driver) :
+	## The header only shows a "Log in" button to signed-out visitors ##
+	WebDriverWait(driver, 15, poll_frequency=POLL).until(EC.presence_of_element_located((By.TAG_NAME, "header")))
+	return len(driver.find_elements(By.CLASS_NAME, "Button--login")) == 0
+
+
+def refreshSession(driver, auth) :
+	## Make sure a pooled browser's profile is signed in, logging in through the site header if the session has lapsed ##
+	driver.switch_to.default_content()
+	driver.get("https://resy.com/")
+	if isLoggedIn(driver) :
+		return True
+
+	login = WebDriverWait(driver, 30, poll_frequency=POLL).until(EC.element_to_be_clickable((By.CLASS_NAME, "Button--login")))
+	login.click()
+	_submitLoginForm(driver, auth)
+	WebDriverWait(driver, 30, poll_frequency=POLL).until(EC.invisibility_of_element_located((By.CLASS_NAME, "AuthContainer")))
+	return isLoggedIn(driver)
+
+
+def refreshSessions(pool, auth=None) :
+	## Refresh every idle session in the pool ahead of the fire time so the booking flow never has to log in ##
+	if auth is None :
+		with open('config.json') as f:
+			auth = json.load(f)
+
+	results = []
+	pool.warm(lambda driver : results.append(refreshSession(driver, auth)))
+	logger.info("Refreshed {0} browser session(s), {1} signed in.".format(len(results), sum(results)))
+	return all(results)